@@ -4,7 +4,9 @@ import fnmatch
 import json
 import os
 import sys
+import time
 import unittest
+from datetime import datetime, timedelta
 from uuid import uuid4
 
 HERE = os.path.dirname(os.path.abspath(__file__))
@@ -27,6 +29,7 @@ if FLASK_COVERAGE:
 else:
     COV = None
 
+import bson  # noqa
 from flask_migrate import Migrate, MigrateCommand  # noqa
 from flask_script import Manager, Shell  # noqa
 from opac_schema.v1.models import (  # noqa
@@ -37,20 +40,56 @@ from opac_schema.v1.models import (  # noqa
     Journal,
     Sponsor,
 )
-from webapp import controllers  # noqa
-from webapp import cache, create_app, dbmongo, dbsql, mail  # noqa
+from webapp import (  # noqa
+    cache,
+    controllers,
+    create_app,
+    db_indexes,
+    dbmongo,
+    dbsql,
+    mail,
+    projections,
+)
 from webapp.admin.forms import EmailForm  # noqa
-from webapp.tasks import clear_scheduler, setup_scheduler  # noqa
+from webapp.tasks import (  # noqa
+    JOURNAL_EXPORTS_QUEUE_NAME,
+    JOURNALS_QUEUE_NAME,
+    PID_INDEX_QUEUE_NAME,
+    PRERENDER_DATE_FORMAT,
+    PRERENDER_QUEUE_NAME,
+    build_pid_index,
+    clear_scheduler,
+    enqueue_articles_prerender,
+    enqueue_recent_articles_prerender,
+    generate_journal_exports,
+    get_prerender_period,
+    get_prerender_progress,
+    get_queue,
+    reconcile_journals,
+    reconcile_updated_journals,
+    setup_scheduler,
+    update_pid_index,
+)
 from webapp.utils import (  # noqa
+    caching,
     create_db_tables,
     create_new_journal_page,
     create_user,
+    render_cache,
     reset_db,
     send_audit_log_daily_report,
 )
 from webapp.utils.journal_static_page import PAGE_NAMES_BY_LANG  # noqa
 
 app = create_app()
+if (
+    __name__ != "__main__"
+    and app.config["MONGODB_CHECK_QUERY_PLANS"]
+    and not app.testing
+):
+    # somente no processo web (gunicorn ``manager:app``), não nos comandos
+    # do manager (ex.: ``test``) nem nos workers do RQ (``webapp.create_app``)
+    db_indexes.check_query_plans_in_background()
 migrate = Migrate(app, dbsql)
 manager = Manager(app)
 manager.add_command("dbsql", MigrateCommand)
@@ -149,6 +188,31 @@ def invalidate_cache_pattern(pattern, force_clear=False):
                     print('Resposta inválida. Responda "y" ou "n" (sem aspas)')
 
 
+@manager.command
+@manager.option("-t", "--tags", dest="tags")
+def invalidate_cache_tags(tags):
+    """
+    Remove do cache as páginas associadas às tags separadas por vírgula.
+    Ex.: --tags=journal:<jid>,issue:<iid>,article:<aid>
+    """
+    tags = [tag.strip() for tag in (tags or "").split(",") if tag.strip()]
+    if not tags:
+        print("Não é possível invalidar o cache sem tags!")
+        return
+    removed = caching.invalidate_cache_tags(tags)
+    print("%s chaves removidas do cache" % removed)
+
+
+@manager.command
+def invalidate_render_cache():
+    """
+    Remove todas as entradas do cache em disco do HTML dos artigos
+    (pasta definida em RENDER_CACHE_ROOT).
+    """
+    removed = render_cache.clear()
+    print("%s entradas removidas do cache de HTML dos artigos" % removed)
+
+
 @manager.command
 @manager.option("-f", "--force", dest="force_delete", default=False)
 def reset_dbsql(force_delete=False):
@@ -450,6 +514,216 @@ def clear_scheduler_tasks():
     clear_scheduler(queue_name="mailing")
 
 
+@manager.command
+@manager.option("-c", "--cronstr", dest="cron_string")
+def setup_prerender_scheduler_tasks(cron_string=None):
+    cron_string = cron_string or app.config["PRERENDER_CRON_STRING"]
+    if not cron_string:
+        print(
+            "Valor de cron nulo para o scheduler. Definit cron pelo parâmetro ou pela var env."
+        )
+        return sys.exit(1)
+    clear_scheduler(PRERENDER_QUEUE_NAME)
+    setup_scheduler(
+        enqueue_recent_articles_prerender, PRERENDER_QUEUE_NAME, cron_string
+    )
+
+
+@manager.command
+def clear_prerender_scheduler_tasks():
+    clear_scheduler(queue_name=PRERENDER_QUEUE_NAME)
+
+
+@manager.command
+@manager.option("-d", "--days", dest="days")
+@manager.option("-b", "--begin_date", dest="begin_date")
+@manager.option("-e", "--end_date", dest="end_date")
+@manager.option("-s", "--batch_size", dest="batch_size")
+@manager.option("-w", "--wait", dest="wait", default=False)
+def prerender_articles(
+    days=None, begin_date=None, end_date=None, batch_size=None, wait=False
+):
+    """
+    Enfileira (fila 'prerender') a obtenção do XML e a geração do HTML dos
+    artigos atualizados no período indicado, para que os workers do RQ
+    preparem o cache de HTML antes do primeiro acesso.
+
+    O período é definido por --begin_date e --end_date (formato: YYYY-MM-DD)
+    ou pelos últimos --days dias (default: PRERENDER_DAYS).
+    Utilize --wait=True para acompanhar o progresso dos jobs.
+    """
+    begin_date, end_date = get_prerender_period(days, begin_date, end_date)
+    batch_size = int(batch_size) if batch_size else None
+
+    print(
+        "Enfileirando os artigos atualizados entre %s e %s"
+        % (
+            begin_date.strftime(PRERENDER_DATE_FORMAT),
+            end_date.strftime(PRERENDER_DATE_FORMAT),
+        )
+    )
+    jobs = enqueue_articles_prerender(begin_date, end_date, batch_size)
+    print("%s jobs enfileirados na fila '%s'" % (len(jobs), PRERENDER_QUEUE_NAME))
+
+    while wait and jobs:
+        progress = get_prerender_progress(jobs)
+        print(
+            "jobs: %(finished_jobs)s/%(jobs)s concluídos (%(failed_jobs)s com falha) | "
+            "artigos: %(done)s processados, %(rendered)s renderizados, "
+            "%(skipped)s ignorados, %(failed)s com falha" % progress
+        )
+        if progress["finished_jobs"] + progress["failed_jobs"] == progress["jobs"]:
+            break
+        time.sleep(5)
+
+
+@manager.command
+@manager.option("-c", "--cronstr", dest="cron_string")
+def setup_reconcile_journals_scheduler_tasks(cron_string=None):
+    cron_string = cron_string or app.config["RECONCILE_JOURNALS_CRON_STRING"]
+    if not cron_string:
+        print(
+            "Valor de cron nulo para o scheduler. Definit cron pelo parâmetro ou pela var env."
+        )
+        return sys.exit(1)
+    clear_scheduler(JOURNALS_QUEUE_NAME)
+    setup_scheduler(reconcile_updated_journals, JOURNALS_QUEUE_NAME, cron_string)
+
+
+@manager.command
+def clear_reconcile_journals_scheduler_tasks():
+    clear_scheduler(queue_name=JOURNALS_QUEUE_NAME)
+
+
+@manager.command
+@manager.option("-d", "--days", dest="days")
+@manager.option("-q", "--enqueue", dest="enqueue", default=False)
+def reconcile_journals_last_issue(days=None, enqueue=False):
+    """
+    Atualiza o último número (last_issue) e a quantidade de números
+    (issue_count) dos periódicos com números atualizados nos últimos --days
+    dias, ou de todos os periódicos, caso --days não seja informado.
+    Utilize --enqueue=True para executar na fila 'journals' do RQ.
+    """
+    since = datetime.utcnow() - timedelta(days=int(days)) if days else None
+    if enqueue:
+        job = get_queue(JOURNALS_QUEUE_NAME).enqueue_call(
+            func=reconcile_journals,
+            args=(since,),
+            timeout=app.config["DEFAULT_SCHEDULER_TIMEOUT"],
+        )
+        print("job %s enfileirado na fila '%s'" % (job.id, JOURNALS_QUEUE_NAME))
+    else:
+        reconcile_journals(since)
+
+
+@manager.command
+@manager.option("-c", "--cronstr", dest="cron_string")
+def setup_pid_index_scheduler_tasks(cron_string=None):
+    cron_string = cron_string or app.config["PID_INDEX_CRON_STRING"]
+    if not cron_string:
+        print(
+            "Valor de cron nulo para o scheduler. Definit cron pelo parâmetro ou pela var env."
+        )
+        return sys.exit(1)
+    clear_scheduler(PID_INDEX_QUEUE_NAME)
+    setup_scheduler(update_pid_index, PID_INDEX_QUEUE_NAME, cron_string)
+
+
+@manager.command
+def clear_pid_index_scheduler_tasks():
+    clear_scheduler(queue_name=PID_INDEX_QUEUE_NAME)
+
+
+@manager.command
+@manager.option("-q", "--enqueue", dest="enqueue", default=False)
+def rebuild_pid_index(enqueue=False):
+    """
+    Reconstrói o índice dos PIDs legados dos artigos (OPAC_PID_INDEX_ENABLED).
+    Utilize --enqueue=True para executar na fila 'pid_index' do RQ.
+    """
+    if not app.config["PID_INDEX_ENABLED"]:
+        print("O índice de PIDs esta desativado. Verifique a conf: PID_INDEX_ENABLED")
+        return sys.exit(1)
+    if enqueue:
+        job = get_queue(PID_INDEX_QUEUE_NAME).enqueue_call(
+            func=build_pid_index, timeout=app.config["DEFAULT_SCHEDULER_TIMEOUT"]
+        )
+        print("job %s enfileirado na fila '%s'" % (job.id, PID_INDEX_QUEUE_NAME))
+    else:
+        build_pid_index()
+
+
+@manager.command
+@manager.option("-c", "--cronstr", dest="cron_string")
+def setup_journal_exports_scheduler_tasks(cron_string=None):
+    cron_string = cron_string or app.config["JOURNAL_EXPORTS_CRON_STRING"]
+    if not cron_string:
+        print(
+            "Valor de cron nulo para o scheduler. Definit cron pelo parâmetro ou pela var env."
+        )
+        return sys.exit(1)
+    clear_scheduler(JOURNAL_EXPORTS_QUEUE_NAME)
+    setup_scheduler(generate_journal_exports, JOURNAL_EXPORTS_QUEUE_NAME, cron_string)
+
+
+@manager.command
+def clear_journal_exports_scheduler_tasks():
+    clear_scheduler(queue_name=JOURNAL_EXPORTS_QUEUE_NAME)
+
+
+@manager.command
+@manager.option("-f", "--force", dest="force", default=False)
+@manager.option("-q", "--enqueue", dest="enqueue", default=False)
+def export_journal_lists(force=False, enqueue=False):
+    """
+    Gera os arquivos (CSV e XLS) do download da lista de periódicos
+    (OPAC_JOURNAL_EXPORTS_ENABLED). Utilize --force=True para gerar mesmo sem
+    alterações nos periódicos e --enqueue=True para executar na fila
+    'journal_exports' do RQ.
+    """
+    if enqueue:
+        job = get_queue(JOURNAL_EXPORTS_QUEUE_NAME).enqueue_call(
+            func=generate_journal_exports,
+            args=(bool(force),),
+            timeout=app.config["DEFAULT_SCHEDULER_TIMEOUT"],
+        )
+        print("job %s enfileirado na fila '%s'" % (job.id, JOURNAL_EXPORTS_QUEUE_NAME))
+    else:
+        generate_journal_exports(bool(force))
+
+
+@manager.command
+def create_indexes():
+    """
+    Cria os índices do MongoDB ausentes (ver webapp/db_indexes.py).
+    """
+    created = db_indexes.create_indexes()
+    for model_name, name in created:
+        print("índice %s criado (%s)" % (name, model_name))
+    print("%s índices criados" % len(created))
+
+
+@manager.command
+def verify_indexes():
+    """
+    Lista os índices do MongoDB ausentes e as consultas frequentes que
+    percorrem a coleção inteira (COLLSCAN), com o plano de execução.
+    """
+    missing = db_indexes.missing_indexes()
+    for model_name, keys in missing:
+        print("índice ausente em %s: %s" % (model_name, keys))
+
+    scans = db_indexes.collection_scans()
+    for name, plan in scans:
+        print("consulta %s sem índice (COLLSCAN): %s" % (name, plan))
+
+    if missing or scans:
+        print("Utilize: python manager.py create_indexes")
+        return sys.exit(1)
+    print("Todos os índices estão presentes.")
+
+
 @manager.command
 def send_audit_log_emails():
     print("coletando registros de auditoria modificados hoje!")
@@ -464,5 +738,86 @@ def send_audit_log_emails():
     send_audit_log_daily_report()
 
 
+def _measure_queryset(queryset, repeat):
+    """
+    Retorna a quantidade de documentos, os bytes (BSON) recebidos do MongoDB
+    e o tempo médio (ms) para consultar e instanciar os documentos.
+    """
+    documents = list(queryset.clone().as_pymongo())
+    total_bytes = sum(len(bson.BSON.encode(document)) for document in documents)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        list(queryset.clone())
+    elapsed = (time.perf_counter() - start) * 1000 / repeat
+    return len(documents), total_bytes, elapsed
+
+
+@manager.command
+@manager.option("-a", "--acronym", dest="acronym")
+@manager.option("-i", "--iid", dest="iid")
+@manager.option("-r", "--repeat", dest="repeat")
+def benchmark_projections(acronym=None, iid=None, repeat=5):
+    """
+    Compara, para as consultas das páginas de sumário, grade de números e
+    lista alfabética, os bytes recebidos do MongoDB e o tempo para instanciar
+    os documentos sem e com projeção (ver ``webapp.projections``).
+
+    Por padrão usa o periódico com mais números e o seu último número.
+    """
+    repeat = int(repeat)
+    if acronym:
+        journal = Journal.objects.get(acronym=acronym)
+    else:
+        journal = Journal.objects(is_public=True).order_by("-issue_count").first()
+    if not journal:
+        print("Nenhum periódico encontrado")
+        return sys.exit(1)
+    iid = iid or (journal.last_issue and journal.last_issue.iid)
+
+    benchmarks = [
+        (
+            "alpha list (journals, 1st page)",
+            controllers.get_journals(),
+            projections.JOURNAL_LIST,
+            20,
+        ),
+        (
+            "grid (issues of %s)" % journal.acronym,
+            controllers.get_issues_by_jid(journal.id, is_public=True),
+            projections.ISSUE_GRID,
+            None,
+        ),
+    ]
+    if iid:
+        benchmarks.append(
+            (
+                "toc (articles of %s)" % iid,
+                controllers.get_articles_by_iid(iid, is_public=True),
+                projections.ISSUE_TOC_ARTICLE,
+                None,
+            )
+        )
+
+    row = "{:<40} {:>6} {:>12} {:>12} {:>10} {:>10}"
+    print(row.format("page", "docs", "bytes", "bytes proj", "ms", "ms proj"))
+    for name, queryset, fields, limit in benchmarks:
+        if limit:
+            queryset = queryset.limit(limit)
+        count, total_bytes, elapsed = _measure_queryset(queryset, repeat)
+        __, proj_bytes, proj_elapsed = _measure_queryset(
+            projections.project(queryset.clone(), fields), repeat
+        )
+        print(
+            row.format(
+                name,
+                count,
+                total_bytes,
+                proj_bytes,
+                "%.1f" % elapsed,
+                "%.1f" % proj_elapsed,
+            )
+        )
+
+
 if __name__ == "__main__":
     manager.run()
@@ -5,7 +5,7 @@ import time
 import pymongo
 from flask import current_app
 from flask_testing import TestCase
-from webapp import dbsql
+from webapp import dbsql, journal_catalog
 
 
 class MongoInstance(object):
@@ -74,3 +74,5 @@ class BaseTestCase(TestCase):
         dbsql.drop_all()
         mongo_db_name = current_app.config["MONGODB_SETTINGS"]["db"]
         self.conn.drop_database(mongo_db_name)
+        # o catálogo em memória só verifica o MongoDB periodicamente
+        journal_catalog.invalidate()
@@ -6,6 +6,7 @@ from unittest.mock import patch
 
 from flask import current_app, g, url_for
 from flask_login import current_user
+from opac_schema.v1.models import Article, Issue, Journal
 from tests.utils import (
     makeOneArticle,
     makeOneCollection,
@@ -16,9 +17,10 @@ from tests.utils import (
 )
 from webapp import dbsql, mail
 from webapp.admin import forms
+from webapp.admin.views import ArticleAdminView, IssueAdminView, JournalAdminView
 from webapp.controllers import get_user_by_email
 from webapp.notifications import send_confirmation_email
-from webapp.utils import create_user
+from webapp.utils import caching, create_user
 
 from .base import BaseTestCase
 
@@ -4864,3 +4866,38 @@ class PagesAdminViewTests(BaseTestCase):
                     response_data.count("/avaliacao/faq_avaliacao_en.htm"), 2
                 )
                 self.assertEqual(response_data.count("/img/revistas/abcd/glogo.gif"), 2)
+
+
+class AdminModelHooksSignalsTestCase(BaseTestCase):
+    @patch("webapp.signals.caching.invalidate_cache_tags")
+    def test_journal_change_invalidates_the_cache(self, mk_invalidate_cache_tags):
+        journal = makeOneJournal()
+        view = JournalAdminView(Journal, endpoint="test_journal_hooks")
+
+        view.after_model_change(None, journal, False)
+        view.after_model_delete(journal)
+
+        self.assertEqual(mk_invalidate_cache_tags.call_count, 2)
+        for call in mk_invalidate_cache_tags.call_args_list:
+            self.assertIn(caching.journal_tag(journal.id), call[0][0])
+
+    @patch("webapp.signals.caching.invalidate_cache_tags")
+    def test_issue_and_article_change_invalidates_the_cache(
+        self, mk_invalidate_cache_tags
+    ):
+        journal = makeOneJournal()
+        issue = makeOneIssue({"journal": journal})
+        article = makeOneArticle({"journal": journal, "issue": issue})
+
+        IssueAdminView(Issue, endpoint="test_issue_hooks").after_model_change(
+            None, issue, False
+        )
+        ArticleAdminView(Article, endpoint="test_article_hooks").after_model_change(
+            None, article, False
+        )
+
+        issue_tags, article_tags = [
+            call[0][0] for call in mk_invalidate_cache_tags.call_args_list
+        ]
+        self.assertIn(caching.issue_tag(issue.iid), issue_tags)
+        self.assertIn(caching.article_tag(article.aid), article_tags)
@@ -1,8 +1,11 @@
 # coding: utf-8
+from datetime import datetime
 from unittest import TestCase
 from unittest.mock import patch
 
+from flask import current_app
 from flask_babelex import lazy_gettext as __
+from opac_schema.v1.models import Issue, Journal
 from webapp import controllers, dbsql
 from webapp import utils as ut
 from werkzeug.security import check_password_hash
@@ -72,6 +75,72 @@ class JournalControllerTestCase(BaseTestCase):
         """
         self.assertEqual(len(controllers.get_journals()), 0)
 
+    def test_get_journals_with_projection(self):
+        """
+        Testando a função controllers.get_journals() com o parâmetro ``only``,
+        deve carregar somente os campos indicados, ignorando os campos que não
+        são declarados no modelo.
+        """
+        utils.makeOneJournal({"title": "Title", "acronym": "acron"})
+
+        journal = controllers.get_journals(only=("title", "url_last_issue")).first()
+
+        self.assertEqual(journal.title, "Title")
+        self.assertIsNone(journal.acronym)
+
+    def test_reconcile_journal(self):
+        """
+        Testando a função controllers.reconcile_journal(), deve atualizar
+        ``issue_count`` e ``last_issue`` com o último número regular e só
+        gravar o periódico quando algum valor muda.
+        """
+        journal = utils.makeOneJournal()
+        utils.makeOneIssue({"journal": journal, "year": 2019, "order": 1})
+        issue = utils.makeOneIssue({"journal": journal, "year": 2020, "order": 1})
+        utils.makeOneIssue(
+            {"journal": journal, "year": 2020, "number": "ahead", "type": "ahead"}
+        )
+
+        self.assertTrue(controllers.reconcile_journal(journal))
+
+        journal.reload()
+        self.assertEqual(journal.issue_count, 2)
+        self.assertEqual(journal.last_issue.iid, issue.iid)
+        self.assertFalse(controllers.reconcile_journal(journal))
+
+    def test_reconcile_journals(self):
+        """
+        Testando a função controllers.reconcile_journals() com os periódicos
+        retornados por controllers.get_jids_to_reconcile().
+        """
+        journal = utils.makeOneJournal()
+        utils.makeOneIssue({"journal": journal})
+
+        jids = controllers.get_jids_to_reconcile()
+
+        self.assertIn(journal.id, jids)
+        self.assertEqual(
+            controllers.reconcile_journals(jids), {"total": 1, "updated": 1}
+        )
+
+    def test_get_jids_to_reconcile_since(self):
+        """
+        Testando se controllers.get_jids_to_reconcile(since) retorna somente os
+        periódicos com números atualizados a partir de ``since``.
+        """
+        journal = utils.makeOneJournal()
+        utils.makeOneIssue({"journal": journal})
+        old_journal = utils.makeOneJournal()
+        old_issue = utils.makeOneIssue({"journal": old_journal})
+        Issue.objects(iid=old_issue.iid).update(set__updated=datetime(2019, 1, 1))
+        # sem último número regular
+        utils.makeOneJournal({"last_issue": None})
+
+        jids = controllers.get_jids_to_reconcile(datetime(2020, 1, 1))
+
+        self.assertEqual(jids, [journal.id])
+        self.assertEqual(len(controllers.get_jids_to_reconcile()), 3)
+
     def test_get_journals_grouped_by_study_area(self):
         """
         Testando se o retorno da função controllers.get_journals_by_study_area()
@@ -345,6 +414,36 @@ class JournalControllerTestCase(BaseTestCase):
         )
         self.assertEqual(len(expected["objects"]), len(grouped_objects["objects"]))
 
+    def test_generate_csv(self):
+        """
+        Testando controllers.generate_csv() gera uma linha (bytes) por vez.
+        """
+        rows = controllers.generate_csv(["Title", "issues"], iter([["Revista", 2]]))
+
+        self.assertEqual(next(rows), b"Title,issues\r\n")
+        self.assertEqual(next(rows), b"Revista,2\r\n")
+        self.assertEqual(list(rows), [])
+
+    def test_get_journal_generator_for_csv(self):
+        """
+        Testando controllers.get_journal_generator_for_csv() no formato "csv"
+        e no formato "xls" (arquivo temporário com a planilha).
+        """
+        utils.makeOneJournal({"title": "Revista", "title_slug": "revista"})
+
+        csv_data = b"".join(controllers.get_journal_generator_for_csv(extension="csv"))
+        self.assertEqual(
+            csv_data.splitlines()[0],
+            b"Title,issues,Last volume,Last number,Last year,Is active?",
+        )
+        self.assertTrue(csv_data.splitlines()[1].startswith(b"Revista,"))
+
+        xls_file = controllers.get_journal_generator_for_csv(extension="xls")
+        try:
+            self.assertEqual(xls_file.read(2), b"PK")
+        finally:
+            xls_file.close()
+
     def test_get_journal_by_jid(self):
         """
         Testando a função controllers.get_journal_by_jid() deve retornar um
@@ -547,6 +646,50 @@ class IssueControllerTestCase(BaseTestCase):
             controllers.get_issues_by_jid(issue.journal.id)[0].id, issue.id
         )
 
+    def test_count_articles_by_issue(self):
+        """
+        Teste da função controllers.count_articles_by_issue(), deve retornar
+        a quantidade de artigos públicos de cada número do periódico.
+        """
+        journal = utils.makeOneJournal()
+        issue1 = self._make_one({"journal": journal})
+        issue2 = self._make_one({"journal": journal})
+        issue3 = self._make_one({"journal": journal})
+        for issue in (issue1, issue1, issue2):
+            utils.makeOneArticle({"journal": journal, "issue": issue})
+        utils.makeOneArticle({"journal": journal, "issue": issue2, "is_public": False})
+
+        result = controllers.count_articles_by_issue(journal.id)
+
+        self.assertEqual(result, {issue1.id: 2, issue2.id: 1})
+        self.assertNotIn(issue3.id, result)
+
+    def test_get_issue_nav_bar_data(self):
+        """
+        Teste da função controllers.get_issue_nav_bar_data(), os itens
+        anterior e posterior são obtidos do índice de números do periódico.
+        """
+        journal = utils.makeOneJournal()
+        issue1 = self._make_one({"journal": journal, "year": 2019, "order": 1})
+        issue2 = self._make_one({"journal": journal, "year": 2020, "order": 1})
+        issue3 = self._make_one({"journal": journal, "year": 2020, "order": 2})
+        aop = self._make_one(
+            {"journal": journal, "year": 2020, "number": "ahead", "type": "ahead"}
+        )
+
+        result = controllers.get_issue_nav_bar_data(issue=issue2)
+        self.assertEqual(result["previous_item"].iid, issue1.iid)
+        self.assertEqual(result["next_item"].iid, issue3.iid)
+
+        result = controllers.get_issue_nav_bar_data(journal=journal)
+        self.assertEqual(result["last_issue"].iid, issue3.iid)
+        self.assertEqual(result["previous_item"].iid, issue2.iid)
+        self.assertEqual(result["next_item"].iid, aop.iid)
+
+        result = controllers.get_issue_nav_bar_data(issue=aop)
+        self.assertEqual(result["previous_item"].iid, issue3.iid)
+        self.assertIsNone(result["next_item"])
+
     def test_get_issues_by_jid_with_many_items(self):
         """
         Teste da função controllers.get_issue_by_jid() com vários itens, deve
@@ -756,6 +899,92 @@ class IssueControllerTestCase(BaseTestCase):
         for issue in issues.values():
             self.assertTrue(issue.is_public)
 
+    def _patch_cache(self):
+        """
+        Cache em memória sem ``delete``: simula as alterações feitas
+        diretamente no MongoDB, que não removem o índice de números do cache.
+        """
+        store = {}
+        patcher = patch("webapp.controllers.cache")
+        mk_cache = patcher.start()
+        self.addCleanup(patcher.stop)
+        mk_cache.get.side_effect = store.get
+        mk_cache.set.side_effect = store.__setitem__
+        return store
+
+    def test_get_issue_index_is_rebuilt_when_issues_change(self):
+        """
+        Testando se controllers.get_issue_index() reconstrói o índice quando os
+        números do periódico mudam sem passar por este processo.
+        """
+        self._patch_cache()
+        config = patch.dict(current_app.config, {"ISSUE_INDEX_CHECK_INTERVAL": 0})
+        config.start()
+        self.addCleanup(config.stop)
+        journal = utils.makeOneJournal()
+        issue = utils.makeOneIssue(
+            {"journal": journal, "year": "2019", "order": "1", "number": "1"}
+        )
+
+        index = controllers.get_issue_index(journal.id)
+        self.assertEqual([i["iid"] for i in index["issues"]], [issue.iid])
+        self.assertIs(controllers.get_issue_index(journal.id), index)
+
+        new_issue = utils.makeOneIssue(
+            {"journal": journal, "year": "2019", "order": "2", "number": "2"}
+        )
+        index = controllers.get_issue_index(journal.id)
+        self.assertEqual(
+            [i["iid"] for i in index["issues"]], [issue.iid, new_issue.iid]
+        )
+
+        Issue.objects(iid=new_issue.iid).update(set__is_public=False)
+        index = controllers.get_issue_index(journal.id)
+        self.assertEqual([i["iid"] for i in index["issues"]], [issue.iid])
+
+    def test_get_issue_index_is_checked_once_per_interval(self):
+        """
+        Testando se controllers.get_issue_index() verifica os números no
+        MongoDB no máximo uma vez a cada ISSUE_INDEX_CHECK_INTERVAL segundos.
+        """
+        self._patch_cache()
+        journal = utils.makeOneJournal()
+        utils.makeOneIssue({"journal": journal, "year": "2019", "order": "1"})
+        index = controllers.get_issue_index(journal.id)
+
+        with patch(
+            "webapp.controllers._issue_index_fingerprint",
+            return_value=index["fingerprint"],
+        ) as mk_fingerprint:
+            with patch.dict(current_app.config, {"ISSUE_INDEX_CHECK_INTERVAL": 3600}):
+                self.assertIs(controllers.get_issue_index(journal.id), index)
+            mk_fingerprint.assert_not_called()
+
+            with patch.dict(current_app.config, {"ISSUE_INDEX_CHECK_INTERVAL": 0}):
+                self.assertIs(controllers.get_issue_index(journal.id), index)
+            mk_fingerprint.assert_called_once_with(journal.id)
+
+    def test_get_adjacent_issues_of_the_last_issue_is_the_ahead(self):
+        """
+        Testando se o número posterior ao mais recente é o ahead.
+        """
+        self._patch_cache()
+        journal = utils.makeOneJournal()
+        first = utils.makeOneIssue(
+            {"journal": journal, "year": "2019", "order": "1", "number": "1"}
+        )
+        last = utils.makeOneIssue(
+            {"journal": journal, "year": "2019", "order": "2", "number": "2"}
+        )
+        ahead = utils.makeOneIssue(
+            {"journal": journal, "year": "2019", "type": "ahead", "number": "ahead"}
+        )
+
+        previous, next_ = controllers.get_adjacent_issues(journal.id, last)
+
+        self.assertEqual(previous.iid, first.iid)
+        self.assertEqual(next_.iid, ahead.iid)
+
 
 class ArticleControllerTestCase(BaseTestCase):
     def _make_one(self, attrib=None):
@@ -1103,6 +1332,26 @@ class ArticleControllerTestCase(BaseTestCase):
         for article in articles.values():
             self.assertFalse(article.is_public)
 
+    @patch("webapp.utils.caching.invalidate_cache_tags")
+    def test_set_article_is_public_bulk_invalidates_cache_tags(
+        self, mk_invalidate_cache_tags
+    ):
+        """
+        Testando que a despublicação de artigos remove do cache as páginas
+        do artigo, do seu número e do seu periódico.
+        """
+        article = self._make_one(attrib={"_id": "012ijs9y24", "is_public": True})
+
+        controllers.set_article_is_public_bulk(["012ijs9y24"], is_public=False)
+
+        mk_invalidate_cache_tags.assert_called_once_with(
+            [
+                "article:%s" % article.aid,
+                "issue:%s" % article.issue.id,
+                "journal:%s" % article.journal.id,
+            ]
+        )
+
     def test_set_article_is_public_bulk_without_aids(self):
         """
         Testando alterar o valor de um conjunto de journals sem iids, deve
@@ -1166,6 +1415,64 @@ class ArticleControllerTestCase(BaseTestCase):
 
         self.assertListEqual(articles, expected)
 
+    def test_get_issue_toc(self):
+        """
+        Testando a função controllers.get_issue_toc(), deve retornar os itens
+        do sumário com os dados exibidos no template, na ordem dos artigos.
+        """
+        self._make_one(
+            attrib={
+                "_id": "012ijs9y24",
+                "issue": "90210j83",
+                "order": "14",
+                "journal": "oak,ajimn1",
+                "section": "Artigos",
+                "htmls": [{"lang": "pt"}, {"lang": "en"}],
+                "pdfs": [{"lang": "pt", "url": "https://link/pt.pdf"}],
+            }
+        )
+        self._make_one(
+            attrib={
+                "_id": "2183ikos90",
+                "issue": "90210j83",
+                "order": "12",
+                "journal": "oak,ajimn1",
+                "section": "Editorial",
+            }
+        )
+
+        toc = controllers.get_issue_toc("90210j83", "pt")
+
+        self.assertListEqual(
+            [entry.id for entry in toc["entries"]], ["2183ikos90", "012ijs9y24"]
+        )
+        self.assertListEqual(toc["sections"], ["ARTIGOS", "EDITORIAL"])
+        entry = toc["entries"][1]
+        self.assertEqual(entry.get_section_by_lang("pt"), "Artigos")
+        self.assertEqual(entry.get_title_by_lang("pt"), "article-012ijs9y24")
+        self.assertListEqual(entry.article_text_languages, ["en", "pt"])
+        self.assertListEqual(
+            entry.article_pdf_languages, [("pt", "https://link/pt.pdf")]
+        )
+
+    def test_issue_toc_fingerprint_matches_the_loaded_articles(self):
+        """
+        A "impressão digital" obtida pela consulta agregada deve ser igual à
+        calculada a partir dos artigos carregados por get_issue_toc().
+        """
+        for _id in ("012ijs9y24", "2183ikos90"):
+            self._make_one(
+                attrib={"_id": _id, "issue": "90210j83", "journal": "oak,ajimn1"}
+            )
+
+        articles = list(controllers.get_articles_by_iid("90210j83", is_public=True))
+        updated = [a.updated for a in articles if a.updated]
+        expected = controllers._make_toc_fingerprint(
+            len(articles), max(updated) if updated else None, [a.pk for a in articles]
+        )
+
+        self.assertEqual(controllers._issue_toc_fingerprint("90210j83"), expected)
+
     def test_get_articles_by_iid_from_aop_issue(self):
         """
         Testando a função controllers.get_articles_by_iid(), deve retorna uma
@@ -1414,6 +1721,29 @@ class ArticleControllerTestCase(BaseTestCase):
         self.assertEqual(article._id, "012ijs9y24")
         self.assertEqual(article.scielo_pids["v1"], "S0101-0202(99)12345")
 
+    def test_prefetch_references(self):
+        """
+        Testando a função controllers.prefetch_references(), deve resolver o
+        periódico e o número de todos os artigos da lista.
+        """
+        self._make_one(
+            attrib={"_id": "012ijs9y24", "issue": "90210j83", "journal": "oak,ajimn1"}
+        )
+        self._make_one(
+            attrib={"_id": "2183ikos90", "issue": "90210j83", "journal": "oak,ajimn1"}
+        )
+
+        articles = controllers.prefetch_references(
+            controllers.get_articles_by_iid("90210j83")
+        )
+
+        self.assertEqual(len(articles), 2)
+        for article in articles:
+            self.assertIsInstance(article._data["journal"], Journal)
+            self.assertIsInstance(article._data["issue"], Issue)
+            self.assertEqual(article.journal.id, "oak,ajimn1")
+            self.assertEqual(article.issue.id, "90210j83")
+
     @patch("webapp.controllers.now", return_value="2020-01-01")
     def test_get_recent_articles_of_issue(self, mk):
         self._make_one(
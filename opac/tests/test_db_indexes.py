@@ -0,0 +1,37 @@
+# coding: utf-8
+
+from webapp import db_indexes
+
+from .base import BaseTestCase
+
+
+class DbIndexesTestCase(BaseTestCase):
+    def test_plan_stages(self):
+        plan = {
+            "stage": "LIMIT",
+            "inputStage": {
+                "stage": "SUBPLAN",
+                "inputStage": {
+                    "stage": "OR",
+                    "inputStages": [
+                        {"stage": "IXSCAN"},
+                        {"stage": "FETCH", "inputStage": {"stage": "COLLSCAN"}},
+                    ],
+                },
+            },
+        }
+        self.assertEqual(
+            db_indexes.plan_stages(plan),
+            ["LIMIT", "SUBPLAN", "OR", "IXSCAN", "FETCH", "COLLSCAN"],
+        )
+
+    def test_create_indexes(self):
+        db_indexes.create_indexes()
+
+        self.assertEqual(db_indexes.missing_indexes(), [])
+        self.assertEqual(db_indexes.create_indexes(), [])
+
+    def test_hot_queries_use_the_indexes(self):
+        db_indexes.create_indexes()
+
+        self.assertEqual(db_indexes.collection_scans(), [])
@@ -0,0 +1,277 @@
+# coding: utf-8
+
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+from flask import current_app
+from opac_schema.v1.models import Journal
+from webapp import controllers, journal_catalog
+
+from . import utils
+from .base import BaseTestCase
+
+
+class JournalCatalogTestCase(BaseTestCase):
+    def setUp(self):
+        super(JournalCatalogTestCase, self).setUp()
+        journal_catalog.invalidate()
+        self.config = patch.dict(current_app.config, {"JOURNAL_CATALOG_ENABLED": True})
+        self.config.start()
+
+    def tearDown(self):
+        self.config.stop()
+        super(JournalCatalogTestCase, self).tearDown()
+
+    def _make_journals(self):
+        return [
+            utils.makeOneJournal(
+                {
+                    "title": "Revista de Saúde",
+                    "title_slug": "revista-de-saude",
+                    "current_status": "current",
+                    "publisher_name": "B",
+                }
+            ),
+            utils.makeOneJournal(
+                {
+                    "title": "Anais da Academia",
+                    "title_slug": "anais-da-academia",
+                    "current_status": "deceased",
+                    "publisher_name": "A",
+                }
+            ),
+            utils.makeOneJournal(
+                {
+                    "title": "Revista Oculta",
+                    "title_slug": "revista-oculta",
+                    "is_public": False,
+                }
+            ),
+        ]
+
+    def test_catalog_has_only_public_journals(self):
+        saude, anais, __ = self._make_journals()
+
+        journals = journal_catalog.get_journals()
+
+        self.assertEqual([journal.id for journal in journals], [anais.id, saude.id])
+
+    def test_filter(self):
+        saude, anais, __ = self._make_journals()
+
+        self.assertEqual(
+            [journal.id for journal in journal_catalog.get_journals("Saúde")],
+            [saude.id],
+        )
+        self.assertEqual(
+            [
+                journal.id
+                for journal in journal_catalog.get_journals(query_filter="current")
+            ],
+            [saude.id],
+        )
+        self.assertEqual(
+            [
+                journal.id
+                for journal in journal_catalog.get_journals(query_filter="no-current")
+            ],
+            [anais.id],
+        )
+        self.assertEqual(
+            [
+                journal.id
+                for journal in journal_catalog.get_journals(order_by="publisher_name")
+            ],
+            [anais.id, saude.id],
+        )
+
+    def test_title_search_is_ranked(self):
+        saude, anais, __ = self._make_journals()
+        rsp = utils.makeOneJournal(
+            {
+                "title": "RSP Journal",
+                "title_slug": "rsp-journal",
+                "acronym": "rspj",
+            }
+        )
+        saude.acronym = "rsp"
+        saude.save()
+
+        self.assertEqual(
+            [journal.id for journal in journal_catalog.get_journals("RSP")],
+            [saude.id, rsp.id],
+        )
+        self.assertEqual(
+            [journal.id for journal in journal_catalog.get_journals("academia")],
+            [anais.id],
+        )
+        self.assertEqual(journal_catalog.get_journals("inexistente"), [])
+
+    def test_catalog_is_rebuilt_when_a_journal_changes(self):
+        saude, anais, __ = self._make_journals()
+        catalog = journal_catalog.get_catalog()
+        self.assertIs(journal_catalog.get_catalog(), catalog)
+
+        anais.is_public = False
+        anais.save()
+
+        new_catalog = journal_catalog.get_catalog()
+        self.assertGreater(new_catalog.version, catalog.version)
+        self.assertEqual([journal.id for journal in new_catalog.journals], [saude.id])
+
+    def test_fingerprint_is_checked_once_per_interval(self):
+        self._make_journals()
+        catalog = journal_catalog.get_catalog()
+
+        with patch(
+            "webapp.journal_catalog.get_fingerprint", return_value=catalog.fingerprint
+        ) as mk_get_fingerprint:
+            with patch.dict(
+                current_app.config, {"JOURNAL_CATALOG_CHECK_INTERVAL": 3600}
+            ):
+                self.assertIs(journal_catalog.get_catalog(), catalog)
+            mk_get_fingerprint.assert_not_called()
+
+            with patch.dict(current_app.config, {"JOURNAL_CATALOG_CHECK_INTERVAL": 0}):
+                self.assertIs(journal_catalog.get_catalog(), catalog)
+            mk_get_fingerprint.assert_called_once_with()
+
+    def test_catalog_is_rebuilt_when_changed_by_other_process(self):
+        saude, anais, __ = self._make_journals()
+        catalog = journal_catalog.get_catalog()
+
+        with patch.dict(current_app.config, {"JOURNAL_CATALOG_CHECK_INTERVAL": 0}):
+            Journal.objects(id=anais.id).update(set__is_public=False)
+            self.assertIs(journal_catalog.get_catalog(), catalog)
+
+            Journal.objects(id=anais.id).update(
+                set__is_public=False, set__updated=datetime.now()
+            )
+            new_catalog = journal_catalog.get_catalog()
+
+        self.assertEqual([journal.id for journal in new_catalog.journals], [saude.id])
+
+    def test_saved_journal_updates_the_catalog(self):
+        saude, anais, __ = self._make_journals()
+        catalog = journal_catalog.get_catalog()
+        saude_data = catalog.json_data(catalog.filter("Saúde")[0], "pt")
+
+        anais.title = "Anais da Academia de Ciências"
+        anais.save()
+
+        new_catalog = journal_catalog.get_catalog()
+        self.assertEqual(new_catalog.version, catalog.version + 1)
+        self.assertEqual(
+            new_catalog.filter(title_query="Anais")[0].title,
+            "Anais da Academia de Ciências",
+        )
+        self.assertIs(
+            new_catalog.json_data(new_catalog.filter("Saúde")[0], "pt"), saude_data
+        )
+
+    def test_outdated_catalog_is_discarded_on_save(self):
+        self._make_journals()
+        journal_catalog.get_catalog()
+
+        with patch("webapp.journal_catalog.get_fingerprint", return_value=(0, None)):
+            utils.makeOneJournal({"title": "Nova", "title_slug": "nova"})
+
+        self.assertIsNone(journal_catalog._catalog)
+
+    def test_catalog_changed_by_other_process_is_discarded_on_save(self):
+        saude, anais, __ = self._make_journals()
+        journal_catalog.get_catalog()
+
+        Journal.objects(id=anais.id).update(
+            set__is_public=False, set__updated=datetime.now()
+        )
+        saude.title = "Revista de Saúde Pública"
+        saude.save()
+
+        self.assertIsNone(journal_catalog._catalog)
+
+    def test_json_data_is_generated_once_per_language(self):
+        saude = self._make_journals()[0]
+        catalog = journal_catalog.get_catalog()
+        journal = catalog.filter("Saúde")[0]
+
+        with patch(
+            "webapp.controllers.get_journal_json_data", return_value={"id": saude.id}
+        ) as mk_get_journal_json_data:
+            self.assertEqual(catalog.json_data(journal, "en"), {"id": saude.id})
+            self.assertEqual(catalog.json_data(journal, "en"), {"id": saude.id})
+            catalog.json_data(journal, "es")
+
+        self.assertEqual(mk_get_journal_json_data.call_count, 2)
+
+    @patch("webapp.journal_catalog.get_locale")
+    def test_json_data_is_generated_once_per_locale(self, mk_get_locale):
+        saude = self._make_journals()[0]
+        catalog = journal_catalog.get_catalog()
+        journal = catalog.filter("Saúde")[0]
+
+        with patch(
+            "webapp.controllers.get_journal_json_data", return_value={"id": saude.id}
+        ) as mk_get_journal_json_data:
+            mk_get_locale.return_value = "pt_BR"
+            catalog.json_data(journal, "pt_BR")
+            catalog.json_data(journal, "pt_BR")
+            mk_get_locale.return_value = "en"
+            catalog.json_data(journal, "pt_BR")
+
+        self.assertEqual(mk_get_journal_json_data.call_count, 2)
+
+    def test_grouped_journals_match_the_database(self):
+        saude = self._make_journals()[0]
+
+        with patch.dict(current_app.config, {"JOURNAL_CATALOG_ENABLED": True}):
+            from_catalog = controllers.get_journals_grouped_by("publisher_name")
+        with patch.dict(current_app.config, {"JOURNAL_CATALOG_ENABLED": False}):
+            from_database = controllers.get_journals_grouped_by("publisher_name")
+
+        self.assertEqual(from_catalog, from_database)
+        self.assertEqual(from_catalog["objects"]["B"][0]["id"], saude.id)
+
+    def test_groups_are_generated_once(self):
+        self._make_journals()
+        catalog = journal_catalog.get_catalog()
+
+        with patch(
+            "webapp.controllers.group_journals", return_value={}
+        ) as mk_group_journals:
+            catalog.groups("publisher_name", "current", "en")
+            catalog.groups("publisher_name", "current", "en")
+            catalog.groups("publisher_name", "", "en")
+
+        self.assertEqual(mk_group_journals.call_count, 2)
+        self.assertIs(
+            controllers.get_journals_grouped_by(
+                "publisher_name", query_filter="current", lang="en"
+            ),
+            catalog.groups("publisher_name", "current", "en"),
+        )
+
+
+class TitleIndexTestCase(BaseTestCase):
+    def _journal(self, title_slug, short_title=None, acronym=None):
+        journal = Mock()
+        journal.title_slug = title_slug
+        journal.short_title = short_title
+        journal.acronym = acronym
+        return journal
+
+    def test_search(self):
+        index = journal_catalog.TitleIndex(
+            [
+                self._journal("anais-da-academia", "An. Acad.", "aabc"),
+                self._journal("revista-de-saude-publica", "Rev. Saúde Pública", "rsp"),
+                self._journal("rsp-journal", None, "rspj"),
+            ]
+        )
+
+        self.assertEqual(index.search("rsp"), [(index.EXACT, 1), (index.PREFIX, 2)])
+        self.assertEqual(index.search("saude"), [(index.WORD_PREFIX, 1)])
+        self.assertEqual(index.search("ademia"), [(index.SUBSTRING, 0)])
+        self.assertEqual(index.search("saude-p"), [(index.WORD_PREFIX, 1)])
+        self.assertEqual(index.search("xyz"), [])
+        self.assertEqual(index.search("academias"), [])
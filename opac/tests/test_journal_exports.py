@@ -0,0 +1,108 @@
+# coding: utf-8
+
+import os
+import shutil
+import tempfile
+from datetime import datetime
+from unittest.mock import patch
+
+from flask import current_app, url_for
+from webapp import journal_catalog, journal_exports
+
+from . import utils
+from .base import BaseTestCase
+
+
+class JournalExportsTestCase(BaseTestCase):
+    def setUp(self):
+        super(JournalExportsTestCase, self).setUp()
+        journal_catalog.invalidate()
+        self.exports_root = tempfile.mkdtemp()
+        self.config = patch.dict(
+            current_app.config,
+            {
+                "JOURNAL_EXPORTS_ENABLED": True,
+                "JOURNAL_EXPORTS_ROOT": self.exports_root,
+            },
+        )
+        self.config.start()
+        utils.makeOneJournal({"title": "Revista", "title_slug": "revista"})
+
+    def tearDown(self):
+        self.config.stop()
+        shutil.rmtree(self.exports_root)
+        super(JournalExportsTestCase, self).tearDown()
+
+    def test_generate(self):
+        generated = journal_exports.generate()
+
+        langs = current_app.config["LANGUAGES"]
+        self.assertEqual(
+            len(generated), len(journal_exports.LIST_TYPES) * (1 + len(langs))
+        )
+        self.assertIn("journals_alpha.csv", generated)
+        self.assertIn("journals_wos_en.xls", generated)
+        for filename in generated:
+            self.assertTrue(os.path.isfile(os.path.join(self.exports_root, filename)))
+        with open(journal_exports.get_export_path("alpha", "csv"), "rb") as fp:
+            self.assertTrue(fp.read().splitlines()[1].startswith(b"Revista,"))
+
+    def test_generate_only_when_journals_change(self):
+        journal_exports.generate()
+
+        self.assertEqual(journal_exports.generate(), [])
+        self.assertNotEqual(journal_exports.generate(force=True), [])
+
+        utils.makeOneJournal({"title": "Outra Revista", "title_slug": "outra-revista"})
+        self.assertNotEqual(journal_exports.generate(), [])
+
+    def test_download_serves_the_generated_file_with_etag(self):
+        journal_exports.generate()
+        url = url_for("main.download_journal_list", list_type="alpha", extension="csv")
+
+        response = self.client.get(url)
+        self.assertStatus(response, 200)
+        self.assertTrue(response.headers.get("ETag"))
+        self.assertIn("attachment", response.headers["Content-Disposition"])
+
+        etag = response.headers["ETag"]
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertStatus(response, 304)
+
+    def test_generate_records_the_check(self):
+        journal_exports.generate()
+        manifest = journal_exports.read_manifest()
+
+        with patch("webapp.journal_exports.datetime") as mk_datetime:
+            mk_datetime.utcnow.return_value = datetime(2099, 1, 1)
+            self.assertEqual(journal_exports.generate(), [])
+
+        self.assertEqual(
+            journal_exports.read_manifest(),
+            dict(manifest, checked="2099-01-01T00:00:00"),
+        )
+
+    def test_outdated_files_are_not_served(self):
+        journal_exports.generate()
+        url = url_for("main.download_journal_list", list_type="alpha", extension="csv")
+
+        self.assertFalse(journal_exports.is_outdated())
+        with patch.dict(current_app.config, {"JOURNAL_EXPORTS_MAX_AGE": -1}):
+            self.assertTrue(journal_exports.is_outdated())
+            with patch("webapp.journal_exports.get_export_path") as mk_get_export_path:
+                response = self.client.get(url)
+
+        mk_get_export_path.assert_not_called()
+        self.assertStatus(response, 200)
+        self.assertIn(b"Revista,", response.data)
+
+    def test_download_with_query_is_generated_on_request(self):
+        journal_exports.generate()
+        url = url_for("main.download_journal_list", list_type="alpha", extension="csv")
+
+        with patch("webapp.journal_exports.get_export_path") as mk_get_export_path:
+            response = self.client.get(url + "?query=revista")
+
+        mk_get_export_path.assert_not_called()
+        self.assertStatus(response, 200)
+        self.assertIn(b"Revista,", response.data)
@@ -216,7 +216,7 @@ class LegacyURLTestCase(BaseTestCase):
 
                 self.assertStatus(response, 301)
 
-    @patch("requests.get")
+    @patch("webapp.utils.http_client.get")
     def test_article_pdf(self, mocked_requests_get):
         """
         Testa o acesso ao PDF pela URL antiga verificando em todas as versões do pid
@@ -226,6 +226,7 @@ class LegacyURLTestCase(BaseTestCase):
         mocked_response = Mock()
         mocked_response.status_code = 200
         mocked_response.content = b"<pdf>"
+        mocked_response.headers = {"Content-Length": "5"}
         mocked_requests_get.return_value = mocked_response
 
         with current_app.app_context():
@@ -259,7 +260,7 @@ class LegacyURLTestCase(BaseTestCase):
 
                 self.assertStatus(response, 200)
 
-    @patch("requests.get")
+    @patch("webapp.utils.http_client.get")
     def test_article_pdf_with_tlng(self, mocked_requests_get):
         """
         Testa o acesso ao PDF pela URL antiga verificando em todas as versões do pid
@@ -270,6 +271,7 @@ class LegacyURLTestCase(BaseTestCase):
         mocked_response = Mock()
         mocked_response.status_code = 200
         mocked_response.content = b"<es_content>"
+        mocked_response.headers = {"Content-Length": "12"}
         mocked_requests_get.return_value = mocked_response
 
         with current_app.app_context():
@@ -331,7 +333,7 @@ class LegacyURLTestCase(BaseTestCase):
                 self.assertEqual(urlparse(response.location).path, expectedPath)
                 self.assertEqual(urlparse(response.location).query, expectedQuery)
 
-    @patch("requests.get")
+    @patch("webapp.utils.http_client.get")
     def test_article_pdf_without_tlng(self, mocked_requests_get):
         """
         Testa o acesso ao PDF pela URL antiga sem o tlng, considera o idioma original
@@ -342,6 +344,7 @@ class LegacyURLTestCase(BaseTestCase):
         mocked_response = Mock()
         mocked_response.status_code = 200
         mocked_response.content = b"<en_content>"
+        mocked_response.headers = {"Content-Length": "12"}
         mocked_requests_get.return_value = mocked_response
 
         with current_app.app_context():
@@ -403,7 +406,7 @@ class LegacyURLTestCase(BaseTestCase):
                 self.assertEqual(urlparse(response.location).path, expectedPath)
                 self.assertEqual(urlparse(response.location).query, expectedQuery)
 
-    @patch("requests.get")
+    @patch("webapp.utils.http_client.get")
     def test_article_pdf_when_dont_have_the_pdf_translation(self, mocked_requests_get):
         """
         Testa o acesso ao PDF pela URL antiga verificando em todas as versões do pid
@@ -414,6 +417,7 @@ class LegacyURLTestCase(BaseTestCase):
         mocked_response = Mock()
         mocked_response.status_code = 200
         mocked_response.content = b"<content>"
+        mocked_response.headers = {"Content-Length": "9"}
         mocked_requests_get.return_value = mocked_response
 
         with current_app.app_context():
@@ -471,7 +475,7 @@ class LegacyURLTestCase(BaseTestCase):
                 self.assertStatus(response, 200)
                 self.assertEqual(response.data, b"<content>")
 
-    @patch("requests.get")
+    @patch("webapp.utils.http_client.get")
     def test_article_pdf_looking_scielo_pids(self, mocked_requests_get):
         """
         Testa o acesso ao PDF pela URL antiga verificando em todas as versões do pid
@@ -481,6 +485,7 @@ class LegacyURLTestCase(BaseTestCase):
         mocked_response = Mock()
         mocked_response.status_code = 200
         mocked_response.content = b"<pdf>"
+        mocked_response.headers = {"Content-Length": "5"}
         mocked_requests_get.return_value = mocked_response
 
         with current_app.app_context():
@@ -519,7 +524,7 @@ class LegacyURLTestCase(BaseTestCase):
                         response = c.get(url, follow_redirects=False)
                         self.assertStatus(response, 301)
 
-    @patch("requests.get")
+    @patch("webapp.utils.http_client.get")
     def test_router_legacy_pdf(self, mocked_requests_get):
         """
         Testa o acesso à URL antiga do PDF quando existe a chave filename no campo pdf.
@@ -530,6 +535,7 @@ class LegacyURLTestCase(BaseTestCase):
         mocked_response = Mock()
         mocked_response.status_code = 200
         mocked_response.content = b"<pdf>"
+        mocked_response.headers = {"Content-Length": "5"}
         mocked_requests_get.return_value = mocked_response
 
         with current_app.app_context():
@@ -566,7 +572,7 @@ class LegacyURLTestCase(BaseTestCase):
 
                 self.assertStatus(response, 301)
 
-    @patch("requests.get")
+    @patch("webapp.utils.http_client.get")
     def test_router_legacy_pdf_suppl_material(self, mocked_requests_get):
         """
         Testa o acesso à URL antiga do PDF de material suplementar quando existe
@@ -578,6 +584,7 @@ class LegacyURLTestCase(BaseTestCase):
         mocked_response = Mock()
         mocked_response.status_code = 200
         mocked_response.content = b"<pdf>"
+        mocked_response.headers = {"Content-Length": "5"}
         mocked_requests_get.return_value = mocked_response
 
         with current_app.app_context():
@@ -1,5 +1,7 @@
 # coding: utf-8
 import pathlib
+import shutil
+import tempfile
 import unittest
 import warnings
 from unittest.mock import Mock, patch
@@ -7,7 +9,7 @@ from urllib.parse import parse_qs, urlparse
 
 import flask
 from bs4 import BeautifulSoup
-from flask import current_app, g, render_template, url_for
+from flask import Response, current_app, g, render_template, url_for
 from flask_babelex import gettext as _
 from webapp.config.lang_names import display_original_lang_name
 from webapp.main.views import NonRetryableError, RetryableError
@@ -693,7 +695,7 @@ class MainTestCase(BaseTestCase):
             )
             self.assertEqual(self.get_context_variable("issue").id, article.issue.id)
 
-    @patch("requests.get")
+    @patch("webapp.utils.http_client.get")
     def test_article_detail_v3_translate_version_(self, mocked_requests_get):
         """
         Teste da ``view function`` ``article_detail_v3``, deve retornar uma página
@@ -754,7 +756,7 @@ class MainTestCase(BaseTestCase):
             self.assertEqual(content.count('{}">Português<'.format(urls["pt"])), 1)
             self.assertEqual(content.count('{}">bla<'.format(urls["bla"])), 1)
 
-    @patch("requests.get")
+    @patch("webapp.utils.http_client.get")
     def test_article_detail_v3_has_citation_title_in_pt(self, mocked_requests_get):
         """
         Teste da ``view function`` ``article_detail_v3``, deve retornar uma página
@@ -813,7 +815,7 @@ class MainTestCase(BaseTestCase):
                 '<meta name="citation_title" content="Artigo título"></meta>', content
             )
 
-    @patch("requests.get")
+    @patch("webapp.utils.http_client.get")
     def test_article_detail_v3_has_citation_title_in_es(self, mocked_requests_get):
         """
         Teste da ``view function`` ``article_detail_v3``, deve retornar uma página
@@ -1669,7 +1671,7 @@ class MainTestCase(BaseTestCase):
 
             self.assertStatus(response, 500)
 
-    @patch("requests.get")
+    @patch("webapp.utils.http_client.get")
     def test_article_detail_v3_has_doi_with_lang(self, mocked_requests_get):
         """
         Teste da ``view function`` ``article_detail_v3``, deve retornar uma página
@@ -3083,3 +3085,252 @@ class TestArticleDetailV3Meta(BaseTestCase):
                 '<meta name="citation_author_orcid" content="http://orcid.org/0000-0002-7323-9261">',
                 content,
             )
+
+
+class TestRenderAllHtmlFromXml(BaseTestCase):
+    def setUp(self):
+        super(TestRenderAllHtmlFromXml, self).setUp()
+        self.render_cache_root = tempfile.mkdtemp()
+        current_app.config["RENDER_CACHE_ENABLED"] = True
+        current_app.config["RENDER_CACHE_ROOT"] = self.render_cache_root
+
+    def tearDown(self):
+        current_app.config["RENDER_CACHE_ENABLED"] = False
+        shutil.rmtree(self.render_cache_root, ignore_errors=True)
+        super(TestRenderAllHtmlFromXml, self).tearDown()
+
+    @patch("webapp.main.views.fetch_data")
+    def test_one_render_stores_every_language(self, mk_fetch_data):
+        from webapp.main import views
+        from webapp.utils import render_cache
+
+        test_xml_path = pathlib.Path("opac/tests/fixtures/document.xml")
+        mk_fetch_data.return_value = test_xml_path.read_bytes()
+
+        with current_app.app_context():
+            article = utils.makeOneArticle(
+                {
+                    "original_language": "en",
+                    "languages": ["en", "es"],
+                    "abstract_languages": ["en"],
+                    "xml": "https://kernel:6543/documents/kSiec9encE0f2dp",
+                }
+            )
+
+            html, languages = views.render_html_from_xml(article, "en")
+
+            self.assertEqual(1, mk_fetch_data.call_count)
+            for lang in languages:
+                self.assertIsNotNone(render_cache.load(article, lang))
+            self.assertIsNotNone(render_cache.load(article, "en", gs_abstract=True))
+
+            # os demais idiomas não fazem uma nova requisição do XML
+            views.render_html_from_xml(article, languages[-1])
+            self.assertEqual(1, mk_fetch_data.call_count)
+
+
+class TestProxyContent(BaseTestCase):
+    def _upstream(self, content, headers):
+        upstream = Mock()
+        upstream.content = content
+        upstream.headers = headers
+        upstream.iter_content.return_value = [content[:4], content[4:]]
+        return upstream
+
+    @patch("webapp.main.views.fetch_stream")
+    def test_small_content_is_buffered(self, mk_fetch_stream):
+        from webapp.main import views
+        from webapp.utils.caching import is_cacheable_response
+
+        mk_fetch_stream.return_value = self._upstream(
+            b"%PDF-1.4", {"Content-Length": "8"}
+        )
+        with current_app.test_request_context():
+            response = views.proxy_content("https://ssm/a.pdf", "application/pdf")
+
+            self.assertFalse(response.is_streamed)
+            self.assertEqual(b"%PDF-1.4", response.get_data())
+            self.assertTrue(is_cacheable_response(response))
+            mk_fetch_stream.return_value.close.assert_called_once_with()
+
+    @patch("webapp.main.views.fetch_stream")
+    def test_large_content_is_streamed(self, mk_fetch_stream):
+        from webapp.main import views
+        from webapp.utils.caching import is_cacheable_response
+
+        mk_fetch_stream.return_value = self._upstream(
+            b"%PDF-1.4", {"Content-Length": "8", "ETag": '"abc"'}
+        )
+        with patch.dict(
+            current_app.config, {"CACHE_MAX_RESPONSE_SIZE": 4}
+        ), current_app.test_request_context():
+            response = views.proxy_content("https://ssm/a.pdf", "application/pdf")
+
+            self.assertTrue(response.is_streamed)
+            self.assertFalse(is_cacheable_response(response))
+            self.assertEqual("8", response.headers["Content-Length"])
+            self.assertEqual('"abc"', response.headers["ETag"])
+            self.assertEqual(b"%PDF-1.4", b"".join(response.response))
+            mk_fetch_stream.return_value.close.assert_called_once_with()
+
+    @patch("webapp.main.views.fetch_stream")
+    def test_not_modified_is_answered_from_stored_metadata(self, mk_fetch_stream):
+        from webapp.main import views
+
+        mk_fetch_stream.return_value = self._upstream(
+            b"%PDF-1.4", {"Content-Length": "8", "ETag": '"abc"'}
+        )
+        with patch.object(views, "get_ssm_metadata") as mk_get_ssm_metadata:
+            mk_get_ssm_metadata.return_value = {
+                "etag": '"abc"',
+                "last_modified": None,
+                "length": "8",
+            }
+            with current_app.test_request_context(headers={"If-None-Match": '"abc"'}):
+                response = views.proxy_content("https://ssm/a.pdf", "application/pdf")
+
+        self.assertEqual(304, response.status_code)
+        self.assertEqual('"abc"', response.headers["ETag"])
+        mk_fetch_stream.assert_not_called()
+
+    @patch("webapp.main.views.fetch_stream")
+    def test_stored_content_is_served_with_its_validators(self, mk_fetch_stream):
+        import time
+
+        from webapp.main import views
+
+        entry = {
+            "body": b"%PDF-1.4",
+            "etag": '"abc"',
+            "last_modified": "Wed, 21 Oct 2015 07:28:00 GMT",
+            "checked": time.time(),
+        }
+        with patch.dict(
+            current_app.config, {"SSM_CONTENT_CACHE_ENABLED": True}
+        ), patch.object(
+            views, "get_ssm_content", return_value=entry
+        ) as mk_get_ssm_content, current_app.test_request_context():
+            url = current_app.config["SSM_BASE_URI"] + "/media/assets/a.pdf"
+            response = views.proxy_content(url, "application/pdf")
+
+        self.assertEqual(b"%PDF-1.4", response.get_data())
+        self.assertEqual('"abc"', response.headers["ETag"])
+        self.assertEqual(
+            "Wed, 21 Oct 2015 07:28:00 GMT", response.headers["Last-Modified"]
+        )
+        mk_get_ssm_content.assert_called_once_with(url)
+        mk_fetch_stream.assert_not_called()
+
+    def test_conditional_response_answers_range_requests(self):
+        from webapp.main import views
+
+        view = views.conditional_response(
+            lambda: Response(b"%PDF-1.4", mimetype="application/pdf")
+        )
+        with current_app.test_request_context(headers={"Range": "bytes=0-3"}):
+            response = view()
+
+        self.assertEqual(206, response.status_code)
+        self.assertEqual("bytes 0-3/8", response.headers["Content-Range"])
+        self.assertEqual(b"%PDF", response.get_data())
+        self.assertIsNotNone(response.get_etag()[0])
+
+
+class TestFetchSSMContent(BaseTestCase):
+    def _upstream(self, status_code, content=b"", headers=None):
+        upstream = Mock()
+        upstream.status_code = status_code
+        upstream.content = content
+        upstream.headers = headers or {}
+        return upstream
+
+    def _url(self):
+        return current_app.config["SSM_BASE_URI"] + "/media/assets/a.xml"
+
+    def _fetch(self, cache, upstream):
+        from webapp.main import views
+
+        with patch.dict(current_app.config, {"SSM_CONTENT_CACHE_ENABLED": True}):
+            with patch.object(views, "cache", cache):
+                with patch.object(views, "_get", return_value=upstream) as mk_get:
+                    return views.fetch_data(self._url()), mk_get
+
+    def test_content_is_stored_with_the_validators(self):
+        cache = Mock()
+        cache.get.return_value = None
+        upstream = self._upstream(200, b"<article/>", {"ETag": '"abc"'})
+
+        content, mk_get = self._fetch(cache, upstream)
+
+        self.assertEqual(b"<article/>", content)
+        entry = cache.set.call_args[0][1]
+        self.assertEqual(b"<article/>", entry["body"])
+        self.assertEqual('"abc"', entry["etag"])
+        self.assertEqual(
+            current_app.config["SSM_CONTENT_CACHE_TIMEOUT"],
+            cache.set.call_args[1]["timeout"],
+        )
+
+    def test_fresh_content_is_not_revalidated(self):
+        import time
+
+        cache = Mock()
+        cache.get.return_value = {
+            "body": b"<article/>",
+            "etag": '"abc"',
+            "last_modified": None,
+            "checked": time.time(),
+        }
+
+        content, mk_get = self._fetch(cache, self._upstream(200))
+
+        self.assertEqual(b"<article/>", content)
+        mk_get.assert_not_called()
+
+    def test_not_modified_extends_the_stored_content(self):
+        cache = Mock()
+        cache.get.return_value = {
+            "body": b"<article/>",
+            "etag": '"abc"',
+            "last_modified": "Wed, 21 Oct 2015 07:28:00 GMT",
+            "checked": 0,
+        }
+
+        content, mk_get = self._fetch(cache, self._upstream(304))
+
+        self.assertEqual(b"<article/>", content)
+        self.assertEqual(
+            {
+                "If-None-Match": '"abc"',
+                "If-Modified-Since": "Wed, 21 Oct 2015 07:28:00 GMT",
+            },
+            mk_get.call_args[1]["headers"],
+        )
+        entry = cache.set.call_args[0][1]
+        self.assertEqual(b"<article/>", entry["body"])
+        self.assertGreater(entry["checked"], 0)
+
+    def test_modified_content_updates_the_stored_metadata(self):
+        from webapp.main import views
+
+        cache = Mock()
+        cache.get.return_value = {
+            "body": b"<article/>",
+            "etag": '"abc"',
+            "last_modified": None,
+            "checked": 0,
+        }
+        upstream = self._upstream(
+            200, b"<article>new</article>", {"ETag": '"def"', "Content-Length": "22"}
+        )
+
+        content, mk_get = self._fetch(cache, upstream)
+
+        self.assertEqual(b"<article>new</article>", content)
+        cache.set.assert_any_call(
+            views.SSM_META_KEY % self._url(),
+            {"etag": '"def"', "last_modified": None, "length": "22"},
+        )
+        entry = cache.set.call_args[0][1]
+        self.assertEqual(b"<article>new</article>", entry["body"])
+        self.assertEqual('"def"', entry["etag"])
@@ -0,0 +1,32 @@
+# coding: utf-8
+
+from unittest import TestCase
+
+from flask import Flask, request
+from webapp.page_cache import PageCache
+from webapp.utils.cache_backends import CachedPage
+
+
+class PageCacheTestCase(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(CACHE_TYPE="simple", CACHE_DEFAULT_TIMEOUT=300)
+        self.cache = PageCache(self.app)
+
+        @self.app.route("/")
+        @self.cache.cached(key_prefix=lambda: "/PATH=%s" % request.path)
+        def index():
+            return "<html></html>"
+
+        self.client = self.app.test_client()
+
+    def test_page_is_stored_as_cached_page(self):
+        self.assertEqual(self.client.get("/").data, b"<html></html>")
+
+        with self.app.app_context():
+            self.assertIsInstance(self.cache.get("/PATH=/"), CachedPage)
+
+    def test_other_values_are_stored_unchanged(self):
+        with self.app.app_context():
+            self.cache.set("key", "value")
+            self.assertIs(type(self.cache.get("key")), str)
@@ -0,0 +1,156 @@
+# coding: utf-8
+
+import json
+from unittest.mock import MagicMock, Mock, patch
+
+from flask import current_app
+from webapp import controllers, pid_index
+
+from .base import BaseTestCase
+
+
+class PidIndexTestCase(BaseTestCase):
+    def _article(self, **attrib):
+        article = Mock()
+        article.aid = "aid"
+        article.pid = "S0102-76382019000100001"
+        article.aop_pid = None
+        article.scielo_pids = {}
+        for name, value in attrib.items():
+            setattr(article, name, value)
+        return article
+
+    def test_article_fields(self):
+        article = self._article(
+            aop_pid="s0102-76382018005000001",
+            scielo_pids={
+                "v1": "S0102-7638(19)03400101",
+                "other": ["S9999-99992019000100001"],
+            },
+        )
+
+        self.assertEqual(
+            pid_index.article_fields(article),
+            {
+                "v1:S0102-7638(19)03400101": 0,
+                "v2:S0102-76382019000100001": 0,
+                "v2:S1678-97412019000100001": 3,
+                "v2:S0102-76382018005000001": 1,
+                "v2:S1678-97412018005000001": 4,
+                "v2:S9999-99992019000100001": 2,
+            },
+        )
+
+    def _lookup(self, entry):
+        client = MagicMock()
+        client.hget.return_value = json.dumps(entry).encode("utf-8")
+        with patch.dict(current_app.config, {"PID_INDEX_ENABLED": True}):
+            with patch("webapp.utils.caching.get_redis_client", return_value=client):
+                result = pid_index.lookup(pid_index.V2, "s0102-76382019000100001")
+        client.hget.assert_called_once_with(
+            pid_index.PID_INDEX_KEY, "v2:S0102-76382019000100001"
+        )
+        return result
+
+    def test_lookup(self):
+        entry = {
+            "aid": "aid",
+            "url_seg": "abcd",
+            "languages": ["en"],
+            "original_language": "pt",
+            "publication_date": "2019-01-01",
+            "rank": 0,
+        }
+        self.assertEqual(self._lookup(entry), entry)
+
+    def test_lookup_ignores_embargoed_articles(self):
+        entry = {
+            "aid": "aid",
+            "url_seg": "abcd",
+            "languages": [],
+            "original_language": "pt",
+            "publication_date": "9999-01-01",
+            "rank": 0,
+        }
+        self.assertIsNone(self._lookup(entry))
+
+    def test_lookup_when_disabled(self):
+        with patch.dict(current_app.config, {"PID_INDEX_ENABLED": False}):
+            self.assertIsNone(pid_index.lookup(pid_index.V2, "S0102-76382019000100001"))
+
+    def _index_journal(self, indexed_state, **attrib):
+        journal = Mock(pk="jid", url_segment="abcd", is_public=True)
+        for name, value in attrib.items():
+            setattr(journal, name, value)
+        client = MagicMock()
+        client.hget.return_value = indexed_state
+        with patch.dict(current_app.config, {"PID_INDEX_ENABLED": True}), patch(
+            "webapp.utils.caching.get_redis_client", return_value=client
+        ), patch.object(pid_index, "Article"), patch.object(
+            pid_index, "_write_batches", return_value={"total": 1, "indexed": 1}
+        ) as mk_write_batches:
+            result = pid_index.index_journal(journal)
+        return result, client, mk_write_batches
+
+    def test_index_journal_when_the_journal_did_not_change(self):
+        result, client, mk_write_batches = self._index_journal(b'"abcd"')
+
+        self.assertEqual(result, {"total": 0, "indexed": 0})
+        mk_write_batches.assert_not_called()
+        client.hset.assert_not_called()
+
+    def test_index_journal_when_the_url_segment_changes(self):
+        result, client, mk_write_batches = self._index_journal(
+            b'"abcd"', url_segment="efgh"
+        )
+
+        self.assertEqual(result, {"total": 1, "indexed": 1})
+        self.assertEqual(mk_write_batches.call_args[0][2], {"jid": "efgh"})
+        client.hset.assert_called_once_with(
+            pid_index.PID_INDEX_JOURNALS_KEY, "jid", '"efgh"'
+        )
+
+    def test_index_journal_when_the_journal_is_unpublished(self):
+        result, client, mk_write_batches = self._index_journal(
+            b'"abcd"', is_public=False
+        )
+
+        # sem url_segment, os PIDs dos artigos são removidos do índice
+        self.assertEqual(mk_write_batches.call_args[0][2], {})
+        client.hset.assert_called_once_with(
+            pid_index.PID_INDEX_JOURNALS_KEY, "jid", '""'
+        )
+
+    @patch("webapp.pid_index.lookup")
+    def test_get_legacy_article_from_the_index(self, mk_lookup):
+        mk_lookup.return_value = {
+            "aid": "aid",
+            "url_seg": "abcd",
+            "languages": ["en"],
+            "original_language": "pt",
+            "publication_date": "2019-01-01",
+            "rank": 0,
+        }
+        get_article = Mock()
+
+        article = controllers.get_legacy_article(
+            "S0102-76382019000100001", get_article=get_article
+        )
+
+        self.assertEqual(article.aid, "aid")
+        self.assertEqual(article.url_seg, "abcd")
+        get_article.assert_not_called()
+
+    @patch("webapp.pid_index.lookup", return_value=None)
+    def test_get_legacy_article_from_the_database(self, mk_lookup):
+        from . import utils
+
+        journal = utils.makeOneJournal({"url_segment": "abcd"})
+        article = utils.makeOneArticle(
+            {"journal": journal, "pid": "S0102-76382019000100001"}
+        )
+
+        legacy = controllers.get_legacy_article("S0102-76382019000100001")
+
+        self.assertEqual(legacy.aid, article.aid)
+        self.assertEqual(legacy.url_seg, "abcd")
@@ -0,0 +1,123 @@
+# coding: utf-8
+
+import threading
+import time
+from unittest import TestCase
+from unittest.mock import patch
+
+from flask import Flask, request
+from webapp.stale_cache import FRESH_KEY, LOCK_KEY, StaleWhileRevalidateCache
+from webapp.utils.cache_backends import CachedPage
+
+
+class StaleWhileRevalidateCacheTestCase(TestCase):
+    def setUp(self):
+        self.app = Flask(__name__)
+        self.app.config.update(
+            CACHE_TYPE="simple",
+            CACHE_DEFAULT_TIMEOUT=300,
+            CACHE_STALE_WHILE_REVALIDATE=True,
+            CACHE_STALE_TIMEOUT=3600,
+            CACHE_LOCK_TIMEOUT=60,
+            CACHE_ENDPOINT_TIMEOUTS={"index": 600},
+        )
+        self.cache = StaleWhileRevalidateCache(self.app)
+        self.calls = []
+
+        @self.app.route("/")
+        @self.cache.cached(key_prefix=lambda: "/PATH=%s" % request.path)
+        def index():
+            self.calls.append(1)
+            return "v%s" % len(self.calls)
+
+        self.client = self.app.test_client()
+
+    def test_fresh_value_is_served_from_cache(self):
+        self.assertEqual(self.client.get("/").data, b"v1")
+        self.assertEqual(self.client.get("/").data, b"v1")
+        self.assertEqual(len(self.calls), 1)
+
+    def test_page_is_stored_as_cached_page(self):
+        for stale_while_revalidate in (True, False):
+            self.app.config["CACHE_STALE_WHILE_REVALIDATE"] = stale_while_revalidate
+            with self.app.app_context():
+                self.cache.clear()
+
+            self.client.get("/")
+
+            with self.app.app_context():
+                self.assertIsInstance(self.cache.get("/PATH=/"), CachedPage)
+
+    def test_stale_value_is_recomputed_by_the_lock_holder(self):
+        self.client.get("/")
+        with self.app.app_context():
+            self.cache.delete(FRESH_KEY % "/PATH=/")
+
+        self.assertEqual(self.client.get("/").data, b"v2")
+        with self.app.app_context():
+            self.assertIsNone(self.cache.get(LOCK_KEY % "/PATH=/"))
+
+    def test_stale_value_is_served_while_other_request_holds_the_lock(self):
+        self.client.get("/")
+        with self.app.app_context():
+            self.cache.delete(FRESH_KEY % "/PATH=/")
+            self.cache.add(LOCK_KEY % "/PATH=/", 1)
+
+        self.assertEqual(self.client.get("/").data, b"v1")
+        self.assertEqual(len(self.calls), 1)
+
+    def test_cold_path_falls_back_to_the_view_on_cache_error(self):
+        backend = self.cache.cache
+        with patch.object(backend, "get_many", return_value=[None, None]):
+            with patch.object(backend, "get", side_effect=Exception):
+                self.assertEqual(self.client.get("/").data, b"v1")
+
+    def test_waiter_calls_the_view_when_the_holder_did_not_store(self):
+        rejected = []
+
+        @self.app.route("/rejected")
+        @self.cache.cached(
+            key_prefix=lambda: "/PATH=%s" % request.path,
+            response_filter=lambda rv: False,
+        )
+        def rejected_view():
+            rejected.append(1)
+            return "r%s" % len(rejected)
+
+        # outra requisição (``holder``) está gerando a resposta
+        key_lock = threading.Lock()
+        key_lock.acquire()
+        self.cache._inflight["/PATH=/rejected"] = key_lock
+        threading.Timer(0.1, key_lock.release).start()
+
+        self.assertEqual(self.client.get("/rejected").data, b"r1")
+        with self.app.app_context():
+            self.assertIsNone(self.cache.get("/PATH=/rejected"))
+
+    def test_waiter_is_served_the_value_stored_by_the_holder(self):
+        key_lock = threading.Lock()
+        key_lock.acquire()
+        self.cache._inflight["/PATH=/"] = key_lock
+
+        def holder():
+            with self.app.app_context():
+                self.cache.set("/PATH=/", "v0")
+            key_lock.release()
+
+        threading.Timer(0.1, holder).start()
+
+        self.assertEqual(self.client.get("/").data, b"v0")
+        self.assertEqual(len(self.calls), 0)
+
+    def test_endpoint_timeout_without_stale_while_revalidate(self):
+        self.app.config["CACHE_STALE_WHILE_REVALIDATE"] = False
+        self.app.config["CACHE_ENDPOINT_TIMEOUTS"] = {}
+        self.app.view_functions["index"].cache_timeout = 5
+        self.client.get("/")
+
+        expires, _ = self.cache.cache._cache["/PATH=/"]
+        self.assertLessEqual(expires - time.time(), 5)
+
+    def test_endpoint_timeout(self):
+        with self.app.test_request_context("/"):
+            self.assertEqual(self.cache._endpoint_timeout(None), 600)
@@ -0,0 +1,184 @@
+# coding: utf-8
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from unittest.mock import Mock, patch
+
+from flask import current_app
+from opac_schema.v1.models import Article
+from webapp import tasks
+
+from . import utils
+from .base import BaseTestCase
+
+
+class PrerenderPeriodTestCase(BaseTestCase):
+    def test_period_from_dates(self):
+        self.assertEqual(
+            tasks.get_prerender_period(begin_date="2019-01-01", end_date="2019-01-31"),
+            (datetime(2019, 1, 1), datetime(2019, 1, 31, 23, 59, 59, 999999)),
+        )
+
+    def test_period_from_days(self):
+        self.assertEqual(
+            tasks.get_prerender_period(days="3", end_date="2019-01-31"),
+            (datetime(2019, 1, 28), datetime(2019, 1, 31, 23, 59, 59, 999999)),
+        )
+
+    def test_default_period(self):
+        with patch.dict(current_app.config, {"PRERENDER_DAYS": 2}):
+            begin_date, end_date = tasks.get_prerender_period()
+
+        self.assertEqual((end_date - begin_date).days, 2)
+        self.assertLessEqual(end_date, datetime.utcnow())
+
+
+class EnqueueArticlesPrerenderTestCase(BaseTestCase):
+    def _make_article(self, aid, pid, updated):
+        utils.makeOneArticle({"_id": aid, "aid": aid, "pid": pid})
+        # ``update`` não altera o ``updated`` informado, como o ``save``
+        Article.objects(aid=aid).update(set__updated=updated)
+
+    @patch("webapp.tasks.get_queue")
+    def test_enqueue_articles_updated_in_the_period(self, mk_get_queue):
+        self._make_article("a1", "S0000-00002019000100001", datetime(2019, 1, 10))
+        self._make_article("a2", "S0000-00002019000100002", datetime(2019, 1, 20))
+        self._make_article("a3", "S0000-00002019000100003", datetime(2019, 1, 25))
+        self._make_article("a4", "S0000-00002019000100004", datetime(2019, 3, 1))
+        self._make_article("a5", "S0000-00002018000100001", datetime(2018, 12, 1))
+        queue = mk_get_queue.return_value
+
+        jobs = tasks.enqueue_articles_prerender(
+            datetime(2019, 1, 1), datetime(2019, 1, 31), batch_size=2
+        )
+
+        mk_get_queue.assert_called_once_with(tasks.PRERENDER_QUEUE_NAME)
+        self.assertEqual(len(jobs), 2)
+        self.assertEqual(
+            [call[1]["args"] for call in queue.enqueue_call.call_args_list],
+            [(["a1", "a2"],), (["a3"],)],
+        )
+        for call in queue.enqueue_call.call_args_list:
+            self.assertEqual(call[1]["func"], tasks.prerender_articles)
+
+    @patch("webapp.tasks.get_queue")
+    def test_enqueue_articles_updated_on_the_end_date(self, mk_get_queue):
+        self._make_article("a1", "S0000-00002019000100001", datetime(2019, 1, 31, 15))
+        begin_date, end_date = tasks.get_prerender_period(
+            begin_date="2019-01-01", end_date="2019-01-31"
+        )
+
+        jobs = tasks.enqueue_articles_prerender(begin_date, end_date)
+
+        self.assertEqual(len(jobs), 1)
+        self.assertEqual(
+            mk_get_queue.return_value.enqueue_call.call_args[1]["args"], (["a1"],)
+        )
+
+    @patch("webapp.tasks.get_queue")
+    def test_enqueue_without_articles(self, mk_get_queue):
+        jobs = tasks.enqueue_articles_prerender(
+            datetime(2019, 1, 1), datetime(2019, 1, 31)
+        )
+
+        self.assertEqual(jobs, [])
+        mk_get_queue.return_value.enqueue_call.assert_not_called()
+
+
+class PrerenderArticlesTestCase(BaseTestCase):
+    def setUp(self):
+        super(PrerenderArticlesTestCase, self).setUp()
+        self.config = patch.dict(
+            current_app.config,
+            {"RENDER_CACHE_ENABLED": True, "PRERENDER_CONCURRENCY": 3},
+        )
+        self.config.start()
+        self.create_app = patch(
+            "webapp.create_app", return_value=current_app._get_current_object()
+        )
+        self.create_app.start()
+
+    def tearDown(self):
+        self.create_app.stop()
+        self.config.stop()
+        super(PrerenderArticlesTestCase, self).tearDown()
+
+    @patch("webapp.tasks.get_current_job")
+    @patch("webapp.tasks._prerender_article")
+    @patch("webapp.tasks.ThreadPoolExecutor", wraps=ThreadPoolExecutor)
+    def test_prerender_articles(
+        self, mk_executor, mk_prerender_article, mk_get_current_job
+    ):
+        results = {"a1": "rendered", "a2": "skipped", "a3": "failed", "a4": "rendered"}
+        mk_prerender_article.side_effect = lambda app, aid: results[aid]
+        job = Mock(meta={})
+        mk_get_current_job.return_value = job
+
+        progress = tasks.prerender_articles(["a1", "a2", "a3", "a4"])
+
+        mk_executor.assert_called_once_with(max_workers=3)
+        self.assertEqual(
+            sorted(call[0][1] for call in mk_prerender_article.call_args_list),
+            ["a1", "a2", "a3", "a4"],
+        )
+        expected = {"total": 4, "done": 4, "rendered": 2, "skipped": 1, "failed": 1}
+        self.assertEqual(progress, expected)
+        self.assertEqual(job.meta["progress"], expected)
+        self.assertEqual(job.save_meta.call_count, 4)
+
+    @patch("webapp.tasks._prerender_article")
+    def test_prerender_articles_when_render_cache_is_disabled(
+        self, mk_prerender_article
+    ):
+        with patch.dict(current_app.config, {"RENDER_CACHE_ENABLED": False}):
+            self.assertIsNone(tasks.prerender_articles(["a1"]))
+
+        mk_prerender_article.assert_not_called()
+
+    @patch("webapp.main.views.render_html_from_xml")
+    def test_prerender_article(self, mk_render_html_from_xml):
+        utils.makeOneArticle({"aid": "a1", "xml": "https://ssm/a1.xml"})
+        utils.makeOneArticle({"aid": "a2"})
+        app = current_app._get_current_object()
+
+        self.assertEqual(tasks._prerender_article(app, "a1"), "rendered")
+        self.assertEqual(tasks._prerender_article(app, "a2"), "skipped")
+        self.assertEqual(tasks._prerender_article(app, "inexistente"), "skipped")
+
+        mk_render_html_from_xml.side_effect = Exception("SSM indisponível")
+        self.assertEqual(tasks._prerender_article(app, "a1"), "failed")
+
+
+class PrerenderProgressTestCase(BaseTestCase):
+    def _job(self, finished=False, failed=False, progress=None):
+        job = Mock(is_finished=finished, is_failed=failed)
+        job.meta = {"progress": progress} if progress else {}
+        return job
+
+    def test_get_prerender_progress(self):
+        jobs = [
+            self._job(
+                finished=True,
+                progress={"total": 2, "done": 2, "rendered": 1, "skipped": 1},
+            ),
+            self._job(failed=True, progress={"total": 2, "done": 1, "failed": 1}),
+            self._job(),
+        ]
+
+        progress = tasks.get_prerender_progress(jobs)
+
+        self.assertEqual(
+            progress,
+            {
+                "jobs": 3,
+                "finished_jobs": 1,
+                "failed_jobs": 1,
+                "total": 4,
+                "done": 3,
+                "rendered": 1,
+                "skipped": 1,
+                "failed": 1,
+            },
+        )
+        for job in jobs:
+            job.refresh.assert_called_once_with()
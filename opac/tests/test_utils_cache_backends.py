@@ -0,0 +1,146 @@
+# coding: utf-8
+
+from unittest.mock import Mock, patch
+
+from flask import Response, current_app
+from flask_caching.backends.rediscache import RedisCache
+from webapp.utils.cache_backends import (
+    CachedPage,
+    CompressedRedisCache,
+    LocalLRUCache,
+    TwoTierRedisCache,
+    gzip_decompress,
+)
+
+from .base import BaseTestCase
+
+
+class LocalLRUCacheTestCase(BaseTestCase):
+    def test_set_and_get(self):
+        local = LocalLRUCache(max_bytes=10, timeout=30)
+        local.set("a", b"123")
+
+        self.assertEqual(local.get("a"), b"123")
+        self.assertEqual(local.size, 3)
+
+    def test_evicts_least_recently_used_by_size(self):
+        local = LocalLRUCache(max_bytes=10, timeout=30)
+        local.set("a", b"1234")
+        local.set("b", b"1234")
+        local.get("a")
+        local.set("c", b"1234")
+
+        self.assertIsNone(local.get("b"))
+        self.assertEqual(local.get("a"), b"1234")
+        self.assertEqual(local.get("c"), b"1234")
+        self.assertEqual(local.size, 8)
+
+    def test_does_not_store_large_items(self):
+        local = LocalLRUCache(max_bytes=10, timeout=30, max_item_bytes=4)
+
+        self.assertFalse(local.set("a", b"12345"))
+        self.assertIsNone(local.get("a"))
+
+    @patch("webapp.utils.cache_backends.time.time")
+    def test_expired_items(self, mk_time):
+        local = LocalLRUCache(max_bytes=10, timeout=30)
+        mk_time.return_value = 1000
+        local.set("a", b"1", timeout=60)
+
+        mk_time.return_value = 1031
+        self.assertIsNone(local.get("a"))
+        self.assertEqual(local.size, 0)
+
+
+class TwoTierRedisCacheTestCase(BaseTestCase):
+    def setUp(self):
+        super(TwoTierRedisCacheTestCase, self).setUp()
+        self.cache = TwoTierRedisCache.factory(current_app, current_app.config, [], {})
+        self.cache._read_clients = Mock()
+        self.cache._write_client = Mock()
+
+    def test_get_uses_local_tier(self):
+        self.cache._read_clients.get.return_value = self.cache.dump_object(
+            "<html></html>"
+        )
+
+        self.assertEqual(self.cache.get("/LANG=pt_BR/PATH=/"), "<html></html>")
+        self.assertEqual(self.cache.get("/LANG=pt_BR/PATH=/"), "<html></html>")
+
+        self.cache._read_clients.get.assert_called_once_with(
+            self.cache._get_prefix() + "/LANG=pt_BR/PATH=/"
+        )
+        stats = self.cache.get_stats()
+        self.assertEqual(stats["local_hits"], 1)
+        self.assertEqual(stats["local_misses"], 1)
+        self.assertEqual(stats["redis_hits"], 1)
+
+    def test_delete_removes_from_local_tier(self):
+        self.cache._read_clients.get.side_effect = [
+            self.cache.dump_object("<html></html>"),
+            None,
+        ]
+        self.cache.get("/LANG=pt_BR/PATH=/")
+
+        self.cache.delete("/LANG=pt_BR/PATH=/")
+
+        self.assertIsNone(self.cache.get("/LANG=pt_BR/PATH=/"))
+        self.assertEqual(self.cache.get_stats()["redis_misses"], 1)
+
+
+class CompressedRedisCacheTestCase(BaseTestCase):
+    def setUp(self):
+        super(CompressedRedisCacheTestCase, self).setUp()
+        self.cache = CompressedRedisCache.factory(
+            current_app, current_app.config, [], {}
+        )
+        self.cache.compress_enabled = True
+        self.cache.compress_min_size = 10
+        self.html = CachedPage("<html>%s</html>" % ("<p>SciELO</p>" * 100))
+
+    def test_small_values_are_not_compressed(self):
+        self.assertEqual(
+            self.cache.dump_object("<p></p>"),
+            RedisCache.dump_object(self.cache, "<p></p>"),
+        )
+
+    def test_html_is_sent_compressed_when_client_accepts_gzip(self):
+        dump = self.cache.dump_object(self.html)
+        self.assertLess(len(dump), len(self.html))
+
+        with current_app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+            response = self.cache.load_object(dump)
+
+        self.assertEqual(response.headers["Content-Encoding"], "gzip")
+        self.assertEqual(
+            gzip_decompress(response.get_data()).decode("utf-8"), self.html
+        )
+
+    def test_html_is_decompressed_when_client_does_not_accept_gzip(self):
+        dump = self.cache.dump_object(self.html)
+
+        with current_app.test_request_context():
+            page = self.cache.load_object(dump)
+
+        self.assertIsInstance(page, CachedPage)
+        self.assertEqual(page, self.html)
+
+    def test_str_is_restored_unchanged(self):
+        value = str(self.html)
+        dump = self.cache.dump_object(value)
+        self.assertLess(len(dump), len(value))
+
+        with current_app.test_request_context(headers={"Accept-Encoding": "gzip"}):
+            restored = self.cache.load_object(dump)
+
+        self.assertIs(type(restored), str)
+        self.assertEqual(restored, value)
+        self.assertEqual(self.cache.load_object(dump), value)
+
+    def test_response_is_restored(self):
+        value = Response(self.html, status=200, mimetype="application/xml")
+
+        response = self.cache.load_object(self.cache.dump_object(value))
+
+        self.assertEqual(response.mimetype, "application/xml")
+        self.assertEqual(response.get_data(as_text=True), self.html)
@@ -0,0 +1,62 @@
+# coding: utf-8
+
+from unittest.mock import MagicMock, patch
+
+from flask import current_app, g
+from webapp.utils import caching
+
+from .base import BaseTestCase
+
+
+class CacheTagsTestCase(BaseTestCase):
+    def test_add_cache_tags(self):
+        with current_app.test_request_context():
+            caching.add_cache_tags(caching.journal_tag("jid"), None)
+            caching.add_cache_tags(caching.issue_tag("iid"))
+
+            self.assertEqual(g.cache_tags, {"journal:jid", "issue:iid"})
+
+    def test_add_cache_tags_without_request(self):
+        caching.add_cache_tags(caching.journal_tag("jid"))
+
+    @patch("webapp.utils.caching.get_redis_client")
+    def test_store_cache_tags(self, mk_get_redis_client):
+        redis_client = MagicMock()
+        mk_get_redis_client.return_value = redis_client
+        pipeline = redis_client.pipeline.return_value
+
+        with current_app.test_request_context("/j/acron/"):
+            caching.cache_key_with_lang()
+            caching.add_cache_tags(caching.journal_tag("jid"))
+            caching.store_cache_tags(current_app.response_class())
+
+            pipeline.sadd.assert_called_once_with(
+                caching._tag_key("journal:jid"),
+                caching._key_prefix() + g.cache_key,
+            )
+            pipeline.execute.assert_called_once_with()
+
+    @patch("webapp.utils.caching.get_redis_client")
+    def test_store_cache_tags_without_cache_key(self, mk_get_redis_client):
+        with current_app.test_request_context("/j/acron/"):
+            caching.add_cache_tags(caching.journal_tag("jid"))
+            caching.store_cache_tags(current_app.response_class())
+
+        mk_get_redis_client.assert_not_called()
+
+    @patch("webapp.utils.caching.get_redis_client")
+    def test_invalidate_cache_tags(self, mk_get_redis_client):
+        redis_client = MagicMock()
+        redis_client.smembers.side_effect = [{b"key1", b"key2"}, {b"key2"}]
+        redis_client.delete.return_value = 2
+        mk_get_redis_client.return_value = redis_client
+
+        removed = caching.invalidate_cache_tags(["journal:jid", "article:aid"])
+
+        self.assertEqual(removed, 2)
+        self.assertEqual(
+            set(redis_client.delete.call_args_list[0][0]), {b"key1", b"key2"}
+        )
+
+    def test_invalidate_cache_tags_without_redis(self):
+        self.assertEqual(caching.invalidate_cache_tags(["journal:jid"]), 0)
@@ -0,0 +1,52 @@
+# coding: utf-8
+
+from flask import current_app
+from webapp.utils import http_client
+
+from .base import BaseTestCase
+
+
+class HttpClientTestCase(BaseTestCase):
+    def setUp(self):
+        super(HttpClientTestCase, self).setUp()
+        http_client.close_session()
+
+    def tearDown(self):
+        http_client.close_session()
+        super(HttpClientTestCase, self).tearDown()
+
+    def test_ssm_prefixes_with_default_port(self):
+        self.assertEqual(
+            http_client._ssm_prefixes("https://ssm.scielo.org:443"),
+            ["https://ssm.scielo.org:443/", "https://ssm.scielo.org/"],
+        )
+
+    def test_ssm_prefixes_with_custom_port(self):
+        self.assertEqual(
+            http_client._ssm_prefixes("http://ssm.scielo.org:8000"),
+            ["http://ssm.scielo.org:8000/"],
+        )
+
+    def test_get_session_returns_the_same_session(self):
+        self.assertIs(http_client.get_session(), http_client.get_session())
+
+    def test_ssm_urls_use_the_ssm_pool(self):
+        session = http_client.get_session()
+        ssm_adapter = session.get_adapter(
+            current_app.config["SSM_BASE_URI"] + "/media/assets/file.pdf"
+        )
+        other_adapter = session.get_adapter("https://www.scielo.org/")
+
+        self.assertIsNot(ssm_adapter, other_adapter)
+        self.assertEqual(
+            ssm_adapter._pool_maxsize, current_app.config["SSM_HTTP_POOL_MAXSIZE"]
+        )
+        self.assertEqual(
+            other_adapter._pool_maxsize, current_app.config["HTTP_POOL_MAXSIZE"]
+        )
+
+    def test_get_stats_without_session(self):
+        self.assertEqual(
+            http_client.get_stats(),
+            {"requests": 0, "new_connections": 0, "pool_hits": 0, "pools": []},
+        )
@@ -0,0 +1,63 @@
+# coding: utf-8
+
+import datetime
+import shutil
+import tempfile
+from unittest.mock import Mock
+
+from flask import current_app
+from webapp.utils import render_cache
+
+from .base import BaseTestCase
+
+
+class RenderCacheTestCase(BaseTestCase):
+    def setUp(self):
+        super(RenderCacheTestCase, self).setUp()
+        self.root = tempfile.mkdtemp()
+        self.previous_config = (
+            current_app.config.get("RENDER_CACHE_ENABLED"),
+            current_app.config.get("RENDER_CACHE_ROOT"),
+        )
+        current_app.config["RENDER_CACHE_ENABLED"] = True
+        current_app.config["RENDER_CACHE_ROOT"] = self.root
+        self.article = Mock(aid="aid1", updated=datetime.datetime(2020, 1, 1))
+
+    def tearDown(self):
+        (
+            current_app.config["RENDER_CACHE_ENABLED"],
+            current_app.config["RENDER_CACHE_ROOT"],
+        ) = self.previous_config
+        shutil.rmtree(self.root, ignore_errors=True)
+        super(RenderCacheTestCase, self).tearDown()
+
+    def test_load_returns_none_when_there_is_no_entry(self):
+        self.assertIsNone(render_cache.load(self.article, "pt"))
+
+    def test_store_and_load(self):
+        render_cache.store(self.article, "pt", "<p>pt</p>", ["pt", "en"])
+        self.assertEqual(
+            render_cache.load(self.article, "pt"), ("<p>pt</p>", ["pt", "en"])
+        )
+
+    def test_key_depends_on_lang_and_gs_abstract(self):
+        render_cache.store(self.article, "pt", "<p>pt</p>", ["pt"])
+        self.assertIsNone(render_cache.load(self.article, "en"))
+        self.assertIsNone(render_cache.load(self.article, "pt", gs_abstract=True))
+
+    def test_updated_article_does_not_use_previous_entry(self):
+        render_cache.store(self.article, "pt", "<p>pt</p>", ["pt"])
+        self.article.updated = datetime.datetime(2021, 1, 1)
+        self.assertIsNone(render_cache.load(self.article, "pt"))
+
+    def test_disabled_cache_does_not_store(self):
+        current_app.config["RENDER_CACHE_ENABLED"] = False
+        render_cache.store(self.article, "pt", "<p>pt</p>", ["pt"])
+        current_app.config["RENDER_CACHE_ENABLED"] = True
+        self.assertIsNone(render_cache.load(self.article, "pt"))
+
+    def test_clear_removes_all_entries(self):
+        render_cache.store(self.article, "pt", "<p>pt</p>", ["pt"])
+        render_cache.store(self.article, "en", "<p>en</p>", ["pt"])
+        self.assertEqual(render_cache.clear(), 2)
+        self.assertIsNone(render_cache.load(self.article, "pt"))
@@ -8,7 +8,6 @@ import rq_scheduler_dashboard
 from elasticapm.contrib.flask import ElasticAPM
 from flask import Flask, flash, redirect, request, url_for
 from flask_babelex import Babel, lazy_gettext
-from flask_caching import Cache
 from flask_htmlmin import HTMLMIN
 from flask_login import LoginManager, current_user
 from flask_mail import Mail
@@ -29,13 +28,15 @@ from raven.contrib.flask import Sentry
 from werkzeug.middleware.proxy_fix import ProxyFix
 from werkzeug.routing import BaseConverter
 
+from .stale_cache import StaleWhileRevalidateCache
+
 login_manager = LoginManager()
 dbmongo = MongoEngine()
 dbsql = SQLAlchemy()
 mail = Mail()
 babel = Babel()
 sentry = Sentry()
-cache = Cache()
+cache = StaleWhileRevalidateCache()
 
 
 from .main import custom_filters  # noqa
@@ -168,6 +169,15 @@ def create_app():
     mail.init_app(app)
     # Cache:
     if app.config["CACHE_ENABLED"]:
+        if app.config["CACHE_TYPE"] == "redis":
+            backend = None
+            if app.config["CACHE_LOCAL_ENABLED"]:
+                # cache local (em memória) na frente do redis
+                backend = "TwoTierRedisCache"
+            elif app.config["CACHE_COMPRESS_ENABLED"]:
+                backend = "CompressedRedisCache"
+            if backend:
+                app.config["CACHE_TYPE"] = "webapp.utils.cache_backends.%s" % backend
         cache.init_app(app, config=app.config)
     else:
         app.config["CACHE_TYPE"] = "null"
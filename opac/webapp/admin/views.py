@@ -34,7 +34,7 @@ from mongoengine import (
 )
 from mongoengine.errors import NotUniqueError
 from opac_schema.v1.models import Article, AuditLogEntry, Issue, Journal, Pages, Sponsor
-from webapp import choices, controllers, custom_filters, models
+from webapp import choices, controllers, custom_filters, models, signals
 from webapp.admin import custom_fields, forms
 from webapp.admin.ajax import CustomQueryAjaxModelLoader
 from webapp.admin.custom_filters import (
@@ -629,6 +629,17 @@ class JournalAdminView(OpacBaseAdminView):
         url_segment=__("Segmento de URL"),
     )
 
+    def after_model_change(self, form, model, is_created):
+        # remove do cache as páginas do periódico (ex.: ao alterar is_public)
+        signals.journals_changed.send(
+            current_app._get_current_object(), jids=[model.id]
+        )
+
+    def after_model_delete(self, model):
+        signals.journals_changed.send(
+            current_app._get_current_object(), jids=[model.id]
+        )
+
     @action("publish", _("Publicar"), ACTION_PUBLISH_CONFIRMATION_MSG)
     def publish(self, ids):
         try:
@@ -717,6 +728,13 @@ class IssueAdminView(OpacBaseAdminView):
         url_segment=__("Segmento de URL"),
     )
 
+    def after_model_change(self, form, model, is_created):
+        # remove do cache as páginas do número (ex.: ao alterar is_public)
+        signals.issues_changed.send(current_app._get_current_object(), issues=[model])
+
+    def after_model_delete(self, model):
+        signals.issues_changed.send(current_app._get_current_object(), issues=[model])
+
     @action("publish", _("Publicar"), ACTION_PUBLISH_CONFIRMATION_MSG)
     def publish(self, ids):
         try:
@@ -867,6 +885,17 @@ class ArticleAdminView(OpacBaseAdminView):
                 "error",
             )
 
+    def after_model_change(self, form, model, is_created):
+        # remove do cache as páginas do artigo (ex.: ao alterar is_public)
+        signals.articles_changed.send(
+            current_app._get_current_object(), articles=[model]
+        )
+
+    def after_model_delete(self, model):
+        signals.articles_changed.send(
+            current_app._get_current_object(), articles=[model]
+        )
+
     @action("publish", _("Publicar"), ACTION_PUBLISH_CONFIRMATION_MSG)
     def publish(self, ids):
         try:
@@ -50,6 +50,7 @@ import os
         - OPAC_MONGODB_PORT:    porta do banco (default: 27017)
         - OPAC_MONGODB_USER:    [opcional] usuário para acessar o banco (default: None)
         - OPAC_MONGODB_PASS:    [opcional] password para acessar o banco (default: None)
+        - OPAC_MONGODB_CHECK_QUERY_PLANS: registra na inicialização de cada processo web (gunicorn `manager:app`) um warning, com o plano de execução, para as consultas frequentes sem índice (ver `manager.py verify_indexes`). Variável booleana: 'False' (default: 'True')
 
       - Banco SQL:
         - OPAC_DATABASE_FILE:   nome do arquivo (sqlite) (default: 'opac.sqlite')
@@ -116,6 +117,20 @@ import os
         - OPAC_SSM_PORT: Porta de conexão com o SSM. Ex. '8000'. (default: '80')
         - OPAC_SSM_MEDIA_PATH: Path da pasta media do assests no SSM. Ex. '/media/assets/' -  (default: '/media/assets/')
         - OPAC_SSM_XML_URL_REWRITE: Troca o scheme + authority da URL armazenada em Article.xml por `OPAC_SSM_SCHEME + '://' + OPAC_SSM_DOMAIN + ':' + OPAC_SSM_PORT`. Variável booleana: 'False' (default: 'True')
+        - OPAC_SSM_STREAMING_ENABLED: Repassa os PDFs e mídias do SSM ao cliente em blocos, sem carregar o conteúdo em memória (exceto conteúdos de até OPAC_CACHE_MAX_RESPONSE_SIZE bytes). Variável booleana: 'False' (default: 'True')
+        - OPAC_SSM_STREAM_CHUNK_SIZE: Tamanho (em bytes) dos blocos repassados ao cliente. (default: 65536)
+        - OPAC_SSM_CONTENT_CACHE_ENABLED: Armazena no cache os XML, HTML, PDFs e mídias do SSM (de até OPAC_CACHE_MAX_RESPONSE_SIZE bytes) com o ETag/Last-Modified, revalidando-os com requisições condicionais (If-None-Match/If-Modified-Since). Variável booleana: 'True' (default: 'False')
+        - OPAC_SSM_CONTENT_CACHE_MAX_AGE: Tempo em segundos em que um conteúdo armazenado é usado sem revalidação no SSM. (default: 3600)
+        - OPAC_SSM_CONTENT_CACHE_TIMEOUT: Tempo de vida em segundos de um conteúdo armazenado, renovado a cada revalidação (304) no SSM. (default: 604800)
+        - OPAC_SSM_HTTP_POOL_MAXSIZE: Quantidade máxima de conexões persistentes (keep-alive) com o SSM mantidas por worker. (default: 20)
+        - OPAC_SSM_HTTP_POOL_BLOCK: Limita as conexões simultâneas com o SSM ao tamanho do pool, aguardando uma conexão livre. Variável booleana: 'True' (default: 'False')
+        - OPAC_HTTP_POOL_CONNECTIONS: Quantidade de hosts (exceto o SSM) com pool de conexões mantido por worker. (default: 10)
+        - OPAC_HTTP_POOL_MAXSIZE: Quantidade máxima de conexões persistentes por host (exceto o SSM) mantidas por worker. (default: 10)
+        - OPAC_HTTP_POOL_STATS_LOG_INTERVAL: Registra no log as estatísticas dos pools de conexões a cada N requisições. '0' desativa. (default: 1000)
+
+      - Cache do HTML dos artigos (gerado a partir do XML pelo packtools):
+        - OPAC_RENDER_CACHE_ENABLED: ativa/desativa o cache em disco do HTML gerado (default: 'True')
+        - OPAC_RENDER_CACHE_ROOT: pasta aonde ficam as entradas do cache (default: '/tmp/opac_render_cache')
 
       - Cookie de Sessão: (http://flask.pocoo.org/docs/0.12/config/#builtin-configuration-values)
         - OPAC_SERVER_NAME: Nome:IP do servidor - (default: None)
@@ -136,8 +151,22 @@ import os
         - OPAC_CACHE_REDIS_PORT: porta do servidor redis que vai ser usado no cache. (default: 6379)
         - OPAC_CACHE_REDIS_DB: nome de db do servidor redis que vai ser usado no cache (inteiro >= 0). (default: 0)
         - OPAC_CACHE_REDIS_PASSWORD: senha do servidor redis que vai ser usado no cache. (default = '')
+        - OPAC_CACHE_LOCAL_ENABLED: ativa/desativa o cache local (em memória, por worker) na frente do redis. (default: False)
+        - OPAC_CACHE_LOCAL_MAX_BYTES: tamanho máximo do cache local de cada worker em bytes. (default: 33554432)
+        - OPAC_CACHE_LOCAL_MAX_ITEM_BYTES: tamanho máximo de um item do cache local em bytes. (default: 1048576)
+        - OPAC_CACHE_LOCAL_TIMEOUT: tempo de vida dos objetos no cache local. Tempo medido em segundos (default: 30)
+        - OPAC_CACHE_LOCAL_STATS_LOG_INTERVAL: registra no log as estatísticas do cache a cada N leituras, 0 desativa. (default: 1000)
+        - OPAC_CACHE_COMPRESS_ENABLED: ativa/desativa a compressão (gzip) dos valores armazenados no redis. (default: False)
+        - OPAC_CACHE_COMPRESS_MIN_SIZE: tamanho mínimo em bytes de um valor para ser comprimido. (default: 1024)
+        - OPAC_CACHE_COMPRESS_LEVEL: nível de compressão, de 1 (mais rápido) a 9 (menor tamanho). (default: 6)
+        - OPAC_CACHE_STALE_WHILE_REVALIDATE: ativa/desativa o modo "stale-while-revalidate" das páginas no cache. (default: False)
+        - OPAC_CACHE_STALE_TIMEOUT: tempo em segundos que uma página expirada continua sendo servida enquanto é gerada novamente. (default: 3600)
+        - OPAC_CACHE_LOCK_TIMEOUT: tempo máximo em segundos do lock de geração de uma página. (default: 60)
+        - OPAC_CACHE_ENDPOINT_TIMEOUTS: tempo de vida das páginas no cache por endpoint, ex.: 'main.index=600,main.journal_detail=3600'. (default: '')
         - OPAC_SEND_FILE_MAX_AGE_DEFAULT: define um valor inteiro padrão para os arquivos estáticos servido pelo Werkzeug. (default = 604800) valor em segundos 604800 é igual a uma semana
+        - OPAC_CACHE_MAX_RESPONSE_SIZE: tamanho máximo (em bytes) das respostas armazenadas no cache; respostas maiores, ou repassadas em blocos (streaming), nunca são armazenadas. (default: 1048576)
         - OPAC_CACHE_CONTROL_MAX_AGE_HEADER: define o tempo de cache para as páginas, response header Cache-Control: public, max-age={VALUE}, (default = 604800) valor em segundos 604800 é igual a uma semana
+        - OPAC_ISSUE_INDEX_CHECK_INTERVAL: intervalo mínimo em segundos entre as verificações, no MongoDB, de alterações nos números de um periódico feitas por outros processos, para atualizar o índice de números no cache. (default: 60)
 
       - Pindom visitor insights:
         - OPAC_PINGDOM_VISITOR_INSIGHTS_JS_SRC: URL do JS para utilizar o Pingdom visitor insights (ex: `//rum-static.pingdom.net/pa-XXXXXXXXX.js`) (default: None)
@@ -161,6 +190,22 @@ import os
         - OPAC_RQ_REDIS_PASSWORD: senha do servidor de Redis (pode ser o mesmo server do Cache)
         - OPAC_MAILING_CRON_STRING: valor de cron padrão para o envio de emails
         - OPAC_DEFAULT_SCHEDULER_TIMEOUT: timeout do screduler cron (dafault: 1000).
+        - OPAC_PRERENDER_CRON_STRING: valor de cron para a pré-renderização dos artigos atualizados recentemente (default: '*/30 * * * *')
+        - OPAC_PRERENDER_DAYS: quantidade de dias considerados na pré-renderização agendada (default: 1)
+        - OPAC_PRERENDER_BATCH_SIZE: quantidade de artigos por job da fila 'prerender' (default: 50)
+        - OPAC_PRERENDER_CONCURRENCY: quantidade de renderizações simultâneas em cada worker (default: 4)
+        - OPAC_RECONCILE_JOURNALS_CRON_STRING: valor de cron para a reconciliação do último número e da quantidade de números dos periódicos (default: '*/15 * * * *')
+        - OPAC_RECONCILE_JOURNALS_DAYS: quantidade de dias considerados na primeira reconciliação agendada dos periódicos (default: 1)
+        - OPAC_JOURNAL_CATALOG_ENABLED: ativa/desativa o catálogo em memória (em cada worker) dos periódicos públicos usado pelas listas, buscas e download da lista de periódicos. Variável booleana: 'True' (default: 'False')
+        - OPAC_JOURNAL_CATALOG_MAX_AGE: tempo máximo em segundos de uma versão do catálogo de periódicos. (default: 600)
+        - OPAC_JOURNAL_CATALOG_CHECK_INTERVAL: intervalo mínimo em segundos entre as verificações, no MongoDB, de alterações dos periódicos feitas por outros processos. (default: 30)
+        - OPAC_PID_INDEX_ENABLED: ativa/desativa o índice dos PIDs legados dos artigos (no Redis do cache) usado pelas URLs antigas (/scielo.php, /cgi-bin/fbpe e /article/<pid>). Variável booleana: 'True' (default: 'False')
+        - OPAC_PID_INDEX_CRON_STRING: valor de cron para a atualização do índice de PIDs com os artigos atualizados (default: '*/10 * * * *')
+        - OPAC_PID_INDEX_DAYS: quantidade de dias considerados na primeira atualização agendada do índice de PIDs (default: 1)
+        - OPAC_JOURNAL_EXPORTS_ENABLED: ativa/desativa os arquivos pré-gerados (CSV e XLS) do download da lista de periódicos. Variável booleana: 'True' (default: 'False')
+        - OPAC_JOURNAL_EXPORTS_ROOT: path absoluto da pasta dos arquivos pré-gerados da lista de periódicos (default: '<OPAC_MEDIA_ROOT>/exports')
+        - OPAC_JOURNAL_EXPORTS_CRON_STRING: valor de cron para a geração dos arquivos da lista de periódicos, somente quando os periódicos foram alterados (default: '*/10 * * * *')
+        - OPAC_JOURNAL_EXPORTS_MAX_AGE: tempo máximo em segundos desde a última geração ou verificação dos arquivos da lista de periódicos; depois disso, a lista é gerada no momento do download. (default: 3600)
 
       - MathJax:
         - OPAC_MATHJAX_CDN_URL: string com a URL do mathjax padrão; ex: "https://cdnjs.cloudflare.com/ajax/libs/mathjax/2.7.5/latest.js?config=TeX-AMS-MML_HTMLorMML"
@@ -279,6 +324,11 @@ if MONGODB_USER and MONGODB_PASS:
     MONGODB_SETTINGS["username"] = MONGODB_USER
     MONGODB_SETTINGS["password"] = MONGODB_PASS
 
+# Verificação dos índices das consultas frequentes (ver webapp/db_indexes.py)
+MONGODB_CHECK_QUERY_PLANS = (
+    os.environ.get("OPAC_MONGODB_CHECK_QUERY_PLANS", "True") == "True"
+)
+
 
 # Configurações do banco de dados SQL
 # -*- DEVE SER AJUSTADO NA INSTALAÇÃO -*-
@@ -500,6 +550,34 @@ SSM_MEDIA_URI = "{scheme}://{domain}:{port}{path}".format(
     scheme=SSM_SCHEME, domain=SSM_DOMAIN, port=SSM_PORT, path=SSM_MEDIA_PATH
 )
 
+# Repasse em blocos (streaming) dos PDFs e mídias do SSM
+SSM_STREAMING_ENABLED = os.environ.get("OPAC_SSM_STREAMING_ENABLED", "True") == "True"
+SSM_STREAM_CHUNK_SIZE = int(os.environ.get("OPAC_SSM_STREAM_CHUNK_SIZE", 65536))
+
+# Cache dos conteúdos do SSM revalidados com requisições condicionais
+SSM_CONTENT_CACHE_ENABLED = (
+    os.environ.get("OPAC_SSM_CONTENT_CACHE_ENABLED", "False") == "True"
+)
+SSM_CONTENT_CACHE_MAX_AGE = int(
+    os.environ.get("OPAC_SSM_CONTENT_CACHE_MAX_AGE", 3600)
+)  # segundos
+SSM_CONTENT_CACHE_TIMEOUT = int(
+    os.environ.get("OPAC_SSM_CONTENT_CACHE_TIMEOUT", 604800)
+)  # segundos
+
+# Pools de conexões HTTP (keep-alive) mantidos por worker
+SSM_HTTP_POOL_MAXSIZE = int(os.environ.get("OPAC_SSM_HTTP_POOL_MAXSIZE", 20))
+SSM_HTTP_POOL_BLOCK = os.environ.get("OPAC_SSM_HTTP_POOL_BLOCK", "False") == "True"
+HTTP_POOL_CONNECTIONS = int(os.environ.get("OPAC_HTTP_POOL_CONNECTIONS", 10))
+HTTP_POOL_MAXSIZE = int(os.environ.get("OPAC_HTTP_POOL_MAXSIZE", 10))
+HTTP_POOL_STATS_LOG_INTERVAL = int(
+    os.environ.get("OPAC_HTTP_POOL_STATS_LOG_INTERVAL", 1000)
+)
+
+# Cache em disco do HTML dos artigos gerado pelo packtools
+RENDER_CACHE_ENABLED = os.environ.get("OPAC_RENDER_CACHE_ENABLED", "True") == "True"
+RENDER_CACHE_ROOT = os.environ.get("OPAC_RENDER_CACHE_ROOT", "/tmp/opac_render_cache")
+
 # session cookie settings:  z
 OPAC_SCHEME = os.environ.get("OPAC_OPAC_SCHEME", "https")
 SERVER_NAME = os.environ.get("OPAC_SERVER_NAME", None)
@@ -528,6 +606,39 @@ CACHE_REDIS_PORT = os.environ.get("OPAC_CACHE_REDIS_PORT", 6379)
 CACHE_REDIS_DB = os.environ.get("OPAC_CACHE_REDIS_DB", "0")
 CACHE_REDIS_PASSWORD = os.environ.get("OPAC_CACHE_REDIS_PASSWORD", None)
 
+# Cache local (em memória) na frente do redis (ver ``utils.cache_backends``)
+CACHE_LOCAL_ENABLED = os.environ.get("OPAC_CACHE_LOCAL_ENABLED", "False") == "True"
+CACHE_LOCAL_MAX_BYTES = int(os.environ.get("OPAC_CACHE_LOCAL_MAX_BYTES", 33554432))
+CACHE_LOCAL_MAX_ITEM_BYTES = int(
+    os.environ.get("OPAC_CACHE_LOCAL_MAX_ITEM_BYTES", 1048576)
+)
+CACHE_LOCAL_TIMEOUT = int(os.environ.get("OPAC_CACHE_LOCAL_TIMEOUT", 30))  # segundos
+CACHE_LOCAL_STATS_LOG_INTERVAL = int(
+    os.environ.get("OPAC_CACHE_LOCAL_STATS_LOG_INTERVAL", 1000)
+)
+
+# Compressão dos valores do cache (ver ``utils.cache_backends``)
+CACHE_COMPRESS_ENABLED = (
+    os.environ.get("OPAC_CACHE_COMPRESS_ENABLED", "False") == "True"
+)
+CACHE_COMPRESS_MIN_SIZE = int(os.environ.get("OPAC_CACHE_COMPRESS_MIN_SIZE", 1024))
+CACHE_COMPRESS_LEVEL = int(os.environ.get("OPAC_CACHE_COMPRESS_LEVEL", 6))
+
+# Stale-while-revalidate das páginas no cache (ver ``webapp.stale_cache``)
+CACHE_STALE_WHILE_REVALIDATE = (
+    os.environ.get("OPAC_CACHE_STALE_WHILE_REVALIDATE", "False") == "True"
+)
+CACHE_STALE_TIMEOUT = int(os.environ.get("OPAC_CACHE_STALE_TIMEOUT", 3600))  # segundos
+CACHE_LOCK_TIMEOUT = int(os.environ.get("OPAC_CACHE_LOCK_TIMEOUT", 60))  # segundos
+CACHE_ENDPOINT_TIMEOUTS = {
+    endpoint.strip(): int(timeout)
+    for endpoint, timeout in (
+        item.split("=")
+        for item in os.environ.get("OPAC_CACHE_ENDPOINT_TIMEOUTS", "").split(",")
+        if "=" in item
+    )
+}
+
 # https://flask.palletsprojects.com/en/2.0.x/config/#SEND_FILE_MAX_AGE_DEFAULT
 SEND_FILE_MAX_AGE_DEFAULT = os.environ.get("OPAC_SEND_FILE_MAX_AGE_DEFAULT", 604800)
 
@@ -536,6 +647,12 @@ SEND_FILE_MAX_AGE_DEFAULT = os.environ.get("OPAC_SEND_FILE_MAX_AGE_DEFAULT", 604
 CACHE_CONTROL_MAX_AGE_HEADER = os.environ.get(
     "OPAC_CACHE_CONTROL_MAX_AGE_HEADER", 604800
 )
+CACHE_MAX_RESPONSE_SIZE = int(os.environ.get("OPAC_CACHE_MAX_RESPONSE_SIZE", 1048576))
+
+# Índice dos números de cada periódico no cache (ver ``controllers.get_issue_index``)
+ISSUE_INDEX_CHECK_INTERVAL = int(
+    os.environ.get("OPAC_ISSUE_INDEX_CHECK_INTERVAL", 60)
+)  # segundos
 
 # Pingdom Visitor Insights:
 PINGDOM_VISITOR_INSIGHTS_JS_SRC = os.environ.get(
@@ -588,6 +705,46 @@ RQ_REDIS_SETTINGS = {
 MAILING_CRON_STRING = os.environ.get("OPAC_MAILING_CRON_STRING", "0 7 * * *")
 DEFAULT_SCHEDULER_TIMEOUT = int(os.environ.get("OPAC_DEFAULT_SCHEDULER_TIMEOUT", 1000))
 
+# Pré-renderização (fila 'prerender') dos artigos atualizados recentemente
+PRERENDER_CRON_STRING = os.environ.get("OPAC_PRERENDER_CRON_STRING", "*/30 * * * *")
+PRERENDER_DAYS = int(os.environ.get("OPAC_PRERENDER_DAYS", 1))
+PRERENDER_BATCH_SIZE = int(os.environ.get("OPAC_PRERENDER_BATCH_SIZE", 50))
+PRERENDER_CONCURRENCY = int(os.environ.get("OPAC_PRERENDER_CONCURRENCY", 4))
+
+# Reconciliação de last_issue e issue_count dos periódicos
+RECONCILE_JOURNALS_CRON_STRING = os.environ.get(
+    "OPAC_RECONCILE_JOURNALS_CRON_STRING", "*/15 * * * *"
+)
+RECONCILE_JOURNALS_DAYS = int(os.environ.get("OPAC_RECONCILE_JOURNALS_DAYS", 1))
+
+# Catálogo em memória dos periódicos públicos
+JOURNAL_CATALOG_ENABLED = (
+    os.environ.get("OPAC_JOURNAL_CATALOG_ENABLED", "False") == "True"
+)
+JOURNAL_CATALOG_MAX_AGE = int(
+    os.environ.get("OPAC_JOURNAL_CATALOG_MAX_AGE", 600)
+)  # segundos
+JOURNAL_CATALOG_CHECK_INTERVAL = int(
+    os.environ.get("OPAC_JOURNAL_CATALOG_CHECK_INTERVAL", 30)
+)  # segundos
+
+# Índice dos PIDs legados dos artigos
+PID_INDEX_ENABLED = os.environ.get("OPAC_PID_INDEX_ENABLED", "False") == "True"
+PID_INDEX_CRON_STRING = os.environ.get("OPAC_PID_INDEX_CRON_STRING", "*/10 * * * *")
+PID_INDEX_DAYS = int(os.environ.get("OPAC_PID_INDEX_DAYS", 1))
+
+# Arquivos pré-gerados do download da lista de periódicos
+JOURNAL_EXPORTS_ENABLED = (
+    os.environ.get("OPAC_JOURNAL_EXPORTS_ENABLED", "False") == "True"
+)
+JOURNAL_EXPORTS_ROOT = os.environ.get(
+    "OPAC_JOURNAL_EXPORTS_ROOT", os.path.join(MEDIA_ROOT, "exports")
+)
+JOURNAL_EXPORTS_CRON_STRING = os.environ.get(
+    "OPAC_JOURNAL_EXPORTS_CRON_STRING", "*/10 * * * *"
+)
+JOURNAL_EXPORTS_MAX_AGE = int(os.environ.get("OPAC_JOURNAL_EXPORTS_MAX_AGE", 3600))
+
 # MATH JAX
 DEFAULT_MATHJAX_CDN_URL = "https://cdnjs.cloudflare.com/ajax/libs/mathjax/2.7.5/latest.js?config=TeX-MML-AM_SVG"
 
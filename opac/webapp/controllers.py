@@ -6,9 +6,12 @@
     ou outras camadas superiores, evitando assim que as camadas superiores
     acessem diretamente a camada inferior de modelos.
 """
+import hashlib
 import logging
 import io
 import re
+import tempfile
+import time
 from collections import OrderedDict
 from datetime import datetime
 from uuid import uuid4
@@ -22,6 +25,7 @@ from flask_babelex import lazy_gettext as __
 from flask_mongoengine import Pagination
 from legendarium.formatter import descriptive_very_short_format
 from mongoengine import Q
+from mongoengine import signals as mongoengine_signals
 from mongoengine.errors import InvalidQueryError
 from opac_schema.v1.models import (
     Article,
@@ -36,8 +40,9 @@ from opac_schema.v1.models import (
 )
 from scieloh5m5 import h5m5
 from slugify import slugify
-from webapp import dbsql
+from webapp import cache, dbsql
 
+from . import journal_catalog, pid_index, projections, signals
 from .choices import INDEX_NAME, JOURNAL_STATUS, STUDY_AREAS
 from .models import User
 from .utils import utils
@@ -198,7 +203,7 @@ def get_press_releases(query_filter=None, order_by="-publication_date"):
 
 
 def get_journals(
-    title_query="", is_public=True, query_filter="", order_by="title_slug"
+    title_query="", is_public=True, query_filter="", order_by="title_slug", only=None
 ):
     """
     Retorna uma lista de periódicos considerando os parâmetros:
@@ -210,6 +215,7 @@ def get_journals(
         - "no-current" (somente periódicos não ativos)
     - ``order_by``: que corresponde ao nome de um atributo pelo qual
                     deve estar ordenada a lista resultante.
+    - ``only``: campos carregados de cada periódico (ver ``projections``).
     """
     filters = {}
 
@@ -232,7 +238,7 @@ def get_journals(
             is_public=is_public, title_slug__icontains=title_query_slug, **filters
         ).order_by(order_by)
 
-    return journals
+    return projections.project(journals, only)
 
 
 def get_journals_paginated(
@@ -242,6 +248,7 @@ def get_journals_paginated(
     order_by="title_slug",
     page=1,
     per_page=20,
+    only=None,
 ):
     """
     Retorna um objeto Pagination (flask-mongoengine) com a lista de periódicos filtrados
@@ -249,10 +256,11 @@ def get_journals_paginated(
     pelo parametro ``order_by``.
     Os parametros:
     - ``page`` indica o número da pagina;
-    - ``per_page`` indica o tamanho da pagina.
+    - ``per_page`` indica o tamanho da pagina;
+    - ``only`` campos carregados de cada periódico (ver ``projections``).
     """
 
-    journals = get_journals(title_query, is_public, query_filter, order_by)
+    journals = get_journals(title_query, is_public, query_filter, order_by, only)
     return Pagination(journals, page, per_page)
 
 
@@ -336,6 +344,25 @@ def get_journal_json_data(journal, language="pt"):
     return j_data
 
 
+def get_journals_with_json_data(
+    title_query="", is_public=True, query_filter="", order_by="title_slug", only=None
+):
+    """
+    Retorna a tupla (journals, json_data): a lista de periódicos (ver
+    ``get_journals``) e a função que gera os dados de cada periódico para o
+    frontend (ver ``get_journal_json_data``).
+
+    Os periódicos públicos são obtidos do catálogo em memória
+    (``journal_catalog``), quando ativo, e os seus dados são gerados uma única
+    vez por idioma.
+    """
+    if is_public and journal_catalog.is_enabled():
+        catalog = journal_catalog.get_catalog()
+        return catalog.filter(title_query, query_filter, order_by), catalog.json_data
+    journals = get_journals(title_query, is_public, query_filter, order_by, only)
+    return journals, get_journal_json_data
+
+
 def get_alpha_list_from_paginated_journals(
     title_query,
     is_public=True,
@@ -349,17 +376,14 @@ def get_alpha_list_from_paginated_journals(
     Retorna a estrutura de dados com a lista alfabética de periódicas, e da paginação para montar a listagem alfabética.
     """
 
-    journals = get_journals_paginated(
-        title_query=title_query,
-        query_filter=query_filter,
-        order_by=order_by,
-        page=page,
-        per_page=per_page,
+    journals, json_data = get_journals_with_json_data(
+        title_query, is_public, query_filter, order_by, projections.JOURNAL_LIST
     )
+    journals = Pagination(journals, page, per_page)
     journal_list = []
 
     for journal in journals.items:
-        j_data = get_journal_json_data(journal, lang)
+        j_data = json_data(journal, lang)
         journal_list.append(j_data)
 
     response_data = {
@@ -395,7 +419,33 @@ def get_journals_grouped_by(
         - para cada chave, se listam os periódicos nessa categoria, com a estrutura de dados
         retornada pela função: ``get_journal_json_data``
     """
-    journals = get_journals(title_query, is_public, query_filter, order_by)
+    if (
+        is_public
+        and not (title_query and title_query.strip())
+        and order_by == "title_slug"
+        and journal_catalog.is_enabled()
+    ):
+        # agrupamento já gerado pelo catálogo
+        return journal_catalog.get_catalog().groups(grouper_field, query_filter, lang)
+
+    journals, json_data = get_journals_with_json_data(
+        title_query, is_public, query_filter, order_by, projections.JOURNAL_GROUPED_LIST
+    )
+    return group_journals(journals, grouper_field, json_data, lang)
+
+
+def group_journals(journals, grouper_field, json_data=None, lang="pt"):
+    """
+    Agrupa a lista ``journals`` pelo campo ``grouper_field``.
+    Retorna a estrutura de dados descrita em ``get_journals_grouped_by``.
+    ``json_data`` é a função que gera os dados de cada periódico (por padrão,
+    ``get_journal_json_data``).
+    """
+    json_data = json_data or get_journal_json_data
+    grouper_choices = {
+        "index_at": INDEX_NAME,
+        "study_areas": STUDY_AREAS,
+    }.get(grouper_field, {})
 
     groups_dict = {}
 
@@ -404,19 +454,13 @@ def get_journals_grouped_by(
         if grouper_field_iterable:
             if isinstance(grouper_field_iterable, str):
                 grouper_field_iterable = [grouper_field_iterable]
-            grouper_choices = {
-                "index_at": INDEX_NAME,
-                "study_areas": STUDY_AREAS,
-            }
-            j_data = get_journal_json_data(journal, lang)
+            j_data = json_data(journal, lang)
             for grouper in grouper_field_iterable:
-                grouper = grouper_choices.get(grouper_field, {}).get(
-                    grouper.upper(), grouper
-                )
+                grouper = grouper_choices.get(grouper.upper(), grouper)
                 groups_dict.setdefault(str(grouper), []).append(j_data)
 
     meta = {
-        "total": journals.count(),
+        "total": len(journals),
         "themes_count": len(list(groups_dict.keys())),
     }
 
@@ -430,10 +474,18 @@ def get_journal_generator_for_csv(
     order_by="title_slug",
     extension="xls",
 ):
-    def format_csv_row(list_type, journal):
-        if not journal.last_issue or journal.last_issue.type not in ("volume_issue", "regular"):
-            set_last_issue_and_issue_count(journal)
+    """
+    Retorna a lista de periódicos ``list_type`` ("alpha", "areas", "wos" ou
+    "publisher") para download:
+
+    - no formato "csv", um gerador das linhas (bytes) do arquivo, produzidas
+      à medida que são lidas;
+    - no formato "xls", um arquivo temporário, posicionado no início, com a
+      planilha gerada no modo ``constant_memory`` do xlsxwriter. O arquivo é
+      removido ao ser fechado.
+    """
 
+    def format_csv_row(list_type, journal):
         if not journal.last_issue:
             last_issue_volume = ""
             last_issue_number = ""
@@ -492,22 +544,18 @@ def get_journal_generator_for_csv(
         order_by = "publisher_name"
         worksheet_name = _("Lista by Institution")
 
-    journals = get_journals(title_query, is_public, order_by=order_by)
-
-    if extension == "csv":
-        csv_file = io.BytesIO()
-        csv_writer = unicodecsv.writer(csv_file, encoding="utf-8")
-        csv_writer.writerow(csv_headers)
+    journals, json_data = get_journals_with_json_data(
+        title_query, is_public, order_by=order_by
+    )
 
-        for journal in journals:
-            csv_writer.writerow(format_csv_row(list_type, journal))
-        csv_file.seek(0)
+    rows = (format_csv_row(list_type, journal) for journal in journals)
 
-        return csv_file.getvalue()
+    if extension == "csv":
+        return generate_csv(csv_headers, rows)
     else:
-        output = io.BytesIO()
+        output = tempfile.TemporaryFile()
 
-        workbook = xlsxwriter.Workbook(output, {"in_memory": True})
+        workbook = xlsxwriter.Workbook(output, {"constant_memory": True})
 
         worksheet = workbook.add_worksheet(worksheet_name)
         worksheet.set_column("A:A", 50)
@@ -525,8 +573,9 @@ def get_journal_generator_for_csv(
         cell_format = workbook.add_format()
         cell_head_format.set_font_size(10)
 
-        for i, journal in enumerate(journals):
-            for j, data in enumerate(format_csv_row(list_type, journal)):
+        # no modo constant_memory as linhas devem ser escritas em ordem
+        for i, row in enumerate(rows):
+            for j, data in enumerate(row):
                 # Adiciona 1 ao índice para maner o cabeçalho.
                 worksheet.write(i + 1, j, data, cell_format)
 
@@ -534,7 +583,24 @@ def get_journal_generator_for_csv(
 
         output.seek(0)
 
-        return output.read()
+        return output
+
+
+def generate_csv(headers, rows):
+    """
+    Gera, uma a uma, as linhas (bytes, em UTF-8) do arquivo CSV com o
+    cabeçalho ``headers`` e as linhas ``rows``.
+    """
+    buffer = io.BytesIO()
+    csv_writer = unicodecsv.writer(buffer, encoding="utf-8")
+
+    csv_writer.writerow(headers)
+    for row in rows:
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        csv_writer.writerow(row)
+    yield buffer.getvalue()
 
 
 def get_journal_by_jid(jid, **kwargs):
@@ -658,6 +724,8 @@ def set_journal_is_public_bulk(jids, is_public=True, reason=""):
         journal.unpublish_reason = reason
         journal.save()
 
+    signals.journals_changed.send(current_app._get_current_object(), jids=jids)
+
 
 # -------- ISSUE --------
 
@@ -669,15 +737,19 @@ def get_issues_by_jid(jid, **kwargs):
 
     - ``jid``: string, chave primaria do periódico (ex.: ``f8c87833e0594d41a89fe60455eaa5a5``);
     - ``kwargs``: parâmetros de filtragem, utilize a chave ``order_by` para indicar
-    uma lista de ordenação.
+    uma lista de ordenação e a chave ``only`` para indicar os campos carregados
+    (ver ``projections``).
     """
     try:
         order_by = kwargs["order_by"]
         del kwargs["order_by"]
     except KeyError:
         order_by = ["-year", "-volume", "-order"]
+    only = kwargs.pop("only", None)
 
-    return Issue.objects(journal=jid, **kwargs).order_by(*order_by)
+    return projections.project(
+        Issue.objects(journal=jid, **kwargs).order_by(*order_by), only
+    )
 
 
 def get_issues_for_grid_by_jid(jid, **kwargs):
@@ -687,10 +759,12 @@ def get_issues_for_grid_by_jid(jid, **kwargs):
 
     - ``jid``: string, chave primaria do periódico (ex.: ``f8c87833e0594d41a89fe60455eaa5a5``);
     - ``kwargs``: parâmetros de filtragem, utilize a chave ``order_by` para indicar
-    uma lista de ordenação.
+    uma lista de ordenação e a chave ``only`` para indicar os campos carregados
+    (ver ``projections``).
     """
 
     order_by = kwargs.get("order_by", None)
+    only = kwargs.pop("only", None)
 
     if order_by:
         del kwargs["order_by"]
@@ -699,21 +773,29 @@ def get_issues_for_grid_by_jid(jid, **kwargs):
 
     issues = []
     issues_without_ahead = []
+    issue_ahead = None
+    last_issue = None
 
-    if get_journal_by_jid(jid):
+    journal = get_journal_by_jid(jid)
+    if journal:
         issues = Issue.objects(
             journal=jid,
             type__in=["ahead", "regular", "special", "supplement", "volume_issue"],
             **kwargs,
         ).order_by(*order_by)
-        issue_ahead = issues.filter(type="ahead").first()
+        issues = list(projections.project(issues, only))
+        last_issue = journal.last_issue
+
+        # quantidade de artigos públicos de cada número, em uma única consulta
+        articles_count = count_articles_by_issue(jid)
 
+        issue_ahead = next((issue for issue in issues if issue.type == "ahead"), None)
         if issue_ahead:
             # Verifica que contém artigos no issue de ahead
-            if not get_articles_by_iid(issue_ahead.id, is_public=True):
+            if not articles_count.get(issue_ahead.id):
                 issue_ahead = None
 
-        issues_without_ahead = issues.filter(type__ne="ahead")
+        issues_without_ahead = [issue for issue in issues if issue.type != "ahead"]
 
     volume_issue = {}
 
@@ -725,9 +807,7 @@ def get_issues_for_grid_by_jid(jid, **kwargs):
         if issue.type == "volume_issue":
             volume_issue.setdefault(issue.volume, {})
             volume_issue[issue.volume]["issue"] = issue
-            volume_issue[issue.volume]["art_count"] = len(
-                get_articles_by_iid(issue.iid, is_public=True)
-            )
+            volume_issue[issue.volume]["art_count"] = articles_count.get(issue.id, 0)
 
         key_volume = issue.volume
 
@@ -741,10 +821,6 @@ def get_issues_for_grid_by_jid(jid, **kwargs):
     else:
         previous_issue = None
 
-    # o primiero item da lista é o último número.
-    # condicional para verificar se issues contém itens
-    last_issue = issues[0].journal.last_issue
-
     return {
         "ahead": issue_ahead,  # ahead of print
         "ordered_for_grid": result_dict,  # lista de números odenadas para a grade
@@ -754,6 +830,185 @@ def get_issues_for_grid_by_jid(jid, **kwargs):
     }
 
 
+def count_articles_by_issue(jid, is_public=True):
+    """
+    Retorna um dicionário com a quantidade de artigos (``is_public``, sem
+    embargo) de cada número do periódico ``jid``: ``{iid: quantidade}``.
+    Os números sem artigos não estão presentes no dicionário.
+
+    As quantidades são obtidas com uma única consulta agregada.
+    """
+    kwargs = add_filter_without_embargo({"is_public": is_public})
+    result = Article.objects(journal=jid, **kwargs).aggregate(
+        {"$group": {"_id": "$issue", "count": {"$sum": 1}}}
+    )
+    return {
+        getattr(item["_id"], "id", item["_id"]): item["count"]
+        for item in result
+        if item["_id"] is not None
+    }
+
+
+class IssueIndexEntry(object):
+    """
+    Item do índice de números de um periódico (ver ``get_issue_index``).
+    Expõe os atributos de ``Issue`` usados na navegação entre os números.
+    """
+
+    def __init__(self, data):
+        self.__dict__.update(data)
+
+    def __eq__(self, other):
+        return getattr(other, "iid", None) == self.iid
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __hash__(self):
+        return hash(self.iid)
+
+
+ISSUE_INDEX_KEY = "issue-index:%s"
+
+
+def _make_issue_index_entry(issue):
+    return {
+        "iid": issue.iid,
+        "url_segment": issue.url_segment,
+        "type": issue.type,
+        "year": issue.year,
+        "volume": issue.volume,
+        "number": issue.number,
+        "suppl_text": issue.suppl_text,
+        "order": issue.order,
+    }
+
+
+def _is_ahead(issue):
+    return issue.type == "ahead" or issue.number == "ahead"
+
+
+def build_issue_index(jid):
+    """
+    Monta o índice dos números públicos do periódico ``jid``::
+
+        {
+            "issues": [...],  # números (exceto ahead) do mais antigo ao mais recente
+            "positions": {iid: posição em "issues"},
+            "last_issue": ...,  # último número regular (regular ou volume_issue)
+            "aop": ...,  # número ahead mais recente
+        }
+    """
+    issues = Issue.objects(journal=jid, is_public=True).order_by("year", "order")
+    issues = projections.project(issues, projections.ISSUE_GRID)
+
+    index = {"issues": [], "positions": {}, "last_issue": None, "aop": None}
+    for issue in issues:
+        entry = _make_issue_index_entry(issue)
+        if _is_ahead(issue):
+            index["aop"] = entry
+            continue
+        index["positions"][issue.iid] = len(index["issues"])
+        index["issues"].append(entry)
+        if issue.type in ("regular", "volume_issue"):
+            index["last_issue"] = entry
+    return index
+
+
+def _issue_index_fingerprint(jid):
+    """
+    Retorna uma "impressão digital" dos números do periódico ``jid``
+    (quantidade, quantidade de públicos e maior data de atualização), obtida
+    com uma única consulta agregada, sem carregar os números.
+    """
+    result = list(
+        Issue.objects(journal=jid).aggregate(
+            {
+                "$group": {
+                    "_id": None,
+                    "count": {"$sum": 1},
+                    "public": {"$sum": {"$cond": ["$is_public", 1, 0]}},
+                    "updated": {"$max": "$updated"},
+                }
+            }
+        )
+    )
+    if not result:
+        return "0|0|None"
+    return "%(count)s|%(public)s|%(updated)s" % result[0]
+
+
+def get_issue_index(jid):
+    """
+    Retorna o índice dos números do periódico ``jid`` (ver ``build_issue_index``)
+    armazenado no cache.
+
+    O índice é removido do cache quando um número do periódico é salvo ou
+    removido neste processo (ver ``invalidate_issue_index``). As alterações
+    feitas diretamente no MongoDB (opac-airflow) são verificadas, com a
+    "impressão digital" dos números (ver ``_issue_index_fingerprint``), no
+    máximo a cada ``ISSUE_INDEX_CHECK_INTERVAL`` segundos.
+    """
+    cache_key = ISSUE_INDEX_KEY % jid
+    index = cache.get(cache_key)
+    now = time.time()
+    if (
+        index is not None
+        and index["checked"] + current_app.config["ISSUE_INDEX_CHECK_INTERVAL"] > now
+    ):
+        return index
+
+    fingerprint = _issue_index_fingerprint(jid)
+    if index is None or index["fingerprint"] != fingerprint:
+        index = build_issue_index(jid)
+        index["fingerprint"] = fingerprint
+    index["checked"] = now
+    cache.set(cache_key, index)
+    return index
+
+
+def invalidate_issue_index(jid):
+    cache.delete(ISSUE_INDEX_KEY % jid)
+
+
+def _invalidate_issue_index_on_change(sender, document, **kwargs):
+    journal = document._data.get("journal")
+    if journal is not None:
+        invalidate_issue_index(getattr(journal, "id", journal))
+
+
+mongoengine_signals.post_save.connect(_invalidate_issue_index_on_change, sender=Issue)
+mongoengine_signals.post_delete.connect(_invalidate_issue_index_on_change, sender=Issue)
+
+
+def get_adjacent_issues(jid, issue):
+    """
+    Retorna a tupla (anterior, posterior) de ``issue`` na ordem cronológica
+    dos números do periódico ``jid``, consultando o índice de números.
+    O número posterior ao mais recente é o ahead, se existir, e o número
+    anterior ao ahead é o mais recente.
+    """
+    index = get_issue_index(jid)
+    issues = index["issues"]
+
+    if _is_ahead(issue):
+        previous, next_ = (issues[-1] if issues else None), None
+    else:
+        position = index["positions"].get(issue.iid)
+        if position is None:
+            return None, None
+        previous = issues[position - 1] if position > 0 else None
+        if position + 1 < len(issues):
+            next_ = issues[position + 1]
+        else:
+            # aop
+            next_ = index["aop"]
+    return (
+        IssueIndexEntry(previous) if previous else None,
+        IssueIndexEntry(next_) if next_ else None,
+    )
+
+
 def get_issue_nav_bar_data(journal=None, issue=None):
     """
     Retorna quanto à navegação os itens anterior e posterior,
@@ -761,49 +1016,23 @@ def get_issue_nav_bar_data(journal=None, issue=None):
     Caso issue não é informado, considera-se que o issue em questão
     é o último issue regular odendo ter como item posterior
     um suplemento, um número especial, um ahead ou nenhum item
+
+    Os itens são obtidos do índice de números do periódico (ver
+    ``get_issue_index``), sem consultas ao MongoDB quando o índice está no cache.
     """
     if issue:
         journal = issue.journal
         last_issue = None
-
-    elif journal:
-        if not journal.last_issue or journal.last_issue.type not in ("volume_issue", "regular") or journal.last_issue.type not in ("volume_issue", "regular"):
-            set_last_issue_and_issue_count(journal)
-
-        last_issue = get_issue_by_iid(journal.last_issue.iid)
-
-    item = issue or last_issue
-
-    if item.type == "ahead" or item.number == "ahead":
-        previous = Issue.objects(
-            journal=journal,
-            number__ne="ahead",
-        ).order_by("-year", "-order").first()
-        next_ = None
+        item = issue
     else:
-        try:
-            previous = Issue.objects(
-                journal=journal,
-                year__lte=item.year,
-                order__lte=item.order,
-                number__ne="ahead",
-            ).order_by("-year", "-order")[1]
-        except IndexError:
-            previous = None
+        last_issue = get_issue_index(journal.id)["last_issue"]
+        last_issue = IssueIndexEntry(last_issue) if last_issue else None
+        item = last_issue
 
-        try:
-            next_ = Issue.objects(
-                journal=journal,
-                year__gte=item.year,
-                order__gte=item.order,
-                number__ne="ahead",
-            ).order_by("year", "order")[1]
-        except IndexError:
-            # aop
-            next_ = Issue.objects(
-                journal=journal,
-                number="ahead",
-            ).order_by("-year", "-order").first()
+    if item is None:
+        previous, next_ = None, None
+    else:
+        previous, next_ = get_adjacent_issues(journal.id, item)
 
     return {
         "previous_item": previous,
@@ -813,26 +1042,34 @@ def get_issue_nav_bar_data(journal=None, issue=None):
     }
 
 
-def set_last_issue_and_issue_count(journal):
+def reconcile_journal(journal):
     """
-    O último issue tem que ser um issue regular, não pode ser aop, nem suppl, nem especial
+    Atualiza ``issue_count`` e ``last_issue`` do periódico ``journal`` a partir
+    dos seus números públicos. O último issue tem que ser um issue regular,
+    não pode ser aop, nem suppl, nem especial.
+
+    O periódico só é gravado quando algum dos valores muda.
+    Retorna True se o periódico foi atualizado.
     """
     try:
-        order_by = ["-year", "-order"]
         issues = Issue.objects(
             journal=journal,
             type__in=["regular", "volume_issue"],
             is_public=True,
         )
-        journal.issue_count = issues.count()
-        journal.save()
+        issue_count = issues.count()
+        last_issue = issues.order_by("-year", "-order").first()
     except Exception as e:
-        logging.exception(f"Unable to set_last_issue_and_issue_count for {journal.id}: {e} {type(e)}")
+        logging.exception(
+            f"Unable to reconcile_journal for {journal.id}: {e} {type(e)}"
+        )
+        return False
 
-    try:
-        last_issue = issues.order_by(*order_by).first()
+    changed = journal.issue_count != issue_count
+    journal.issue_count = issue_count
 
-        journal.last_issue = LastIssue(
+    if last_issue:
+        new_last_issue = LastIssue(
             volume=last_issue.volume,
             number=last_issue.number,
             year=last_issue.year,
@@ -844,12 +1081,66 @@ def set_last_issue_and_issue_count(journal):
             iid=last_issue.iid,
             url_segment=last_issue.url_segment,
         )
-        journal.save()
-    except Exception as e:
-        logging.exception(f"Unable to set_last_issue_and_issue_count for {journal.id}: {e} {type(e)}")
+        if journal.last_issue != new_last_issue:
+            journal.last_issue = new_last_issue
+            changed = True
+
+    if changed:
+        try:
+            journal.save()
+        except Exception as e:
+            logging.exception(
+                f"Unable to reconcile_journal for {journal.id}: {e} {type(e)}"
+            )
+            return False
+    return changed
+
+
+def set_last_issue_and_issue_count(journal):
+    """
+    O último issue tem que ser um issue regular, não pode ser aop, nem suppl, nem especial
+
+    Não deve ser chamado durante a renderização das páginas, os valores são
+    mantidos pela reconciliação dos periódicos (ver ``reconcile_journals``).
+    """
+    reconcile_journal(journal)
     return journal
 
 
+def get_jids_to_reconcile(since=None):
+    """
+    Retorna os ids dos periódicos cujos ``issue_count`` e ``last_issue`` devem
+    ser reconciliados: todos, caso ``since`` não seja informado (inclusive os
+    que estão sem último número regular), senão somente os periódicos com
+    números atualizados a partir de ``since``.
+    """
+    if since is None:
+        return list(Journal.objects.scalar("id"))
+
+    result = Issue.objects(updated__gte=since).aggregate(
+        {"$group": {"_id": "$journal"}}
+    )
+    return [
+        getattr(item["_id"], "id", item["_id"])
+        for item in result
+        if item["_id"] is not None
+    ]
+
+
+def reconcile_journals(jids):
+    """
+    Reconcilia ``issue_count`` e ``last_issue`` dos periódicos ``jids``
+    (ver ``reconcile_journal``).
+    Retorna ``{"total": .., "updated": ..}``.
+    """
+    result = {"total": 0, "updated": 0}
+    for journal in Journal.objects(id__in=list(jids)):
+        result["total"] += 1
+        if reconcile_journal(journal):
+            result["updated"] += 1
+    return result
+
+
 def journal_last_issues():
     for j in Journal.objects.filter(last_issue=None):
         set_last_issue_and_issue_count(j)
@@ -929,11 +1220,14 @@ def set_issue_is_public_bulk(iids, is_public=True, reason=""):
     if not iids:
         raise ValueError(__("Obrigatório uma lista de ids."))
 
-    for issue in list(get_issues_by_iid(iids).values()):
+    issues = list(get_issues_by_iid(iids).values())
+    for issue in issues:
         issue.is_public = is_public
         issue.unpublish_reason = reason
         issue.save()
 
+    signals.issues_changed.send(current_app._get_current_object(), issues=issues)
+
 
 def get_issue_by_acron_issue(jacron, year, issue_label):
     """
@@ -1253,6 +1547,35 @@ def get_articles_by_aid(aids):
     return articles
 
 
+def prefetch_references(articles, fields=("journal", "issue")):
+    """
+    Resolve as referências ``fields`` (ex.: ``journal`` e ``issue``) de uma
+    lista de artigos com uma única consulta (``$in``) por coleção, evitando
+    uma consulta ao MongoDB por artigo ao acessar ``article.journal`` ou
+    ``article.issue``.
+
+    Os documentos obtidos são atribuídos aos artigos, que são retornados
+    em uma lista, na mesma ordem.
+    """
+    articles = list(articles)
+    for field_name in fields:
+        document_type = Article._fields[field_name].document_type
+        ids = {}
+        for article in articles:
+            value = article._data.get(field_name)
+            if value is None or isinstance(value, document_type):
+                continue
+            ids[article.pk] = getattr(value, "id", value)
+        if not ids:
+            continue
+        documents = document_type.objects.in_bulk(list(set(ids.values())))
+        for article in articles:
+            document = documents.get(ids.get(article.pk))
+            if document is not None:
+                article._data[field_name] = document
+    return articles
+
+
 def set_article_is_public_bulk(aids, is_public=True, reason=""):
     """
     Atualiza uma lista de artigos como público ou não público.
@@ -1266,11 +1589,14 @@ def set_article_is_public_bulk(aids, is_public=True, reason=""):
     if not aids:
         raise ValueError(__("Obrigatório uma lista de ids."))
 
-    for article in list(get_articles_by_aid(aids).values()):
+    articles = list(get_articles_by_aid(aids).values())
+    for article in articles:
         article.is_public = is_public
         article.unpublish_reason = reason
         article.save()
 
+    signals.articles_changed.send(current_app._get_current_object(), articles=articles)
+
 
 def set_article_display_full_text_bulk(aids=[], display=True):
     """Altera o status de exibição do texto completo de uma lista de artigos"""
@@ -1278,10 +1604,13 @@ def set_article_display_full_text_bulk(aids=[], display=True):
     if aids is None or len(aids) == 0:
         raise ValueError(__("Obrigatório uma lista de ids."))
 
-    for article in list(get_articles_by_aid(aids).values()):
+    articles = list(get_articles_by_aid(aids).values())
+    for article in articles:
         article.display_full_text = display
         article.save()
 
+    signals.articles_changed.send(current_app._get_current_object(), articles=articles)
+
 
 def get_articles_by_iid(iid, **kwargs):
     """
@@ -1289,13 +1618,15 @@ def get_articles_by_iid(iid, **kwargs):
     é igual ao parâmetro: ``iid`` ordenado pelo atributo order.
 
     - ``iid``: chave primaria de número para escolher os artigos.
-    - ``kwargs``: parâmetros de filtragem.
+    - ``kwargs``: parâmetros de filtragem, utilize a chave ``only`` para
+    indicar os campos carregados (ver ``projections``).
 
     Em caso de não existir itens retorna {}.
 
     """
     if not iid:
         raise ValueError(__("Obrigatório um iid."))
+    only = kwargs.pop("only", None)
 
     # add filter publication_date__lte_today_date
     kwargs = add_filter_without_embargo(kwargs)
@@ -1305,12 +1636,131 @@ def get_articles_by_iid(iid, **kwargs):
     # todas as datas são iguais, então, `order_by`,
     # poderia ser chamado uma única vez
     # No entanto, há um issue relacionado: #1435
-    articles = Article.objects(issue=iid, **kwargs).order_by("order")
+    articles = projections.project(
+        Article.objects(issue=iid, **kwargs).order_by("order"), only
+    )
     if is_aop_issue(articles):
         return articles.order_by("-publication_date")
     return articles
 
 
+class TocEntry(object):
+    """
+    Item do sumário de um número (``issue/toc.html``).
+
+    Contém somente os dados do artigo exibidos no sumário, já no idioma do
+    sumário, e expõe os mesmos atributos e métodos de ``Article`` usados no
+    template.
+    """
+
+    def __init__(self, data):
+        self.__dict__.update(data)
+
+    def get_title_by_lang(self, lang):
+        return self.titles.get(lang, self.title)
+
+    def get_section_by_lang(self, lang):
+        return self.sections.get(lang, self.section)
+
+    def get_abstract_by_lang(self, lang):
+        return self.abstracts.get(lang)
+
+
+def _make_toc_entry_data(article, lang):
+    return {
+        "id": str(article.id),
+        "aid": article.aid,
+        "pid": article.pid,
+        "doi": article.doi,
+        "publication_date": article.publication_date,
+        "title": article.title,
+        "titles": {lang: article.get_title_by_lang(lang)},
+        "section": article.section,
+        "sections": {lang: article.get_section_by_lang(lang)},
+        "authors": list(article.authors or []),
+        "abstract_languages": list(article.abstract_languages or []),
+        "abstracts": {
+            abstract_lang: article.get_abstract_by_lang(abstract_lang)
+            for abstract_lang in article.abstract_languages or []
+        },
+        "article_text_languages": sorted({doc["lang"] for doc in article.htmls}),
+        "article_pdf_languages": sorted(
+            {(doc["lang"], doc["url"]) for doc in article.pdfs}
+        ),
+        "has_math_content": "mml:" in (article.title or ""),
+    }
+
+
+def _make_toc_fingerprint(count, updated, aids):
+    raw = "|".join(
+        [str(count), str(updated), ",".join(sorted(str(aid) for aid in aids))]
+    )
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _issue_toc_fingerprint(iid):
+    """
+    Retorna uma "impressão digital" dos artigos públicos do número ``iid``
+    (quantidade, ids e maior data de atualização), obtida com uma única
+    consulta agregada, sem carregar os artigos.
+    """
+    kwargs = add_filter_without_embargo({"is_public": True})
+    result = list(
+        Article.objects(issue=iid, **kwargs).aggregate(
+            {
+                "$group": {
+                    "_id": None,
+                    "count": {"$sum": 1},
+                    "updated": {"$max": "$updated"},
+                    "ids": {"$push": "$_id"},
+                }
+            }
+        )
+    )
+    if not result:
+        return _make_toc_fingerprint(0, None, [])
+    return _make_toc_fingerprint(
+        result[0]["count"], result[0]["updated"], result[0]["ids"]
+    )
+
+
+def get_issue_toc(iid, lang):
+    """
+    Retorna o sumário do número ``iid`` no idioma ``lang``:
+    ``{"entries": [TocEntry, ...], "sections": [...]}``
+
+    O sumário é uma projeção compacta dos artigos públicos armazenada no
+    cache, reconstruída somente quando a "impressão digital" dos artigos
+    (ver ``_issue_toc_fingerprint``) muda.
+    """
+    if not iid:
+        raise ValueError(__("Obrigatório um iid."))
+
+    cache_key = "issue-toc:%s:%s" % (iid, lang)
+    toc = cache.get(cache_key)
+
+    if not toc or toc["fingerprint"] != _issue_toc_fingerprint(iid):
+        articles = list(
+            get_articles_by_iid(iid, is_public=True, only=projections.ISSUE_TOC_ARTICLE)
+        )
+        updated = [a.updated for a in articles if a.updated]
+        toc = {
+            "fingerprint": _make_toc_fingerprint(
+                len(articles),
+                max(updated) if updated else None,
+                [a.pk for a in articles],
+            ),
+            "entries": [_make_toc_entry_data(article, lang) for article in articles],
+            "sections": sorted({a.section.upper() for a in articles if a.section}),
+        }
+        cache.set(cache_key, toc)
+
+    return {
+        "entries": [TocEntry(data) for data in toc["entries"]],
+        "sections": toc["sections"],
+    }
+
+
 def is_aop_issue(articles):
     """
     É um conjunto de artigos "ahead of print
@@ -1432,10 +1882,59 @@ def get_article_by_pid_v2(v2, **kwargs):
     return None
 
 
-def get_recent_articles_of_issue(issue_iid, is_public=True):
+class LegacyArticle(object):
+    """
+    Artigo obtido a partir de um PID legado (ver ``get_legacy_article``).
+    Expõe os atributos usados no redirecionamento para o artigo:
+    ``aid``, ``url_seg``, ``languages`` e ``original_language``.
+    """
+
+    def __init__(self, data):
+        self.__dict__.update(data)
+
+    @classmethod
+    def from_article(cls, article):
+        return cls(
+            {
+                "aid": article.aid,
+                "url_seg": article.journal.url_segment,
+                "languages": list(article.languages or []),
+                "original_language": article.original_language,
+            }
+        )
+
+
+def get_legacy_article(pid, kind=pid_index.V2, get_article=None):
+    """
+    Retorna o ``LegacyArticle`` do artigo com o PID legado ``pid`` ou None.
+
+    - ``kind``: ``pid_index.V1`` (``scielo_pids.v1``) ou ``pid_index.V2``
+      (``pid``, ``aop_pid`` e ``scielo_pids.other``).
+    - ``get_article``: função que obtém o artigo no MongoDB quando o PID não
+      está no índice de PIDs (por padrão ``get_article_by_pid_v1`` ou
+      ``get_article_by_pid_v2``).
+    """
+    entry = pid_index.lookup(kind, pid)
+    if entry:
+        return LegacyArticle(entry)
+
+    if get_article is None:
+        if kind == pid_index.V1:
+            get_article = get_article_by_pid_v1
+        else:
+            get_article = get_article_by_pid_v2
+    article = get_article(pid)
+    if not article:
+        return None
+    return LegacyArticle.from_article(article)
+
+
+def get_recent_articles_of_issue(issue_iid, is_public=True, only=None):
     """
     Retorna a lista de artigos de um issue/
-    Ordenados como 'mais recentes' pelo campo order.
+    Ordenados como 'mais recentes' pelo campo order, com o periódico
+    já resolvido (ver ``prefetch_references``).
+    ``only`` indica os campos carregados de cada artigo (ver ``projections``).
     """
     if not issue_iid:
         raise ValueError(__("Parámetro obrigatório: issue_iid."))
@@ -1443,9 +1942,13 @@ def get_recent_articles_of_issue(issue_iid, is_public=True):
     # add filter publication_date__lte_today_date
     kwargs = add_filter_without_embargo()
 
-    return Article.objects.filter(
-        issue=issue_iid, is_public=is_public, type__in=HIGHLIGHTED_TYPES, **kwargs
-    ).order_by("-order")
+    articles = projections.project(
+        Article.objects.filter(
+            issue=issue_iid, is_public=is_public, type__in=HIGHLIGHTED_TYPES, **kwargs
+        ).order_by("-order"),
+        only,
+    )
+    return prefetch_references(articles, ("journal",))
 
 
 def get_article_by_pdf_filename(journal_acron, issue_label, pdf_filename):
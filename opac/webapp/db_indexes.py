@@ -0,0 +1,274 @@
+# coding: utf-8
+
+"""
+    Índices do MongoDB necessários às consultas dos controllers.
+
+    ``INDEXES`` declara, por modelo, os índices (lista de campos) derivados
+    das consultas de ``controllers.py``; ``HOT_QUERIES`` reproduz as consultas
+    mais frequentes das páginas (artigo, sumário, grade de números e URLs
+    antigas).
+
+    - ``manager.py create_indexes`` cria os índices ausentes;
+    - ``manager.py verify_indexes`` lista os índices ausentes e o plano de
+      execução (explain) das consultas frequentes;
+    - na inicialização de cada processo web (``manager:app`` no gunicorn,
+      ``MONGODB_CHECK_QUERY_PLANS``) é registrado um warning, com o plano de
+      execução, para cada consulta frequente que percorre a coleção inteira
+      (COLLSCAN). Os workers do RQ e os comandos do manager não fazem a
+      verificação.
+"""
+
+import json
+import logging
+import threading
+from datetime import datetime
+
+from opac_schema.v1.models import Article, Issue, Journal
+from pymongo import ASCENDING, DESCENDING
+
+logger = logging.getLogger(__name__)
+
+# indica se a verificação dos planos já foi iniciada neste processo
+_query_plans_checked = False
+
+MODELS = {
+    "Article": Article,
+    "Issue": Issue,
+    "Journal": Journal,
+}
+
+INDEXES = {
+    "Journal": (
+        # get_journal_by_jid, get_journal_by_acron, get_journal_by_url_seg
+        [("jid", ASCENDING)],
+        [("acronym", ASCENDING)],
+        [("url_segment", ASCENDING)],
+        # get_journal_by_issn
+        [("scielo_issn", ASCENDING)],
+        [("print_issn", ASCENDING)],
+        [("eletronic_issn", ASCENDING)],
+        # journal_catalog.get_fingerprint
+        [("updated", ASCENDING)],
+    ),
+    "Issue": (
+        # get_issue_by_iid, get_issue_by_pid
+        [("iid", ASCENDING)],
+        [("pid", ASCENDING)],
+        # get_issues_by_jid, get_issues_for_grid_by_jid, get_aop_issues
+        [
+            ("journal", ASCENDING),
+            ("type", ASCENDING),
+            ("is_public", ASCENDING),
+            ("year", DESCENDING),
+            ("order", DESCENDING),
+        ],
+        # get_issue_by_url_seg, get_issue_by_label
+        [("journal", ASCENDING), ("url_segment", ASCENDING)],
+        [("journal", ASCENDING), ("label", ASCENDING)],
+        # get_jids_to_reconcile
+        [("updated", ASCENDING)],
+    ),
+    "Article": (
+        [("aid", ASCENDING)],
+        # get_article_by_issue_article_seg
+        [
+            ("issue", ASCENDING),
+            ("url_segment", ASCENDING),
+            ("publication_date", ASCENDING),
+        ],
+        # get_articles_by_iid, get_recent_articles_of_issue
+        [("issue", ASCENDING), ("order", ASCENDING)],
+        # get_article_by_aop_url_segs
+        [("journal", ASCENDING), ("aop_url_segs", ASCENDING)],
+        # get_article_by_pdf_filename, get_article_by_suppl_material_filename
+        [("pdfs.filename", ASCENDING)],
+        [("mat_suppl.filename", ASCENDING)],
+        # get_article_by_pid, get_article_by_oap_pid, get_article_by_pid_v2
+        [("pid", ASCENDING)],
+        [("aop_pid", ASCENDING)],
+        # get_article_by_pid_v1, get_article_by_scielo_pid, get_article_by_aid
+        [("scielo_pids.v1", ASCENDING)],
+        [("scielo_pids.v2", ASCENDING)],
+        [("scielo_pids.v3", ASCENDING)],
+        [("scielo_pids.other", ASCENDING)],
+        # get_articles_by_date_range
+        [("updated", ASCENDING), ("pid", ASCENDING)],
+    ),
+}
+
+# Consultas frequentes verificadas com explain: (nome, modelo, filtro, ordenação)
+HOT_QUERIES = (
+    (
+        "get_article_by_issue_article_seg",
+        "Article",
+        {"issue": "", "url_segment": "", "publication_date": {"$lte": "9999"}},
+        None,
+    ),
+    (
+        "get_article_by_aop_url_segs",
+        "Article",
+        {"journal": "", "aop_url_segs": {"url_seg_article": "", "url_seg_issue": ""}},
+        None,
+    ),
+    (
+        "get_article_by_pid_v2",
+        "Article",
+        {
+            "$or": [{"pid": ""}, {"aop_pid": ""}, {"scielo_pids.other": ""}],
+            "is_public": True,
+        },
+        None,
+    ),
+    (
+        "get_article_by_pid_v1",
+        "Article",
+        {"scielo_pids.v1": "", "is_public": True},
+        None,
+    ),
+    (
+        "get_article_by_pdf_filename",
+        "Article",
+        {"journal": "", "issue": "", "pdfs.filename": "", "is_public": True},
+        None,
+    ),
+    (
+        "get_articles_by_iid",
+        "Article",
+        {"issue": "", "is_public": True},
+        [("order", ASCENDING)],
+    ),
+    (
+        "get_issues_for_grid_by_jid",
+        "Issue",
+        {
+            "journal": "",
+            "type": {"$in": ["ahead", "regular", "special", "supplement"]},
+            "is_public": True,
+        },
+        [("year", DESCENDING), ("order", DESCENDING)],
+    ),
+    (
+        "get_issue_by_url_seg",
+        "Issue",
+        {"journal": "", "url_segment": "", "type": {"$ne": "pressrelease"}},
+        None,
+    ),
+    (
+        "get_articles_by_date_range",
+        "Article",
+        {"updated": {"$gte": datetime(1900, 1, 1), "$lte": datetime(1900, 1, 2)}},
+        [("pid", ASCENDING)],
+    ),
+)
+
+
+def get_collection(model_name):
+    return MODELS[model_name]._get_collection()
+
+
+def _index_keys(collection):
+    return {
+        tuple(
+            (field, direction if isinstance(direction, str) else int(direction))
+            for field, direction in index["key"]
+        )
+        for index in collection.index_information().values()
+    }
+
+
+def missing_indexes():
+    """
+    Retorna a lista de (modelo, campos) dos índices de ``INDEXES`` ausentes.
+    Um índice existente com os mesmos campos, independentemente do nome, é
+    considerado presente.
+    """
+    missing = []
+    for model_name, indexes in INDEXES.items():
+        existing = _index_keys(get_collection(model_name))
+        for keys in indexes:
+            if tuple(keys) not in existing:
+                missing.append((model_name, keys))
+    return missing
+
+
+def create_indexes():
+    """
+    Cria os índices ausentes (em background).
+    Retorna a lista de (modelo, nome do índice) criados.
+    """
+    created = []
+    for model_name, keys in missing_indexes():
+        name = get_collection(model_name).create_index(keys, background=True)
+        created.append((model_name, name))
+    return created
+
+
+def plan_stages(plan):
+    """
+    Retorna os estágios (ex.: ``IXSCAN``, ``COLLSCAN``) do plano ``plan``.
+    """
+    stages = [plan.get("stage")]
+    if "inputStage" in plan:
+        stages.extend(plan_stages(plan["inputStage"]))
+    for input_stage in plan.get("inputStages", []):
+        stages.extend(plan_stages(input_stage))
+    return stages
+
+
+def explain(model_name, query, sort=None):
+    """
+    Retorna o plano vencedor (``queryPlanner.winningPlan``) da consulta.
+    """
+    cursor = get_collection(model_name).find(query).limit(1)
+    if sort:
+        cursor = cursor.sort(sort)
+    return cursor.explain()["queryPlanner"]["winningPlan"]
+
+
+def collection_scans():
+    """
+    Retorna a lista de (nome, plano) das consultas de ``HOT_QUERIES`` cujo
+    plano de execução percorre a coleção inteira (COLLSCAN).
+    """
+    scans = []
+    for name, model_name, query, sort in HOT_QUERIES:
+        plan = explain(model_name, query, sort)
+        if "COLLSCAN" in plan_stages(plan):
+            scans.append((name, plan))
+    return scans
+
+
+def check_query_plans():
+    """
+    Registra um warning, com o plano de execução, para cada consulta
+    frequente que percorre a coleção inteira. Erros de conexão são apenas
+    registrados, sem impedir a inicialização do app.
+    """
+    try:
+        scans = collection_scans()
+    except Exception as exc:
+        logger.warning("Unable to check the MongoDB query plans: %s", exc)
+        return []
+    for name, plan in scans:
+        logger.warning(
+            "MongoDB query %s scans the whole collection "
+            "(run 'manager.py create_indexes'). Winning plan: %s",
+            name,
+            json.dumps(plan, default=str),
+        )
+    return scans
+
+
+def check_query_plans_in_background():
+    """
+    Executa ``check_query_plans`` em uma thread, sem atrasar a inicialização
+    do app quando o MongoDB demora a responder. Executada uma única vez
+    por processo.
+    """
+    global _query_plans_checked
+    if _query_plans_checked:
+        return
+    _query_plans_checked = True
+    thread = threading.Thread(target=check_query_plans, name="check-query-plans")
+    thread.daemon = True
+    thread.start()
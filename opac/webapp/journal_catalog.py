@@ -0,0 +1,425 @@
+# coding: utf-8
+
+"""
+    Catálogo (em memória) dos periódicos públicos, usado pelas listas
+    alfabética e temática, pelas buscas (ajax) e pelo download da lista de
+    periódicos.
+
+    Cada worker mantém uma cópia (snapshot) imutável e compacta do catálogo:
+    uma tupla de ``CatalogJournal`` (namedtuple) ordenada por ``title_slug``,
+    com somente os campos de ``projections.JOURNAL_GROUPED_LIST`` e de
+    ``SEARCH_FIELDS``. Os filtros, a ordenação e o agrupamento são feitos em
+    memória, sem consultas ao MongoDB.
+
+    A busca pelo título usa o ``TitleIndex``: um índice dos n-gramas (de 1 a 3
+    caracteres) do ``title_slug``, do título abreviado e do acrônimo de cada
+    periódico. Os periódicos encontrados são ordenados pela relevância: o
+    termo igual ao buscado, o termo iniciado pelo buscado, uma palavra do
+    termo iniciada pelo buscado e, por fim, o buscado em qualquer posição.
+
+    Os dados de cada periódico enviados ao frontend
+    (``controllers.get_journal_json_data``, com as chamadas de ``url_for``)
+    são gerados uma única vez por idioma (o ``lang`` informado e o idioma da
+    tradução, ``get_locale``, usado nos textos traduzidos como
+    ``status_reason``). Os agrupamentos da lista temática
+    (``controllers.group_journals``) são gerados uma única vez por
+    (``grouper_field``, ``query_filter``, idiomas) em cada versão do catálogo.
+
+    Quando um periódico é salvo ou removido neste processo
+    (``Journal.save()``), uma nova versão do catálogo é gerada somente com a
+    alteração deste periódico (``update``), reaproveitando os dados dos
+    demais periódicos. O catálogo é gerado novamente, por completo, quando:
+
+    - o total de periódicos ou a maior data de atualização (``updated``) no
+      MongoDB mudam, alterações feitas por outros processos, verificadas no
+      máximo a cada ``JOURNAL_CATALOG_CHECK_INTERVAL`` segundos;
+    - tem mais de ``JOURNAL_CATALOG_MAX_AGE`` segundos.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+
+from flask import current_app
+from flask_babelex import get_locale
+from mongoengine import signals as mongoengine_signals
+from opac_schema.v1.models import Journal
+from slugify import slugify
+from webapp import projections
+
+logger = logging.getLogger(__name__)
+
+# campos usados somente na busca pelo título
+SEARCH_FIELDS = ("short_title", "acronym")
+
+CatalogJournal = namedtuple(
+    "CatalogJournal", ("id",) + projections.JOURNAL_GROUPED_LIST + SEARCH_FIELDS
+)
+CatalogLastIssue = namedtuple(
+    "CatalogLastIssue", ("volume", "number", "year", "suppl_text")
+)
+
+QUERY_FILTERS = {
+    "": lambda journal: True,
+    "current": lambda journal: journal.current_status == "current",
+    "no-current": lambda journal: journal.current_status != "current",
+}
+
+_lock = threading.Lock()
+_catalog = None
+_version = 0
+
+
+class TitleIndex(object):
+    """
+    Índice, em memória, dos n-gramas (de 1 a ``GRAM_SIZE`` caracteres) dos
+    termos de busca de cada periódico (``title_slug``, título abreviado e
+    acrônimo, normalizados com ``slugify``).
+
+    Uma busca com até ``GRAM_SIZE`` caracteres é respondida diretamente pelo
+    índice; uma busca maior usa a interseção dos seus trigramas e confirma,
+    nos candidatos, que os termos contêm o texto buscado.
+    """
+
+    GRAM_SIZE = 3
+
+    # relevância dos periódicos encontrados (menor é melhor)
+    EXACT, PREFIX, WORD_PREFIX, SUBSTRING = range(4)
+
+    def __init__(self, journals):
+        self.terms = [search_terms(journal) for journal in journals]
+        self.grams = {}
+        for position, terms in enumerate(self.terms):
+            for term in terms:
+                for gram in self._grams(term):
+                    self.grams.setdefault(gram, set()).add(position)
+
+    def _grams(self, term):
+        for size in range(1, self.GRAM_SIZE + 1):
+            for start in range(len(term) - size + 1):
+                yield term[start : start + size]
+
+    def _candidates(self, query):
+        if len(query) <= self.GRAM_SIZE:
+            return self.grams.get(query, ())
+        trigrams = {
+            query[start : start + self.GRAM_SIZE]
+            for start in range(len(query) - self.GRAM_SIZE + 1)
+        }
+        postings = sorted((self.grams.get(gram, set()) for gram in trigrams), key=len)
+        return set.intersection(*postings)
+
+    def rank(self, query, position):
+        """
+        Retorna a relevância de ``query`` para o periódico da posição
+        ``position``, ou ``None`` se nenhum termo contém ``query``.
+        """
+        best = None
+        for term in self.terms[position]:
+            if term == query:
+                return self.EXACT
+            elif term.startswith(query):
+                rank = self.PREFIX
+            elif ("-" + query) in term:
+                rank = self.WORD_PREFIX
+            elif query in term:
+                rank = self.SUBSTRING
+            else:
+                continue
+            if best is None or rank < best:
+                best = rank
+        return best
+
+    def search(self, query):
+        """
+        Retorna a lista de (relevância, posição) dos periódicos com algum
+        termo contendo ``query`` (já normalizado), ordenada pela relevância e
+        pela posição.
+        """
+        found = []
+        for position in self._candidates(query):
+            rank = self.rank(query, position)
+            if rank is not None:
+                found.append((rank, position))
+        found.sort()
+        return found
+
+
+def search_terms(journal):
+    """
+    Retorna os termos de busca (normalizados) do periódico.
+    """
+    terms = []
+    for value in (journal.title_slug, journal.short_title, journal.acronym):
+        term = slugify(value or "").lower()
+        if term and term not in terms:
+            terms.append(term)
+    return tuple(terms)
+
+
+class JournalCatalog(object):
+    """
+    Versão do catálogo dos periódicos públicos. Não deve ser alterada após
+    criada (exceto ``checked``); os dados retornados por ``json_data`` e ``groups`` são
+    compartilhados pelas requisições e também não devem ser alterados.
+
+    ``json_data`` é o dicionário, (id, idioma, idioma da tradução) -> dados
+    do periódico, já gerados em uma versão anterior.
+    """
+
+    def __init__(self, journals, fingerprint, version, json_data=None):
+        self.journals = tuple(sorted(journals, key=lambda j: _sort_key(j.title_slug)))
+        self.fingerprint = fingerprint
+        self.version = version
+        self.created = time.time()
+        # última verificação do ``fingerprint`` no MongoDB
+        self.checked = self.created
+        self.title_index = TitleIndex(self.journals)
+        self._json_data = json_data or {}
+        self._groups = {}
+
+    def __len__(self):
+        return len(self.journals)
+
+    def filter(self, title_query="", query_filter="", order_by="title_slug"):
+        """
+        Retorna a lista de periódicos com algum termo de busca (ver
+        ``TitleIndex``) contendo ``title_query`` e com a situação
+        ``query_filter`` ("", "current" ou "no-current"), ordenada pelo campo
+        ``order_by``. Na busca pelo título, a ordenação padrão
+        (``title_slug``) é precedida pela relevância.
+        """
+        if query_filter not in QUERY_FILTERS:
+            raise ValueError("Parámetro: 'query_filter' é inválido!")
+        accept = QUERY_FILTERS[query_filter]
+
+        journals = self.journals
+        title_query_slug = slugify(title_query or "").lower()
+        if title_query_slug:
+            journals = [
+                self.journals[position]
+                for rank, position in self.title_index.search(title_query_slug)
+            ]
+        journals = [journal for journal in journals if accept(journal)]
+
+        if order_by != "title_slug":
+            journals.sort(key=lambda journal: _sort_key(getattr(journal, order_by)))
+        return journals
+
+    def json_data(self, journal, lang="pt"):
+        """
+        Retorna os dados de ``journal`` enviados ao frontend
+        (``controllers.get_journal_json_data``), gerados uma vez por ``lang``
+        e idioma da tradução (``get_locale``).
+        """
+        from webapp.controllers import get_journal_json_data
+
+        key = (journal.id, lang, str(get_locale()))
+        try:
+            return self._json_data[key]
+        except KeyError:
+            j_data = get_journal_json_data(journal, lang)
+            self._json_data[key] = j_data
+            return j_data
+
+    def groups(self, grouper_field, query_filter="", lang="pt"):
+        """
+        Retorna os periódicos agrupados pelo campo ``grouper_field``
+        (``controllers.group_journals``), gerados uma vez por
+        (``grouper_field``, ``query_filter``, ``lang``, idioma da tradução).
+        """
+        from webapp.controllers import group_journals
+
+        key = (grouper_field, query_filter, lang, str(get_locale()))
+        try:
+            return self._groups[key]
+        except KeyError:
+            groups = group_journals(
+                self.filter(query_filter=query_filter),
+                grouper_field,
+                self.json_data,
+                lang,
+            )
+            self._groups[key] = groups
+            return groups
+
+    def replace(self, journal_id, journal, fingerprint, version):
+        """
+        Retorna uma nova versão do catálogo com o periódico ``journal_id``
+        substituído por ``journal`` (``CatalogJournal``), ou removido quando
+        ``journal`` é ``None``. Os dados (``json_data``) já gerados dos demais
+        periódicos são mantidos.
+        """
+        journals = [j for j in self.journals if j.id != journal_id]
+        if journal is not None:
+            journals.append(journal)
+        json_data = {
+            key: j_data
+            for key, j_data in self._json_data.items()
+            if key[0] != journal_id
+        }
+        return JournalCatalog(journals, fingerprint, version, json_data)
+
+
+def _sort_key(value):
+    # como no MongoDB: valores ausentes primeiro e listas pelo menor item
+    if isinstance(value, (list, tuple)):
+        value = min(value) if value else None
+    if value is None:
+        return (0, "")
+    return (1, value)
+
+
+def is_enabled():
+    return bool(current_app.config.get("JOURNAL_CATALOG_ENABLED"))
+
+
+def make_catalog_journal(journal):
+    last_issue = journal.last_issue
+    if last_issue:
+        last_issue = CatalogLastIssue(
+            last_issue.volume, last_issue.number, last_issue.year, last_issue.suppl_text
+        )
+    values = {
+        field: getattr(journal, field, None)
+        for field in projections.JOURNAL_GROUPED_LIST + SEARCH_FIELDS
+    }
+    values.update(
+        id=journal.id,
+        last_issue=last_issue or None,
+        study_areas=tuple(journal.study_areas or ()),
+        subject_categories=tuple(journal.subject_categories or ()),
+        index_at=tuple(journal.index_at or ()),
+    )
+    return CatalogJournal(**values)
+
+
+def get_last_updated(journals):
+    """
+    Retorna a maior data de atualização dos periódicos ``journals``.
+    """
+    last_updated = journals.only("updated").order_by("-updated").first()
+    return last_updated and last_updated.updated
+
+
+def get_fingerprint():
+    """
+    Retorna o total de periódicos e a maior data de atualização no MongoDB.
+    """
+    return (Journal.objects.count(), get_last_updated(Journal.objects))
+
+
+def build(fingerprint=None, version=1):
+    """
+    Gera uma versão do catálogo com os periódicos públicos.
+    """
+    if fingerprint is None:
+        fingerprint = get_fingerprint()
+    journals = projections.project(
+        Journal.objects(is_public=True),
+        projections.JOURNAL_GROUPED_LIST + SEARCH_FIELDS,
+    )
+    return JournalCatalog(
+        [make_catalog_journal(journal) for journal in journals], fingerprint, version
+    )
+
+
+def get_catalog():
+    """
+    Retorna a versão atual do catálogo deste processo, gerando uma nova
+    versão quando os periódicos foram alterados (ver descrição do módulo).
+    """
+    global _catalog, _version
+
+    catalog = _catalog
+    fingerprint = None
+    now = time.time()
+    if (
+        catalog is not None
+        and catalog.created + current_app.config["JOURNAL_CATALOG_MAX_AGE"] > now
+    ):
+        if catalog.checked + current_app.config["JOURNAL_CATALOG_CHECK_INTERVAL"] > now:
+            return catalog
+        fingerprint = get_fingerprint()
+        if catalog.fingerprint == fingerprint:
+            catalog.checked = now
+            return catalog
+
+    with _lock:
+        if _catalog is None or _catalog is catalog:
+            _version += 1
+            _catalog = build(fingerprint, _version)
+            logger.info(
+                "Journal catalog version %s: %s journals", _version, len(_catalog)
+            )
+        return _catalog
+
+
+def get_journals(title_query="", query_filter="", order_by="title_slug"):
+    """
+    Retorna a lista de periódicos públicos do catálogo
+    (ver ``JournalCatalog.filter``).
+    """
+    return get_catalog().filter(title_query, query_filter, order_by)
+
+
+def invalidate():
+    """
+    Descarta a versão atual do catálogo deste processo.
+    """
+    global _catalog
+
+    with _lock:
+        _catalog = None
+
+
+def update(journal, created=False, deleted=False):
+    """
+    Gera uma nova versão do catálogo deste processo somente com a alteração
+    do periódico ``journal`` (criado, alterado ou removido). Sem um catálogo
+    atual, nada é feito.
+
+    O catálogo é descartado quando o total de periódicos no MongoDB não
+    corresponde somente a esta alteração, ou quando outro periódico foi
+    atualizado depois da versão atual (o catálogo já estava desatualizado),
+    e em caso de erro.
+    """
+    global _catalog, _version
+
+    with _lock:
+        if _catalog is None:
+            return
+        try:
+            fingerprint = get_fingerprint()
+            expected_count, previous_updated = _catalog.fingerprint
+            expected_count += created - deleted
+            others_updated = get_last_updated(Journal.objects(pk__ne=journal.id))
+            if fingerprint[0] != expected_count or (
+                others_updated
+                and (previous_updated is None or others_updated > previous_updated)
+            ):
+                _catalog = None
+                return
+            catalog_journal = None
+            if not deleted and journal.is_public:
+                catalog_journal = make_catalog_journal(journal)
+            _version += 1
+            _catalog = _catalog.replace(
+                journal.id, catalog_journal, fingerprint, _version
+            )
+        except Exception as exc:
+            logger.warning("Unable to update the journal catalog: %s", exc)
+            _catalog = None
+
+
+def _update_on_save(sender, document, created=False, **kwargs):
+    update(document, created=created)
+
+
+def _update_on_delete(sender, document, **kwargs):
+    update(document, deleted=True)
+
+
+mongoengine_signals.post_save.connect(_update_on_save, sender=Journal)
+mongoengine_signals.post_delete.connect(_update_on_delete, sender=Journal)
@@ -0,0 +1,165 @@
+# coding: utf-8
+
+"""
+    Arquivos pré-gerados do download da lista de periódicos
+    (``/journals/download/<list_type>/<extension>/``).
+
+    A tarefa agendada (``tasks.generate_journal_exports``) gera as listas
+    "alpha", "areas", "wos" e "publisher" nos formatos CSV e XLS (uma planilha
+    por idioma, pois o nome da planilha é traduzido) em
+    ``JOURNAL_EXPORTS_ROOT``, somente quando os periódicos foram alterados
+    desde a geração anterior (ver ``journal_catalog.get_fingerprint``).
+
+    Os arquivos são substituídos atomicamente (``os.replace``), assim um
+    download em andamento nunca lê um arquivo incompleto. Os downloads sem o
+    parâmetro ``query`` são servidos a partir destes arquivos, com ETag; os
+    demais são gerados no momento da requisição, assim como todos os
+    downloads quando a tarefa não confirma os arquivos há mais de
+    ``JOURNAL_EXPORTS_MAX_AGE`` segundos (ver ``is_outdated``).
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+from datetime import datetime, timedelta
+
+from flask import current_app, session
+from webapp import controllers, journal_catalog
+
+logger = logging.getLogger(__name__)
+
+LIST_TYPES = ("alpha", "areas", "wos", "publisher")
+EXTENSIONS = ("csv", "xls")
+MANIFEST_FILENAME = "manifest.json"
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def is_enabled():
+    return bool(current_app.config.get("JOURNAL_EXPORTS_ENABLED"))
+
+
+def get_exports_root():
+    return current_app.config["JOURNAL_EXPORTS_ROOT"]
+
+
+def get_filename(list_type, extension, lang=None):
+    """
+    Retorna o nome do arquivo da lista ``list_type`` no formato ``extension``.
+    O arquivo CSV não depende do idioma.
+    """
+    if extension == "csv":
+        return "journals_%s.csv" % list_type
+    return "journals_%s_%s.%s" % (list_type, lang, extension)
+
+
+def get_export_path(list_type, extension, lang=None):
+    """
+    Retorna o caminho do arquivo pré-gerado ou ``None`` quando o arquivo não
+    existe.
+    """
+    path = os.path.join(get_exports_root(), get_filename(list_type, extension, lang))
+    if os.path.isfile(path):
+        return path
+
+
+def read_manifest():
+    try:
+        with open(os.path.join(get_exports_root(), MANIFEST_FILENAME)) as fp:
+            return json.load(fp)
+    except (IOError, ValueError):
+        return {}
+
+
+def is_outdated():
+    """
+    Indica se os arquivos não foram gerados nem verificados pela tarefa
+    agendada (``generate``) nos últimos ``JOURNAL_EXPORTS_MAX_AGE`` segundos.
+    """
+    manifest = read_manifest()
+    try:
+        checked = datetime.strptime(manifest["checked"], DATETIME_FORMAT)
+    except (KeyError, TypeError, ValueError):
+        return True
+    max_age = timedelta(seconds=current_app.config["JOURNAL_EXPORTS_MAX_AGE"])
+    return checked + max_age < datetime.utcnow()
+
+
+def _write_manifest(manifest):
+    path = os.path.join(get_exports_root(), MANIFEST_FILENAME)
+    _replace(path, json.dumps(manifest, indent=2).encode("utf-8"))
+
+
+def _replace(path, data):
+    """
+    Grava ``data`` (bytes, gerador de bytes ou arquivo) em ``path`` por meio
+    de um arquivo temporário no mesmo diretório.
+    """
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as output:
+            if isinstance(data, bytes):
+                output.write(data)
+            elif hasattr(data, "read"):
+                shutil.copyfileobj(data, output)
+            else:
+                for chunk in data:
+                    output.write(chunk)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.remove(tmp_path)
+        raise
+
+
+def _generate(list_type, extension, lang=None):
+    path = os.path.join(get_exports_root(), get_filename(list_type, extension, lang))
+    with current_app.test_request_context():
+        if lang:
+            # idioma do nome da planilha (ver ``views.get_locale``)
+            session["lang"] = lang
+        data = controllers.get_journal_generator_for_csv(
+            list_type=list_type, extension=extension
+        )
+        try:
+            _replace(path, data)
+        finally:
+            if hasattr(data, "close"):
+                data.close()
+    return os.path.basename(path)
+
+
+def generate(force=False):
+    """
+    Gera todos os arquivos da lista de periódicos quando os periódicos foram
+    alterados desde a geração anterior, ou quando ``force`` é verdadeiro.
+    Caso contrário, somente registra a verificação (``checked``) no manifesto.
+    Retorna a lista dos nomes dos arquivos gerados.
+    """
+    os.makedirs(get_exports_root(), exist_ok=True)
+
+    fingerprint = json.dumps(journal_catalog.get_fingerprint(), default=str)
+    manifest = read_manifest()
+    now = datetime.utcnow().strftime(DATETIME_FORMAT)
+    if not force and manifest.get("fingerprint") == fingerprint:
+        manifest["checked"] = now
+        _write_manifest(manifest)
+        return []
+
+    generated = []
+    for list_type in LIST_TYPES:
+        generated.append(_generate(list_type, "csv"))
+        for lang in current_app.config["LANGUAGES"]:
+            generated.append(_generate(list_type, "xls", lang))
+
+    _write_manifest(
+        {
+            "fingerprint": fingerprint,
+            "generated": now,
+            "checked": now,
+            "files": generated,
+        }
+    )
+    logger.info("Journal exports generated: %s files", len(generated))
+    return generated
@@ -1,8 +1,11 @@
 # coding: utf-8
+import copy
 import io
 import json
 import logging
 import mimetypes
+import os
+import time
 from collections import OrderedDict
 from datetime import datetime, timedelta
 from io import BytesIO
@@ -24,6 +27,7 @@ from flask import (
     send_file,
     send_from_directory,
     session,
+    stream_with_context,
     url_for,
 )
 from flask_babelex import gettext as _
@@ -37,12 +41,32 @@ from tenacity import (
     stop_after_attempt,
     wait_exponential,
 )
-
-from webapp import babel, cache, controllers, forms
+from werkzeug.http import is_resource_modified, parse_date, unquote_etag
+
+from webapp import (
+    babel,
+    cache,
+    controllers,
+    forms,
+    journal_exports,
+    pid_index,
+    projections,
+)
 from webapp.choices import STUDY_AREAS
 from webapp.config.lang_names import display_original_lang_name
-from webapp.utils import utils
-from webapp.utils.caching import cache_key_with_lang, cache_key_with_lang_with_qs
+from webapp.utils import http_client, render_cache, utils
+from webapp.utils.caching import (
+    JOURNALS_TAG,
+    add_cache_tags,
+    article_tag,
+    cache_key_with_lang,
+    cache_key_with_lang_with_qs,
+    conditional_response,
+    is_cacheable_response,
+    issue_tag,
+    journal_tag,
+    store_cache_tags,
+)
 
 from . import main
 
@@ -97,10 +121,42 @@ def fetch_data(url, headers=None, json=False, timeout=4, verify=True):
     Except:
         Raise a RetryableError to retry.
     """
+    if not headers and not json and is_ssm_content_cacheable(url):
+        return fetch_ssm_content(url, timeout=timeout, verify=verify)["body"]
+
+    response = _get(url, headers=headers, timeout=timeout, verify=verify)
+    return response.content if not json else response.json()
+
+
+@retry(
+    retry=retry_if_exception_type(RetryableError),
+    wait=wait_exponential(multiplier=1, min=1, max=5),
+    stop=stop_after_attempt(5),
+)
+def fetch_stream(url, headers=None, timeout=4, verify=True):
+    """
+    Get the resource with HTTP without reading the body.
+    Same retry policy of ``fetch_data``, but only the status line and the
+    headers are fetched before returning, the body must be consumed with
+    ``response.iter_content`` and the response must be closed by the caller.
+    The body is requested without content encoding, so the upstream
+    Content-Length matches the bytes sent to the client.
+    Returns:
+        Return a requests.response object.
+    Except:
+        Raise a RetryableError to retry.
+    """
+    headers = dict(headers or {})
+    headers.setdefault("Accept-Encoding", "identity")
+    return _get(url, headers=headers, timeout=timeout, verify=verify, stream=True)
 
+
+def _get(url, headers=None, timeout=4, verify=True, stream=False):
     try:
         logger.info("Fetching the URL: %s" % url)
-        response = requests.get(url, headers=headers, timeout=timeout, verify=verify)
+        response = http_client.get(
+            url, headers=headers, timeout=timeout, verify=verify, stream=stream
+        )
     except (requests.exceptions.ConnectionError, requests.exceptions.Timeout) as exc:
         logger.error("Erro fetching the content: %s, retry..., erro: %s" % (url, exc))
         raise RetryableError(exc) from exc
@@ -113,6 +169,7 @@ def fetch_data(url, headers=None, json=False, timeout=4, verify=True):
     try:
         response.raise_for_status()
     except requests.HTTPError as exc:
+        response.close()
         if 400 <= exc.response.status_code < 500:
             raise NonRetryableError(exc) from exc
         elif 500 <= exc.response.status_code < 600:
@@ -123,7 +180,7 @@ def fetch_data(url, headers=None, json=False, timeout=4, verify=True):
         else:
             raise
 
-    return response.content if not json else response.json()
+    return response
 
 
 @main.before_app_request
@@ -146,6 +203,11 @@ def add_header(response):
     return response
 
 
+@main.after_request
+def add_cache_tags_to_redis(response):
+    return store_cache_tags(response)
+
+
 @main.after_request
 def add_language_code(response):
     language = session.get("lang", get_locale())
@@ -267,16 +329,19 @@ def index():
 @main.route("/journals/alpha")
 @cache.cached(key_prefix=cache_key_with_lang)
 def collection_list():
+    add_cache_tags(JOURNALS_TAG)
+    language = session.get("lang", get_locale())
+
     allowed_filters = ["current", "no-current", ""]
     query_filter = request.args.get("status", "")
 
     if not query_filter in allowed_filters:
         query_filter = ""
 
-    journals_list = [
-        controllers.get_journal_json_data(journal)
-        for journal in controllers.get_journals(query_filter=query_filter)
-    ]
+    journals, json_data = controllers.get_journals_with_json_data(
+        query_filter=query_filter, only=projections.JOURNAL_LIST
+    )
+    journals_list = [json_data(journal, language) for journal in journals]
 
     return render_template(
         "collection/list_journal.html",
@@ -287,6 +352,8 @@ def collection_list():
 @main.route("/journals/thematic")
 @cache.cached(key_prefix=cache_key_with_lang)
 def collection_list_thematic():
+    add_cache_tags(JOURNALS_TAG)
+
     allowed_query_filters = ["current", "no-current", ""]
     allowed_thematic_filters = ["areas", "wos", "publisher"]
     thematic_table = {
@@ -321,6 +388,8 @@ def collection_list_thematic():
 @main.route("/journals/feed/")
 @cache.cached(key_prefix=cache_key_with_lang)
 def collection_list_feed():
+    add_cache_tags(JOURNALS_TAG)
+
     language = session.get("lang", get_locale())
     collection = controllers.get_current_collection()
 
@@ -342,12 +411,6 @@ def collection_list_feed():
         feed.add("Nenhum periódico encontrado", url=request.url, updated=datetime.now())
 
     for journal in journals.items:
-        if (
-            not journal.last_issue
-            or journal.last_issue.type not in ("volume_issue", "regular")
-            or not journal.last_issue.url_segment
-        ):
-            controllers.set_last_issue_and_issue_count(journal)
         # Note: journal.last_issue (is instance of LastIssue, not Issue)
         last_issue = journal.last_issue
 
@@ -463,7 +526,7 @@ def router_legacy():
             )
 
         elif script_php == "sci_arttext" or script_php == "sci_abstract":
-            article = controllers.get_article_by_pid_v2(pid)
+            article = controllers.get_legacy_article(pid)
             if not article:
                 abort(404, _("Artigo não encontrado"))
 
@@ -476,7 +539,7 @@ def router_legacy():
             return redirect(
                 url_for(
                     "main.article_detail_v3",
-                    url_seg=article.journal.url_segment,
+                    url_seg=article.url_seg,
                     article_pid_v3=article.aid,
                     part=part,
                     lang=tlng,
@@ -499,14 +562,14 @@ def router_legacy():
 
         elif script_php == "sci_pdf":
             # accesso ao pdf do artigo:
-            article = controllers.get_article_by_pid_v2(pid)
+            article = controllers.get_legacy_article(pid)
             if not article:
                 abort(404, _("Artigo não encontrado"))
 
             return redirect(
                 url_for(
                     "main.article_detail_v3",
-                    url_seg=article.journal.url_segment,
+                    url_seg=article.url_seg,
                     article_pid_v3=article.aid,
                     format="pdf",
                     lang=tlng,
@@ -541,12 +604,7 @@ def journal_detail(url_seg):
     if not journal.is_public:
         abort(404, JOURNAL_UNPUBLISH + _(journal.unpublish_reason))
 
-    if (
-        not journal.last_issue
-        or journal.last_issue.type not in ("volume_issue", "regular")
-        or not journal.last_issue.url_segment
-    ):
-        controllers.set_last_issue_and_issue_count(journal)
+    add_cache_tags(journal_tag(journal.id))
 
     # todo: ajustar para que seja só noticias relacionadas ao periódico
     language = session.get("lang", get_locale())
@@ -566,7 +624,7 @@ def journal_detail(url_seg):
             if section.language == "en"
         ]
         recent_articles = controllers.get_recent_articles_of_issue(
-            journal.last_issue.iid, is_public=True
+            journal.last_issue.iid, is_public=True, only=projections.RECENT_ARTICLE
         )
     else:
         sections = []
@@ -620,12 +678,7 @@ def journal_feed(url_seg):
     if not journal.is_public:
         abort(404, JOURNAL_UNPUBLISH + _(journal.unpublish_reason))
 
-    if (
-        not journal.last_issue
-        or journal.last_issue.type not in ("volume_issue", "regular")
-        or not journal.last_issue.url_segment
-    ):
-        controllers.set_last_issue_and_issue_count(journal)
+    add_cache_tags(journal_tag(journal.id))
 
     # Note: journal.last_issue (is instance of LastIssue, not Issue)
     last_issue = journal.last_issue
@@ -684,12 +737,7 @@ def about_journal(url_seg):
     if not journal.is_public:
         abort(404, JOURNAL_UNPUBLISH + _(journal.unpublish_reason))
 
-    if (
-        not journal.last_issue
-        or journal.last_issue.type not in ("volume_issue", "regular")
-        or not journal.last_issue.url_segment
-    ):
-        controllers.set_last_issue_and_issue_count(journal)
+    add_cache_tags(journal_tag(journal.id))
 
     # Note: journal.last_issue (is instance of LastIssue, not Issue)
     latest_issue = journal.last_issue
@@ -735,6 +783,8 @@ def about_journal(url_seg):
 )
 @cache.cached(key_prefix=cache_key_with_lang_with_qs)
 def journals_search_alpha_ajax():
+    add_cache_tags(JOURNALS_TAG)
+
     if not request.headers.get("X-Requested-With"):
         abort(400, _("Requisição inválida. Deve ser por ajax"))
 
@@ -753,6 +803,8 @@ def journals_search_alpha_ajax():
 @main.route("/journals/search/group/by/filter/ajax/", methods=["GET"])
 @cache.cached(key_prefix=cache_key_with_lang_with_qs)
 def journals_search_by_theme_ajax():
+    add_cache_tags(JOURNALS_TAG)
+
     if not request.headers.get("X-Requested-With"):
         abort(400, _("Requisição inválida. Deve ser por ajax"))
 
@@ -791,7 +843,6 @@ def journals_search_by_theme_ajax():
         "GET",
     ],
 )
-@cache.cached(key_prefix=cache_key_with_lang_with_qs)
 def download_journal_list(list_type, extension):
     if extension.lower() not in ["csv", "xls"]:
         abort(401, _('Parámetro "extension" é inválido, deve ser "csv" ou "xls".'))
@@ -808,12 +859,36 @@ def download_journal_list(list_type, extension):
         else:
             mimetype = "text/csv"
         query = request.args.get("query", "", type=str)
+        export_path = None
+        if (
+            not query
+            and journal_exports.is_enabled()
+            and not journal_exports.is_outdated()
+        ):
+            export_path = journal_exports.get_export_path(
+                list_type.lower(), extension.lower(), get_lang_from_session()
+            )
+        if export_path:
+            # arquivo pré-gerado (ver ``journal_exports``), com ETag
+            modified = datetime.fromtimestamp(os.path.getmtime(export_path))
+            timestamp = modified.strftime("%Y-%m-%d_%H-%M-%S")
+            filename = "journals_%s_%s.%s" % (list_type, timestamp, extension)
+            response = send_file(export_path, mimetype=mimetype, conditional=True)
+            response.headers["Content-Disposition"] = (
+                "attachment; filename=%s" % filename
+            )
+            return response
+
         data = controllers.get_journal_generator_for_csv(
             list_type=list_type, title_query=query, extension=extension.lower()
         )
         timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
         filename = "journals_%s_%s.%s" % (list_type, timestamp, extension)
-        response = Response(data, mimetype=mimetype)
+        # a resposta é enviada em blocos (chunked), sem ser armazenada no cache
+        if extension.lower() == "xls":
+            response = send_file(data, mimetype=mimetype)
+        else:
+            response = Response(stream_with_context(data), mimetype=mimetype)
         response.headers["Content-Disposition"] = "attachment; filename=%s" % filename
         return response
 
@@ -891,17 +966,15 @@ def issue_grid(url_seg):
     if not journal.is_public:
         abort(404, JOURNAL_UNPUBLISH + _(journal.unpublish_reason))
 
+    add_cache_tags(journal_tag(journal.id))
+
     # idioma da sessão
     language = session.get("lang", get_locale())
 
     # A ordenação padrão da função ``get_issues_by_jid``: "-year", "-volume", "-order"
-    issues_data = controllers.get_issues_for_grid_by_jid(journal.id, is_public=True)
-    if (
-        not journal.last_issue
-        or journal.last_issue.type not in ("volume_issue", "regular")
-        or not journal.last_issue.url_segment
-    ):
-        controllers.set_last_issue_and_issue_count(journal)
+    issues_data = controllers.get_issues_for_grid_by_jid(
+        journal.id, is_public=True, only=projections.ISSUE_GRID
+    )
 
     # Note: journal.last_issue (is instance of LastIssue, not Issue)
     latest_issue = journal.last_issue
@@ -975,6 +1048,8 @@ def issue_toc(url_seg, url_seg_issue):
     if not journal.is_public:
         abort(404, JOURNAL_UNPUBLISH + _(journal.unpublish_reason))
 
+    add_cache_tags(journal_tag(journal.id), issue_tag(issue.iid))
+
     # goto_next_or_previous_issue (redireciona)
     goto_url = goto_next_or_previous_issue(
         issue, request.args.get("goto", None, type=str)
@@ -982,28 +1057,16 @@ def issue_toc(url_seg, url_seg_issue):
     if goto_url:
         return redirect(goto_url, code=301)
 
-    # obtém os documentos
-    articles = controllers.get_articles_by_iid(issue.iid, is_public=True)
-    if articles:
-        # obtém TODAS as seções dos documentos deste sumário
-        sections = sorted({a.section.upper() for a in articles if a.section})
-    else:
-        # obtém as seções dos documentos deste sumário
-        sections = []
+    # obtém o sumário (projeção dos documentos com TODAS as seções)
+    toc = controllers.get_issue_toc(issue.iid, language[:2].lower())
+    articles = toc["entries"]
+    sections = toc["sections"]
 
     if current_app.config["FILTER_SECTION_ENABLE"] and section_filter != "":
         # obtém somente os documentos da seção selecionada
-        articles = [a for a in articles if a.section.upper() == section_filter]
+        articles = [a for a in articles if (a.section or "").upper() == section_filter]
 
-    # obtém PDF e TEXT de cada documento
-    has_math_content = False
-    for article in articles:
-        article_text_languages = set([doc["lang"] for doc in article.htmls])
-        article_pdf_languages = set([(doc["lang"], doc["url"]) for doc in article.pdfs])
-        setattr(article, "article_text_languages", article_text_languages)
-        setattr(article, "article_pdf_languages", article_pdf_languages)
-        if "mml:" in article.title:
-            has_math_content = True
+    has_math_content = any(a.has_math_content for a in articles)
 
     # obtém a legenda bibliográfica
     issue_bibliographic_strip = descriptive_short_format(
@@ -1041,7 +1104,9 @@ def goto_next_or_previous_issue(current_issue, goto_param):
         return None
 
     all_issues = list(
-        controllers.get_issues_by_jid(current_issue.journal.id, is_public=True)
+        controllers.get_issues_by_jid(
+            current_issue.journal.id, is_public=True, only=projections.ISSUE_GRID
+        )
     )
     if goto_param == "next":
         selected_issue = utils.get_next_issue(all_issues, current_issue)
@@ -1092,6 +1157,9 @@ def aop_toc(url_seg):
     journal = aop_issues[0].journal
     if not journal.is_public:
         abort(404, JOURNAL_UNPUBLISH + _(journal.unpublish_reason))
+    add_cache_tags(
+        journal_tag(journal.id), *[issue_tag(aop_issue.iid) for aop_issue in aop_issues]
+    )
     articles = []
     for aop_issue in aop_issues:
         _articles = controllers.get_articles_by_iid(aop_issue.iid, is_public=True)
@@ -1146,6 +1214,7 @@ def issue_feed(url_seg, url_seg_issue):
         abort(404, JOURNAL_UNPUBLISH + _(issue.journal.unpublish_reason))
 
     journal = issue.journal
+    add_cache_tags(journal_tag(journal.id), issue_tag(issue.iid))
     articles = controllers.get_articles_by_iid(issue.iid, is_public=True)
 
     feed = AtomFeed(
@@ -1188,10 +1257,13 @@ def issue_feed(url_seg, url_seg_issue):
 @main.route('/article/<regex("S\d{4}-\d{3}[0-9xX][0-2][0-9]{3}\d{4}\d{5}"):pid>/')
 @cache.cached(key_prefix=cache_key_with_lang)
 def article_detail_pid(pid):
-    article = controllers.get_article_by_pid(pid)
-
-    if not article:
-        article = controllers.get_article_by_oap_pid(pid)
+    article = controllers.get_legacy_article(
+        pid,
+        get_article=lambda pid: (
+            controllers.get_article_by_pid(pid)
+            or controllers.get_article_by_oap_pid(pid)
+        ),
+    )
 
     if not article:
         abort(404, _("Artigo não encontrado"))
@@ -1199,27 +1271,94 @@ def article_detail_pid(pid):
     return redirect(
         url_for(
             "main.article_detail_v3",
-            url_seg=article.journal.acronym,
+            url_seg=article.url_seg,
             article_pid_v3=article.aid,
         )
     )
 
 
-def render_html_from_xml(article, lang, gs_abstract=False):
+def fetch_article_xml(article):
     logger.debug("Get XML: %s", article.xml)
 
     if current_app.config["SSM_XML_URL_REWRITE"]:
-        result = fetch_data(use_ssm_url(article.xml))
-    else:
-        result = fetch_data(article.xml)
+        return fetch_data(use_ssm_url(article.xml))
+    return fetch_data(article.xml)
+
+
+def render_html_from_xml(article, lang, gs_abstract=False):
+    cached = render_cache.load(article, lang, gs_abstract)
+    if cached:
+        return cached
+
+    return render_all_html_from_xml(article, lang, gs_abstract)
 
-    xml = etree.parse(BytesIO(result))
+
+def render_all_html_from_xml(article, lang, gs_abstract=False):
+    """
+    Obtém e faz o parse do XML uma única vez e gera o HTML do idioma ``lang``.
+
+    Com o cache de HTML ativo, a partir do mesmo XML também são gerados e
+    armazenados os HTML dos demais idiomas do texto completo e dos resumos
+    (``gs_abstract``), assim uma visita ao artigo prepara as URLs de todos
+    os seus idiomas.
+
+    Retorna a tupla (html, languages) do idioma ``lang``.
+    """
+    xml = etree.parse(BytesIO(fetch_article_xml(article)))
 
     generator = HTMLGenerator.parse(
         xml, valid_only=False, gs_abstract=gs_abstract, output_style="website"
     )
 
-    return generator.generate(lang), generator.languages
+    html = str(generator.generate(lang))
+    render_cache.store(article, lang, html, generator.languages, gs_abstract)
+
+    if render_cache.is_enabled():
+        store_sibling_renditions(article, xml, generator, lang, gs_abstract)
+
+    return html, generator.languages
+
+
+def store_sibling_renditions(article, xml, generator, lang, gs_abstract):
+    """
+    Gera e armazena no cache de HTML os demais idiomas do texto completo e
+    dos resumos do artigo, reaproveitando o XML já obtido e o ``generator``
+    já criado para o idioma ``lang``.
+    """
+    try:
+        generators = {
+            gs_abstract: generator,
+            not gs_abstract: HTMLGenerator.parse(
+                copy.deepcopy(xml),
+                valid_only=False,
+                gs_abstract=not gs_abstract,
+                output_style="website",
+            ),
+        }
+    except Exception as exc:
+        logger.warning("Unable to parse the XML of %s: %s", article.aid, exc)
+        generators = {gs_abstract: generator}
+
+    for _gs_abstract, _generator in generators.items():
+        if _gs_abstract:
+            languages = article.abstract_languages or []
+        else:
+            languages = _generator.languages
+        for _lang in languages:
+            if (_lang, _gs_abstract) == (lang, gs_abstract):
+                continue
+            try:
+                html = str(_generator.generate(_lang))
+            except Exception as exc:
+                logger.warning(
+                    "Unable to render %s (%s, gs_abstract=%s): %s",
+                    article.aid,
+                    _lang,
+                    _gs_abstract,
+                    exc,
+                )
+                continue
+            render_cache.store(article, _lang, html, _generator.languages, _gs_abstract)
 
 
 def render_html_from_html(article, lang):
@@ -1319,7 +1458,8 @@ def article_detail(url_seg, url_seg_issue, url_seg_article, lang_code=""):
 
 @main.route("/j/<string:url_seg>/a/<string:article_pid_v3>/")
 @main.route("/j/<string:url_seg>/a/<string:article_pid_v3>/<string:part>/")
-@cache.cached(key_prefix=cache_key_with_lang)
+@conditional_response
+@cache.cached(key_prefix=cache_key_with_lang, response_filter=is_cacheable_response)
 def article_detail_v3(url_seg, article_pid_v3, part=None):
     qs_lang = request.args.get("lang", type=str) or None
     qs_goto = request.args.get("goto", type=str) or None
@@ -1374,6 +1514,12 @@ def article_detail_v3(url_seg, article_pid_v3, part=None):
     except ValueError as e:
         abort(404, str(e))
 
+    add_cache_tags(
+        journal_tag(article.journal.id),
+        issue_tag(article.issue.id),
+        article_tag(article.aid),
+    )
+
     def _handle_html():
         citation_pdf_url = None
         for pdf_data in article.pdfs:
@@ -1463,10 +1609,7 @@ def article_detail_v3(url_seg, article_pid_v3, part=None):
         raise abort(404, _("Recurso do Artigo não encontrado. Caminho inválido!"))
 
     def _handle_xml():
-        if current_app.config["SSM_XML_URL_REWRITE"]:
-            result = fetch_data(use_ssm_url(article.xml))
-        else:
-            result = fetch_data(article.xml)
+        result = fetch_article_xml(article)
         response = make_response(result)
         response.headers["Content-Type"] = "application/xml"
         return response
@@ -1510,22 +1653,273 @@ def article_epdf():
         return render_template("article/epdf.html", **context)
 
 
+SSM_META_KEY = "ssm-meta:%s"
+PROXY_REQUEST_HEADERS = ("Range", "If-Range", "If-None-Match", "If-Modified-Since")
+PROXY_RESPONSE_HEADERS = (
+    "Content-Length",
+    "Content-Range",
+    "ETag",
+    "Last-Modified",
+    "Accept-Ranges",
+)
+
+
+def get_ssm_metadata(url):
+    """
+    Retorna os metadados (etag, last_modified, length) armazenados no cache
+    para o conteúdo ``url`` do SSM, ou None.
+    """
+    return cache.get(SSM_META_KEY % url)
+
+
+def set_ssm_metadata(url, upstream):
+    """
+    Armazena no cache o ETag, Last-Modified e tamanho do conteúdo ``url``
+    obtidos na resposta ``upstream`` do SSM, ou remove os metadados
+    armazenados se a resposta não tem ETag nem Last-Modified.
+    """
+    metadata = {
+        "etag": upstream.headers.get("ETag"),
+        "last_modified": upstream.headers.get("Last-Modified"),
+        "length": upstream.headers.get("Content-Length"),
+    }
+    if metadata["etag"] or metadata["last_modified"]:
+        cache.set(SSM_META_KEY % url, metadata)
+    else:
+        cache.delete(SSM_META_KEY % url)
+
+
+SSM_CONTENT_KEY = "ssm-content:%s"
+
+
+def is_ssm_content_cacheable(url):
+    """
+    Indica se o conteúdo ``url`` é armazenado no cache e revalidado no SSM
+    (ver ``fetch_ssm_content``).
+    """
+    return bool(
+        current_app.config["SSM_CONTENT_CACHE_ENABLED"] and http_client.is_ssm_url(url)
+    )
+
+
+def get_ssm_content(url):
+    """
+    Retorna o conteúdo ``url`` do SSM armazenado no cache, ou None::
+
+        {"body": .., "etag": .., "last_modified": .., "checked": <timestamp>}
+    """
+    return cache.get(SSM_CONTENT_KEY % url)
+
+
+def set_ssm_content(url, entry):
+    entry["checked"] = time.time()
+    cache.set(
+        SSM_CONTENT_KEY % url,
+        entry,
+        timeout=current_app.config["SSM_CONTENT_CACHE_TIMEOUT"],
+    )
+
+
+def store_ssm_content(url, upstream, entry=None):
+    """
+    Retorna o conteúdo ``url`` ({"body": .., "etag": .., "last_modified": ..})
+    a partir da resposta ``upstream`` do SSM.
+
+    Na resposta 304 à revalidação de ``entry``, renova o tempo de vida do
+    conteúdo armazenado. Na resposta 200, atualiza os metadados (ver
+    ``set_ssm_metadata``) e armazena o novo conteúdo com o ETag e
+    Last-Modified, quando presentes, se o conteúdo tem até
+    ``CACHE_MAX_RESPONSE_SIZE`` bytes.
+    """
+    if upstream.status_code == 304 and entry:
+        upstream.close()
+        set_ssm_content(url, entry)
+        return entry
+
+    entry = {
+        "body": upstream.content,
+        "etag": upstream.headers.get("ETag"),
+        "last_modified": upstream.headers.get("Last-Modified"),
+    }
+    set_ssm_metadata(url, upstream)
+    max_size = current_app.config["CACHE_MAX_RESPONSE_SIZE"]
+    if (entry["etag"] or entry["last_modified"]) and len(entry["body"]) <= max_size:
+        set_ssm_content(url, entry)
+    return entry
+
+
+def fetch_ssm_content(url, timeout=4, verify=True, entry=None):
+    """
+    Retorna o conteúdo ``url`` do SSM (ver ``store_ssm_content``).
+
+    O conteúdo armazenado (``entry``, lido do cache se não informado) é usado
+    por ``SSM_CONTENT_CACHE_MAX_AGE`` segundos. Depois disso é revalidado com
+    uma requisição condicional (If-None-Match/If-Modified-Since) e somente é
+    obtido novamente se foi alterado no SSM.
+    """
+    entry = entry or get_ssm_content(url)
+    if not entry:
+        return store_ssm_content(url, _get(url, timeout=timeout, verify=verify))
+
+    max_age = current_app.config["SSM_CONTENT_CACHE_MAX_AGE"]
+    if entry["checked"] + max_age > time.time():
+        return entry
+
+    headers = {}
+    if entry["etag"]:
+        headers["If-None-Match"] = entry["etag"]
+    if entry["last_modified"]:
+        headers["If-Modified-Since"] = entry["last_modified"]
+    upstream = _get(url, headers=headers, timeout=timeout, verify=verify)
+    return store_ssm_content(url, upstream, entry)
+
+
+@retry(
+    retry=retry_if_exception_type(RetryableError),
+    wait=wait_exponential(multiplier=1, min=1, max=5),
+    stop=stop_after_attempt(5),
+)
+def revalidate_ssm_content(url, entry, timeout=4, verify=True):
+    """
+    Retorna o conteúdo ``url`` do SSM armazenado no cache (``entry``),
+    revalidado quando necessário (ver ``fetch_ssm_content``), com a mesma
+    política de novas tentativas do ``fetch_data``.
+    """
+    return fetch_ssm_content(url, timeout=timeout, verify=verify, entry=entry)
+
+
+def not_modified_response(url):
+    """
+    Retorna uma resposta 304 quando a requisição é condicional
+    (If-None-Match/If-Modified-Since) e os metadados armazenados do conteúdo
+    ``url`` indicam que a cópia do cliente é válida, sem consultar o SSM.
+    Caso contrário retorna None.
+    """
+    if not (
+        request.headers.get("If-None-Match") or request.headers.get("If-Modified-Since")
+    ):
+        return None
+    metadata = get_ssm_metadata(url)
+    if not metadata:
+        return None
+    etag = metadata["etag"]
+    last_modified = metadata["last_modified"]
+    if is_resource_modified(
+        request.environ,
+        etag=unquote_etag(etag)[0] if etag else None,
+        last_modified=parse_date(last_modified) if last_modified else None,
+    ):
+        return None
+    response = Response(status=304)
+    if etag:
+        response.headers["ETag"] = etag
+    if last_modified:
+        response.headers["Last-Modified"] = last_modified
+    return response
+
+
+def proxy_content(url, mimetype=None):
+    """
+    Retorna um ``Response`` com o conteúdo de ``url``.
+
+    Conteúdos com tamanho conhecido até ``CACHE_MAX_RESPONSE_SIZE`` são lidos
+    por completo (e podem ser armazenados no cache). Os demais são repassados
+    ao cliente em blocos de ``SSM_STREAM_CHUNK_SIZE`` bytes, à medida que são
+    recebidos, mantendo os cabeçalhos Content-Length, ETag, Last-Modified e
+    Accept-Ranges do SSM.
+
+    As requisições parciais (Range) e condicionais são respondidas com 304
+    a partir dos metadados armazenados (ver ``not_modified_response``) ou
+    repassadas ao SSM, que responde com 206 ou 304.
+    """
+    if not current_app.config["SSM_STREAMING_ENABLED"]:
+        return Response(fetch_data(url), mimetype=mimetype)
+
+    response = not_modified_response(url)
+    if response is not None:
+        return response
+
+    entry = None
+    if "Range" not in request.headers and is_ssm_content_cacheable(url):
+        entry = get_ssm_content(url)
+    if entry:
+        entry = revalidate_ssm_content(url, entry)
+        response = Response(entry["body"], mimetype=mimetype)
+        if entry["etag"]:
+            response.headers["ETag"] = entry["etag"]
+        if entry["last_modified"]:
+            response.headers["Last-Modified"] = entry["last_modified"]
+        return response
+
+    headers = {
+        name: request.headers[name]
+        for name in PROXY_REQUEST_HEADERS
+        if name in request.headers
+    }
+    upstream = fetch_stream(url, headers=headers)
+
+    content_length = upstream.headers.get("Content-Length")
+    if (
+        upstream.status_code == 200
+        and content_length
+        and content_length.isdigit()
+        and int(content_length) <= current_app.config["CACHE_MAX_RESPONSE_SIZE"]
+    ):
+        try:
+            if is_ssm_content_cacheable(url):
+                body = store_ssm_content(url, upstream)["body"]
+            else:
+                set_ssm_metadata(url, upstream)
+                body = upstream.content
+            response = Response(body, mimetype=mimetype)
+        finally:
+            upstream.close()
+        for header in ("ETag", "Last-Modified"):
+            if header in upstream.headers:
+                response.headers[header] = upstream.headers[header]
+        return response
+
+    if upstream.status_code == 200:
+        set_ssm_metadata(url, upstream)
+
+    def generate():
+        try:
+            for chunk in upstream.iter_content(
+                chunk_size=current_app.config["SSM_STREAM_CHUNK_SIZE"]
+            ):
+                if chunk:
+                    yield chunk
+        finally:
+            upstream.close()
+
+    response = Response(
+        stream_with_context(generate()),
+        status=upstream.status_code,
+        mimetype=mimetype,
+        direct_passthrough=True,
+    )
+    for header in PROXY_RESPONSE_HEADERS:
+        if header in upstream.headers:
+            response.headers[header] = upstream.headers[header]
+    return response
+
+
 def get_pdf_content(url):
     logger.debug("Get PDF: %s", url)
     if current_app.config["SSM_ARTICLE_ASSETS_OR_RENDITIONS_URL_REWRITE"]:
         url = use_ssm_url(url)
+    mimetype, __ = mimetypes.guess_type(url)
     try:
-        response = fetch_data(url)
+        return proxy_content(url, mimetype)
     except NonRetryableError:
         abort(404, _("PDF não encontrado"))
     except RetryableError:
         abort(500, _("Erro inesperado"))
-    else:
-        mimetype, __ = mimetypes.guess_type(url)
-        return Response(response, mimetype=mimetype)
 
 
-@cache.cached(key_prefix=cache_key_with_lang_with_qs)
+@cache.cached(
+    key_prefix=cache_key_with_lang_with_qs, response_filter=is_cacheable_response
+)
 def get_content_from_ssm(resource_ssm_media_path):
     resource_ssm_full_url = current_app.config["SSM_BASE_URI"] + resource_ssm_media_path
 
@@ -1533,17 +1927,16 @@ def get_content_from_ssm(resource_ssm_media_path):
     mimetype, __ = mimetypes.guess_type(url)
 
     try:
-        ssm_response = fetch_data(url)
+        return proxy_content(url, mimetype)
     except NonRetryableError:
         abort(404, _("Recurso não encontrado"))
     except RetryableError:
         abort(500, _("Erro inesperado"))
-    else:
-        return Response(ssm_response, mimetype=mimetype)
 
 
 @main.route('/media/assets/<regex("(.*)"):relative_media_path>')
-@cache.cached(key_prefix=cache_key_with_lang)
+@conditional_response
+@cache.cached(key_prefix=cache_key_with_lang, response_filter=is_cacheable_response)
 def media_assets_proxy(relative_media_path):
     resource_ssm_path = "{ssm_media_path}{resource_path}".format(
         ssm_media_path=current_app.config["SSM_MEDIA_PATH"],
@@ -1553,7 +1946,10 @@ def media_assets_proxy(relative_media_path):
 
 
 @main.route("/article/ssm/content/raw/")
-@cache.cached(key_prefix=cache_key_with_lang_with_qs)
+@conditional_response
+@cache.cached(
+    key_prefix=cache_key_with_lang_with_qs, response_filter=is_cacheable_response
+)
 def article_ssm_content_raw():
     resource_ssm_path = request.args.get("resource_ssm_path", None)
     if not resource_ssm_path:
@@ -1655,14 +2051,14 @@ def router_legacy_article(text_or_abstract):
         # se tem pid
         abort(400, _("Requsição inválida ao tentar acessar o artigo com pid: %s" % pid))
 
-    article = controllers.get_article_by_pid_v1(pid)
+    article = controllers.get_legacy_article(pid, kind=pid_index.V1)
     if not article:
         abort(404, _("Artigo não encontrado"))
 
     return redirect(
         url_for(
             "main.article_detail_v3",
-            url_seg=article.journal.url_segment,
+            url_seg=article.url_seg,
             article_pid_v3=article.aid,
         ),
         code=301,
@@ -1997,6 +2393,7 @@ def router_counter_dicts():
     }
 
     articles = controllers.get_articles_by_date_range(begin_date, end_date, page, limit)
+    controllers.prefetch_references(articles.items, ("journal",))
     for a in articles.items:
         results["documents"].update(get_article_counter_data(a))
 
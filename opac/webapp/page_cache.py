@@ -0,0 +1,48 @@
+# coding: utf-8
+
+"""
+    Extensão do Flask-Caching que marca as páginas armazenadas pelas views
+    decoradas com ``@cache.cached``.
+
+    O ``str`` retornado pela view é armazenado como ``CachedPage`` (ver
+    ``utils.cache_backends``), a marca das entradas do cache que o
+    ``CompressedRedisCache`` pode servir com os bytes comprimidos. Os demais
+    valores armazenados no cache não são alterados.
+"""
+
+import functools
+
+from flask_caching import Cache
+
+
+def cached_page(f):
+    """
+    Marca como ``CachedPage`` o ``str`` retornado pela view ``f``.
+    """
+    # importado aqui: o pacote ``webapp.utils`` importa o ``webapp``
+    from webapp.utils.cache_backends import CachedPage
+
+    @functools.wraps(f)
+    def decorated_function(*args, **kwargs):
+        rv = f(*args, **kwargs)
+        if type(rv) is str:
+            return CachedPage(rv)
+        return rv
+
+    return decorated_function
+
+
+class PageCache(Cache):
+    def cached(self, *args, **kwargs):
+        """
+        Igual ao ``Cache.cached``, porém armazena o ``str`` retornado pela view
+        como ``CachedPage``.
+        """
+        cached = super(PageCache, self).cached(*args, **kwargs)
+
+        def decorator(f):
+            decorated_function = cached(cached_page(f))
+            decorated_function.uncached = f
+            return decorated_function
+
+        return decorator
@@ -0,0 +1,420 @@
+# coding: utf-8
+
+"""
+    Índice dos PIDs legados dos artigos, usado pelos acessos às URLs antigas
+    (``/scielo.php?script=sci_arttext&pid=..``, ``/cgi-bin/fbpe/..`` e
+    ``/article/<pid>/``), o maior volume de acessos dos robôs.
+
+    Cada PID conhecido de um artigo público (``scielo_pids.v1``, ``pid``,
+    ``aop_pid``, ``scielo_pids.other`` e as variantes com o ISSN trocado de
+    ``controllers._PIDS_FIXES``) é um campo do hash ``opac:pid_index`` no
+    Redis do cache::
+
+        "v1:<pid>" | "v2:<PID>" -> {"aid": .., "url_seg": .., "languages": [..],
+                                    "original_language": .., "publication_date": ..,
+                                    "rank": ..}
+
+    Assim a resolução é um ``HGET``, no lugar do ``$or`` entre os campos no
+    MongoDB. Quando dois artigos têm o mesmo PID prevalece o de menor
+    ``rank`` (``pid``, ``aop_pid``, ``scielo_pids.other`` e, por último,
+    as variantes).
+
+    O hash ``opac:pid_index:articles`` guarda os campos de cada artigo
+    (``aid`` -> lista de campos), permitindo remover os PIDs antigos quando o
+    artigo é atualizado ou despublicado. O hash ``opac:pid_index:journals``
+    guarda o ``url_segment`` indexado de cada periódico (vazio, se o
+    periódico não é público), permitindo reindexar os artigos do periódico
+    quando o ``url_segment`` ou o ``is_public`` são alterados.
+
+    O índice é atualizado a cada ``Article.save()`` e ``Journal.save()`` e
+    periodicamente pela tarefa ``tasks.update_pid_index`` (artigos e
+    periódicos alterados diretamente no MongoDB), e é reconstruído com
+    ``manager.py rebuild_pid_index``.
+"""
+
+import json
+import logging
+
+from flask import current_app
+from mongoengine import signals as mongoengine_signals
+from opac_schema.v1.models import Article, Journal
+from webapp.signals import reference_id
+from webapp.utils import caching
+
+logger = logging.getLogger(__name__)
+
+PID_INDEX_KEY = "opac:pid_index"
+PID_INDEX_ARTICLES_KEY = "opac:pid_index:articles"
+PID_INDEX_JOURNALS_KEY = "opac:pid_index:journals"
+REBUILD_KEY = "%s:rebuild"
+
+V1 = "v1"
+V2 = "v2"
+
+# campos carregados de cada artigo
+FIELDS = (
+    "aid",
+    "pid",
+    "aop_pid",
+    "scielo_pids",
+    "journal",
+    "is_public",
+    "publication_date",
+    "languages",
+    "original_language",
+)
+
+
+def is_enabled():
+    return bool(current_app.config.get("PID_INDEX_ENABLED"))
+
+
+def get_client():
+    """
+    Retorna o cliente do Redis do índice ou None, caso o índice esteja
+    desativado ou o backend do cache não seja o Redis.
+    """
+    if not is_enabled():
+        return None
+    return caching.get_redis_client()
+
+
+def make_field(kind, pid):
+    if kind == V2:
+        pid = pid.upper()
+    return "%s:%s" % (kind, pid)
+
+
+def article_fields(article):
+    """
+    Retorna o dicionário {campo: rank} dos PIDs do artigo ``article``.
+    """
+    from webapp.controllers import _fix_pid
+
+    scielo_pids = article.scielo_pids or {}
+    fields = {}
+
+    def add(field, rank):
+        if field not in fields or rank < fields[field]:
+            fields[field] = rank
+
+    if scielo_pids.get("v1"):
+        add(make_field(V1, scielo_pids["v1"]), 0)
+
+    v2_pids = [(article.pid, 0), (article.aop_pid, 1)] + [
+        (pid, 2) for pid in scielo_pids.get("other") or []
+    ]
+    for pid, rank in v2_pids:
+        if not pid:
+            continue
+        pid = pid.upper()
+        add(make_field(V2, pid), rank)
+        fixed = _fix_pid(pid)
+        if fixed != pid:
+            add(make_field(V2, fixed), rank + 3)
+    return fields
+
+
+def make_entry(article, url_seg, rank):
+    return {
+        "aid": article.aid,
+        "url_seg": url_seg,
+        "languages": list(article.languages or []),
+        "original_language": article.original_language,
+        "publication_date": article.publication_date,
+        "rank": rank,
+    }
+
+
+def _load(value):
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        value = value.decode("utf-8")
+    return json.loads(value)
+
+
+def _write(client, articles, url_segs, index_key, articles_key):
+    """
+    Atualiza no índice ``index_key`` os PIDs de ``articles``: indexa os
+    artigos públicos e remove os PIDs que os artigos não têm mais (ou todos,
+    dos artigos não públicos).
+
+    ``url_segs`` é o dicionário {id do periódico: url_segment}.
+    Retorna a quantidade de artigos indexados.
+    """
+    articles = [article for article in articles if article.aid]
+    if not articles:
+        return 0
+
+    aids = [article.aid for article in articles]
+    previous = dict(zip(aids, client.hmget(articles_key, aids)))
+
+    owned = {}
+    entries = {}
+    for article in articles:
+        owned[article.aid] = []
+        url_seg = url_segs.get(reference_id(article, "journal"))
+        if not article.is_public or not url_seg:
+            continue
+        for field, rank in article_fields(article).items():
+            current = entries.get(field)
+            if current is None or rank < current["rank"]:
+                entries[field] = make_entry(article, url_seg, rank)
+
+    fields = list(entries)
+    current_values = client.hmget(index_key, fields) if fields else []
+    for field, value in zip(fields, current_values):
+        current = _load(value)
+        entry = entries[field]
+        if (
+            current
+            and current["aid"] != entry["aid"]
+            and current["rank"] < entry["rank"]
+        ):
+            # outro artigo tem este PID com prioridade maior
+            del entries[field]
+            continue
+        owned[entry["aid"]].append(field)
+
+    removed = set()
+    for aid in aids:
+        removed.update(set(_load(previous[aid]) or []) - set(owned[aid]))
+    removed = [field for field in removed if field not in entries]
+    if removed:
+        # mantém os PIDs que pertencem a outros artigos
+        removed = [
+            field
+            for field, value in zip(removed, client.hmget(index_key, removed))
+            if value is not None and _load(value)["aid"] in owned
+        ]
+
+    pipe = client.pipeline()
+    if entries:
+        pipe.hmset(
+            index_key,
+            {field: json.dumps(entry) for field, entry in entries.items()},
+        )
+    if removed:
+        pipe.hdel(index_key, *removed)
+    for aid, fields in owned.items():
+        if fields:
+            pipe.hset(articles_key, aid, json.dumps(fields))
+        else:
+            pipe.hdel(articles_key, aid)
+    pipe.execute()
+    return len([aid for aid in owned if owned[aid]])
+
+
+def _url_segs(articles=None):
+    """
+    Retorna o dicionário {id do periódico: url_segment} dos periódicos
+    públicos de ``articles`` (de todos os periódicos públicos, caso
+    ``articles`` seja None).
+    """
+    journals = Journal.objects(is_public=True).only("url_segment")
+    if articles is not None:
+        jids = {reference_id(article, "journal") for article in articles}
+        journals = journals.filter(pk__in=[jid for jid in jids if jid])
+    return {journal.pk: journal.url_segment for journal in journals}
+
+
+def index_articles(articles):
+    """
+    Atualiza no índice os PIDs de ``articles``.
+    Retorna a quantidade de artigos indexados.
+    """
+    client = get_client()
+    if client is None:
+        return 0
+    articles = list(articles)
+    return _write(
+        client, articles, _url_segs(articles), PID_INDEX_KEY, PID_INDEX_ARTICLES_KEY
+    )
+
+
+def _write_batches(client, articles, url_segs, index_key, articles_key, batch_size):
+    """
+    Executa ``_write`` em lotes de ``batch_size`` artigos do queryset
+    ``articles``. Retorna ``{"total": .., "indexed": ..}``.
+    """
+    result = {"total": 0, "indexed": 0}
+    batch = []
+    for article in articles.batch_size(batch_size):
+        batch.append(article)
+        if len(batch) == batch_size:
+            result["indexed"] += _write(
+                client, batch, url_segs, index_key, articles_key
+            )
+            result["total"] += len(batch)
+            batch = []
+    if batch:
+        result["indexed"] += _write(client, batch, url_segs, index_key, articles_key)
+        result["total"] += len(batch)
+    return result
+
+
+def _journal_state(journal):
+    return journal.url_segment if journal.is_public else ""
+
+
+def index_journal(journal, batch_size=1000):
+    """
+    Reindexa os artigos do periódico ``journal`` se o ``url_segment`` ou o
+    ``is_public`` do periódico foram alterados desde a última indexação.
+    Retorna ``{"total": .., "indexed": ..}``.
+    """
+    result = {"total": 0, "indexed": 0}
+    client = get_client()
+    if client is None:
+        return result
+
+    state = _journal_state(journal)
+    if _load(client.hget(PID_INDEX_JOURNALS_KEY, journal.pk)) == state:
+        return result
+
+    result = _write_batches(
+        client,
+        Article.objects(journal=journal.pk).only(*FIELDS).no_cache(),
+        {journal.pk: state} if state else {},
+        PID_INDEX_KEY,
+        PID_INDEX_ARTICLES_KEY,
+        batch_size,
+    )
+    client.hset(PID_INDEX_JOURNALS_KEY, journal.pk, json.dumps(state))
+    return result
+
+
+def update(since, batch_size=1000):
+    """
+    Atualiza no índice os artigos alterados a partir de ``since`` e os
+    artigos dos periódicos alterados a partir de ``since`` (ver
+    ``index_journal``). Retorna ``{"total": .., "indexed": ..}``.
+    """
+    client = get_client()
+    if client is None:
+        return {"total": 0, "indexed": 0}
+
+    result = _write_batches(
+        client,
+        Article.objects(updated__gte=since).only(*FIELDS).no_cache(),
+        _url_segs(),
+        PID_INDEX_KEY,
+        PID_INDEX_ARTICLES_KEY,
+        batch_size,
+    )
+    journals = Journal.objects(updated__gte=since).only("url_segment", "is_public")
+    for journal in journals:
+        journal_result = index_journal(journal, batch_size)
+        result["total"] += journal_result["total"]
+        result["indexed"] += journal_result["indexed"]
+    return result
+
+
+def build(batch_size=1000):
+    """
+    Reconstrói o índice com todos os artigos públicos. O novo índice é
+    gerado em chaves temporárias e substitui o anterior ao final (RENAME),
+    assim as consultas nunca encontram um índice incompleto.
+    Retorna ``{"total": .., "indexed": ..}``.
+    """
+    client = get_client()
+    if client is None:
+        return {"total": 0, "indexed": 0}
+
+    index_key = REBUILD_KEY % PID_INDEX_KEY
+    articles_key = REBUILD_KEY % PID_INDEX_ARTICLES_KEY
+    client.delete(index_key, articles_key)
+
+    states = {
+        journal.pk: _journal_state(journal)
+        for journal in Journal.objects.only("url_segment", "is_public")
+    }
+    result = _write_batches(
+        client,
+        Article.objects(is_public=True).only(*FIELDS).no_cache(),
+        {pk: state for pk, state in states.items() if state},
+        index_key,
+        articles_key,
+        batch_size,
+    )
+
+    pipe = client.pipeline()
+    if result["indexed"]:
+        pipe.rename(index_key, PID_INDEX_KEY)
+        pipe.rename(articles_key, PID_INDEX_ARTICLES_KEY)
+    else:
+        pipe.delete(PID_INDEX_KEY, PID_INDEX_ARTICLES_KEY)
+    pipe.delete(PID_INDEX_JOURNALS_KEY)
+    if states:
+        pipe.hmset(
+            PID_INDEX_JOURNALS_KEY,
+            {pk: json.dumps(state) for pk, state in states.items()},
+        )
+    pipe.execute()
+    return result
+
+
+def lookup(kind, pid):
+    """
+    Retorna a entrada do índice do PID ``pid`` (``V1`` ou ``V2``), ou None
+    caso o PID não esteja no índice ou o artigo esteja sob embargo
+    (``publication_date`` futura).
+    """
+    from webapp.controllers import now
+
+    client = get_client()
+    if client is None or not pid:
+        return None
+    try:
+        entry = _load(client.hget(PID_INDEX_KEY, make_field(kind, pid)))
+    except Exception:
+        logger.exception("Unable to read the PID index")
+        return None
+    if not entry:
+        return None
+    if entry["publication_date"] and entry["publication_date"] > now():
+        return None
+    return entry
+
+
+def remove_articles(articles):
+    """
+    Remove do índice os PIDs de ``articles``.
+    """
+    client = get_client()
+    if client is None:
+        return
+    _write(client, list(articles), {}, PID_INDEX_KEY, PID_INDEX_ARTICLES_KEY)
+
+
+def _index_article_on_save(sender, document, **kwargs):
+    if not is_enabled():
+        return
+    try:
+        index_articles([document])
+    except Exception:
+        logger.exception("Unable to update the PID index of %s", document.aid)
+
+
+def _remove_article_on_delete(sender, document, **kwargs):
+    if not is_enabled():
+        return
+    try:
+        remove_articles([document])
+    except Exception:
+        logger.exception("Unable to update the PID index of %s", document.aid)
+
+
+def _index_journal_on_save(sender, document, **kwargs):
+    if not is_enabled():
+        return
+    try:
+        index_journal(document)
+    except Exception:
+        logger.exception("Unable to update the PID index of %s", document.pk)
+
+
+mongoengine_signals.post_save.connect(_index_article_on_save, sender=Article)
+mongoengine_signals.post_delete.connect(_remove_article_on_delete, sender=Article)
+mongoengine_signals.post_save.connect(_index_journal_on_save, sender=Journal)
@@ -0,0 +1,94 @@
+# coding: utf-8
+
+"""
+    Projeções (campos carregados do MongoDB) das consultas das páginas de
+    listagem.
+
+    Cada página declara os campos que utiliza (na view, no template e nas
+    funções auxiliares, ex.: ``controllers.get_journal_json_data``) e os
+    controllers aplicam a projeção com ``QuerySet.only``, evitando trafegar e
+    instanciar campos volumosos (resumos, htmls, pdfs, títulos traduzidos,
+    métricas etc.) que não são exibidos.
+
+    Os campos referenciados, mas não declarados no modelo (ex.: propriedades),
+    são ignorados pela função ``project``, portanto os campos dos quais elas
+    dependem devem estar na projeção.
+"""
+
+# Lista alfabética de periódicos (``get_journal_json_data``)
+JOURNAL_LIST = (
+    "title",
+    "title_slug",
+    "url_segment",
+    "online_submission_url",
+    "current_status",
+    "issue_count",
+    "next_title",
+    "last_issue",
+    "url_last_issue",
+    "url_next_journal",
+)
+
+# Lista temática de periódicos: campos da lista alfabética e campos de agrupamento
+JOURNAL_GROUPED_LIST = JOURNAL_LIST + (
+    "study_areas",
+    "subject_categories",
+    "index_at",
+    "publisher_name",
+)
+
+# Grade de números (``issue/grid.html``) e navegação entre os números
+ISSUE_GRID = (
+    "iid",
+    "journal",
+    "type",
+    "year",
+    "volume",
+    "number",
+    "suppl_text",
+    "order",
+    "url_segment",
+)
+
+# Sumário do número (``controllers.get_issue_toc`` e ``issue/toc.html``)
+ISSUE_TOC_ARTICLE = (
+    "aid",
+    "pid",
+    "doi",
+    "issue",
+    "order",
+    "updated",
+    "publication_date",
+    "title",
+    "translated_titles",
+    "section",
+    "sections",
+    "authors",
+    "abstract",
+    "abstracts",
+    "abstract_languages",
+    "htmls",
+    "pdfs",
+)
+
+# Artigos mais recentes da página do periódico (``recent_articles_row.html``)
+RECENT_ARTICLE = (
+    "aid",
+    "journal",
+    "order",
+    "title",
+    "translated_titles",
+)
+
+
+def project(queryset, fields=None):
+    """
+    Aplica a projeção ``fields`` ao ``queryset``.
+    Retorna o ``queryset`` sem alteração quando ``fields`` é vazio.
+    """
+    if not fields:
+        return queryset
+    document_fields = queryset._document._fields
+    return queryset.only(
+        *[field for field in fields if field.split(".")[0] in document_fields]
+    )
@@ -0,0 +1,62 @@
+# coding: utf-8
+
+"""
+    Sinais emitidos pelos controllers quando documentos do catálogo mudam de
+    estado (publicação, despublicação, exibição do texto completo).
+
+    Os receptores registrados neste módulo removem do cache somente as páginas
+    que dependem dos documentos alterados (ver ``utils.caching``), permitindo
+    tempos de vida longos no cache sem servir conteúdo desatualizado ou
+    despublicado.
+
+    Os sinais são enviados com o app atual como ``sender`` e os documentos
+    alterados como argumentos nomeados::
+
+        journals_changed.send(app, jids=[...])
+        issues_changed.send(app, issues=[...])
+        articles_changed.send(app, articles=[...])
+"""
+
+from blinker import Namespace
+from webapp.utils import caching
+
+_signals = Namespace()
+
+journals_changed = _signals.signal("journals-changed")
+issues_changed = _signals.signal("issues-changed")
+articles_changed = _signals.signal("articles-changed")
+
+
+def reference_id(document, field_name):
+    """
+    Retorna o id do documento referenciado pelo campo ``field_name`` sem
+    obtê-lo do MongoDB.
+    """
+    value = document._data.get(field_name)
+    return getattr(value, "id", value)
+
+
+@journals_changed.connect
+def invalidate_journals_cache(sender, jids=(), **extra):
+    caching.invalidate_cache_tags(
+        [caching.JOURNALS_TAG] + [caching.journal_tag(jid) for jid in jids]
+    )
+
+
+@issues_changed.connect
+def invalidate_issues_cache(sender, issues=(), **extra):
+    tags = []
+    for issue in issues:
+        tags.append(caching.issue_tag(issue.iid))
+        tags.append(caching.journal_tag(reference_id(issue, "journal")))
+    caching.invalidate_cache_tags(tags)
+
+
+@articles_changed.connect
+def invalidate_articles_cache(sender, articles=(), **extra):
+    tags = []
+    for article in articles:
+        tags.append(caching.article_tag(article.aid))
+        tags.append(caching.issue_tag(reference_id(article, "issue")))
+        tags.append(caching.journal_tag(reference_id(article, "journal")))
+    caching.invalidate_cache_tags(tags)
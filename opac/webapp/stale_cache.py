@@ -0,0 +1,182 @@
+# coding: utf-8
+
+"""
+    Extensão do Flask-Caching com o modo "stale-while-revalidate" para as views
+    decoradas com ``@cache.cached(key_prefix=<função>)``.
+
+    Cada resposta é armazenada com tempo de vida ``timeout + CACHE_STALE_TIMEOUT``
+    e uma marca de validade (``<chave>:fresh``) com tempo de vida ``timeout``.
+    Quando a marca expira:
+
+    - somente a requisição que obtém o lock no Redis (``<chave>:lock``, SET NX)
+      gera novamente a resposta;
+    - as demais requisições recebem a resposta anterior (stale) até que a nova
+      seja armazenada.
+
+    Quando não há resposta no cache, as requisições simultâneas do mesmo worker
+    para a mesma chave aguardam a primeira gerar a resposta (single-flight),
+    em vez de repetir as mesmas consultas (ex.: contagens no MongoDB da ``index``).
+
+    O ``timeout`` de cada view pode ser definido por endpoint na configuração
+    ``CACHE_ENDPOINT_TIMEOUTS`` (ex.: ``{"main.index": 600}``).
+"""
+
+import functools
+import logging
+import threading
+
+from flask import current_app, request
+
+from .page_cache import PageCache, cached_page
+
+logger = logging.getLogger(__name__)
+
+FRESH_KEY = "%s:fresh"
+LOCK_KEY = "%s:lock"
+
+
+class StaleWhileRevalidateCache(PageCache):
+    def __init__(self, *args, **kwargs):
+        super(StaleWhileRevalidateCache, self).__init__(*args, **kwargs)
+        self._inflight = {}
+        self._inflight_lock = threading.Lock()
+
+    def cached(self, timeout=None, key_prefix="view/%s", **kwargs):
+        """
+        Igual ao ``Cache.cached``, porém no modo "stale-while-revalidate"
+        (``CACHE_STALE_WHILE_REVALIDATE``) quando ``key_prefix`` é uma função.
+        São considerados somente os parâmetros ``unless`` e ``response_filter``.
+        """
+        if not callable(key_prefix):
+            return super(StaleWhileRevalidateCache, self).cached(
+                timeout=timeout, key_prefix=key_prefix, **kwargs
+            )
+
+        unless = kwargs.get("unless")
+        response_filter = kwargs.get("response_filter")
+        cached = super(StaleWhileRevalidateCache, self).cached(
+            timeout=timeout, key_prefix=key_prefix, **kwargs
+        )
+
+        def decorator(f):
+            cached_function = cached(f)
+            # o ``str`` retornado pela view é armazenado como ``CachedPage``
+            page_function = cached_page(f)
+
+            @functools.wraps(f)
+            def decorated_function(*args, **kw):
+                if not current_app.config.get("CACHE_STALE_WHILE_REVALIDATE"):
+                    cached_function.cache_timeout = self._endpoint_timeout(
+                        decorated_function.cache_timeout
+                    )
+                    return cached_function(*args, **kw)
+                if self._bypass_cache(unless, f, *args, **kw):
+                    return f(*args, **kw)
+                return self._get_or_revalidate(
+                    key_prefix(),
+                    self._endpoint_timeout(decorated_function.cache_timeout),
+                    response_filter,
+                    page_function,
+                    *args,
+                    **kw
+                )
+
+            decorated_function.uncached = f
+            decorated_function.cache_timeout = timeout
+            return decorated_function
+
+        return decorator
+
+    def _endpoint_timeout(self, timeout):
+        timeouts = current_app.config.get("CACHE_ENDPOINT_TIMEOUTS") or {}
+        timeout = timeouts.get(request.endpoint, timeout)
+        if timeout is None:
+            timeout = current_app.config["CACHE_DEFAULT_TIMEOUT"]
+        return int(timeout)
+
+    def _get_or_revalidate(self, cache_key, timeout, response_filter, f, *args, **kw):
+        try:
+            rv, fresh = self.cache.get_many(cache_key, FRESH_KEY % cache_key)
+        except Exception:
+            logger.exception("Exception possibly due to cache backend.")
+            return f(*args, **kw)
+
+        if rv is not None:
+            if fresh is not None or not self._acquire_lock(cache_key):
+                # válida, ou outra requisição está gerando a nova resposta
+                return rv
+            try:
+                return self._compute(
+                    cache_key, timeout, response_filter, f, *args, **kw
+                )
+            finally:
+                self._release_lock(cache_key)
+
+        # sem resposta no cache: uma requisição por chave em cada worker
+        with self._inflight_lock:
+            key_lock = self._inflight.get(cache_key)
+            holder = key_lock is None
+            if holder:
+                key_lock = self._inflight[cache_key] = threading.Lock()
+                key_lock.acquire()
+
+        if holder:
+            try:
+                rv = self._cache_get(cache_key)
+                if rv is None:
+                    rv = self._compute(
+                        cache_key, timeout, response_filter, f, *args, **kw
+                    )
+                return rv
+            finally:
+                with self._inflight_lock:
+                    del self._inflight[cache_key]
+                key_lock.release()
+
+        # aguarda a requisição que está gerando a resposta
+        with key_lock:
+            pass
+        rv = self._cache_get(cache_key)
+        if rv is None:
+            # a resposta não foi armazenada (ex.: recusada pelo ``response_filter``)
+            return f(*args, **kw)
+        return rv
+
+    def _cache_get(self, cache_key):
+        try:
+            return self.cache.get(cache_key)
+        except Exception:
+            logger.exception("Exception possibly due to cache backend.")
+
+    def _compute(self, cache_key, timeout, response_filter, f, *args, **kw):
+        rv = f(*args, **kw)
+        if response_filter is None or response_filter(rv):
+            # timeout 0: sem expiração
+            stale_timeout = int(current_app.config["CACHE_STALE_TIMEOUT"])
+            try:
+                self.cache.set(
+                    cache_key, rv, timeout=timeout + stale_timeout if timeout else 0
+                )
+                self.cache.set(FRESH_KEY % cache_key, 1, timeout=timeout)
+            except Exception:
+                logger.exception("Exception possibly due to cache backend.")
+        return rv
+
+    def _acquire_lock(self, cache_key):
+        try:
+            return bool(
+                self.cache.add(
+                    LOCK_KEY % cache_key,
+                    1,
+                    timeout=int(current_app.config["CACHE_LOCK_TIMEOUT"]),
+                )
+            )
+        except Exception:
+            logger.exception("Exception possibly due to cache backend.")
+            return False
+
+    def _release_lock(self, cache_key):
+        try:
+            self.cache.delete(LOCK_KEY % cache_key)
+        except Exception:
+            logger.exception("Exception possibly due to cache backend.")
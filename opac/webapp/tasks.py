@@ -1,13 +1,30 @@
 # coding: utf-8
 
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import webapp
 from flask import current_app
 from redis import Redis
-from rq import Queue
+from rq import Queue, get_current_job
 from rq_scheduler import Scheduler
 
+logger = logging.getLogger(__name__)
+
+PRERENDER_QUEUE_NAME = "prerender"
+
+
+def get_redis_connection():
+    return Redis(**current_app.config["RQ_REDIS_SETTINGS"])
+
+
+def get_queue(queue_name):
+    return Queue(queue_name, connection=get_redis_connection())
+
 
 def get_scheduler(queue_name):
-    redis_conn = Redis(**current_app.config["RQ_REDIS_SETTINGS"])
+    redis_conn = get_redis_connection()
     queue = Queue(queue_name, connection=redis_conn)
     return Scheduler(queue=queue, connection=redis_conn)
 
@@ -26,3 +43,295 @@ def clear_scheduler(queue_name):
         if job.origin == queue_name:
             print("removendo job %s do scheduler" % job.id)
             scheduler.cancel(job)
+
+
+# -------- PRÉ-RENDERIZAÇÃO DOS ARTIGOS --------
+
+PRERENDER_DATE_FORMAT = "%Y-%m-%d"
+
+
+def get_prerender_period(days=None, begin_date=None, end_date=None):
+    """
+    Retorna a tupla (begin_date, end_date), datetimes, do período da
+    pré-renderização, em UTC. ``begin_date`` e ``end_date`` são strings no
+    formato YYYY-MM-DD e o período inclui todo o dia ``end_date``; sem
+    ``end_date`` o período termina agora e sem ``begin_date`` começa ``days``
+    (default: ``PRERENDER_DAYS``) dias antes do fim.
+    """
+    if end_date:
+        end_date = datetime.strptime(end_date, PRERENDER_DATE_FORMAT)
+        begin = end_date
+        # até o fim do dia ``end_date``
+        end_date += timedelta(days=1, microseconds=-1)
+    else:
+        begin = end_date = datetime.utcnow()
+    if begin_date:
+        begin_date = datetime.strptime(begin_date, PRERENDER_DATE_FORMAT)
+    else:
+        days = int(days or current_app.config["PRERENDER_DAYS"])
+        begin_date = begin - timedelta(days=days)
+    return begin_date, end_date
+
+
+def enqueue_articles_prerender(begin_date, end_date, batch_size=None):
+    """
+    Enfileira na fila ``prerender`` os artigos atualizados entre ``begin_date``
+    e ``end_date`` (ver ``controllers.get_articles_by_date_range``), em lotes
+    de ``batch_size`` artigos por job.
+
+    Retorna a lista de jobs enfileirados.
+    """
+    from webapp import controllers
+
+    batch_size = batch_size or current_app.config["PRERENDER_BATCH_SIZE"]
+    timeout = current_app.config["DEFAULT_SCHEDULER_TIMEOUT"]
+    queue = get_queue(PRERENDER_QUEUE_NAME)
+
+    jobs = []
+    page = 1
+    while True:
+        articles = controllers.get_articles_by_date_range(
+            begin_date, end_date, page=page, per_page=batch_size
+        )
+        aids = [article.aid for article in articles.items]
+        if aids:
+            jobs.append(
+                queue.enqueue_call(
+                    func=prerender_articles, args=(aids,), timeout=timeout
+                )
+            )
+        if not articles.has_next:
+            break
+        page += 1
+    return jobs
+
+
+def enqueue_recent_articles_prerender():
+    """
+    Tarefa do scheduler: enfileira a pré-renderização dos artigos atualizados
+    nos últimos ``PRERENDER_DAYS`` dias.
+    """
+    flask_app = webapp.create_app()
+
+    with flask_app.app_context():
+        begin_date, end_date = get_prerender_period()
+        jobs = enqueue_articles_prerender(begin_date, end_date)
+        print("%s jobs de pré-renderização enfileirados" % len(jobs))
+
+
+def get_prerender_progress(jobs):
+    """
+    Retorna o progresso agregado de uma lista de jobs de pré-renderização:
+    ``{"jobs": .., "finished_jobs": .., "failed_jobs": .., "total": ..,
+    "done": .., "rendered": .., "skipped": .., "failed": ..}``
+    """
+    progress = {
+        "jobs": len(jobs),
+        "finished_jobs": 0,
+        "failed_jobs": 0,
+        "total": 0,
+        "done": 0,
+        "rendered": 0,
+        "skipped": 0,
+        "failed": 0,
+    }
+    for job in jobs:
+        job.refresh()
+        if job.is_finished:
+            progress["finished_jobs"] += 1
+        elif job.is_failed:
+            progress["failed_jobs"] += 1
+        for key, value in job.meta.get("progress", {}).items():
+            progress[key] += value
+    return progress
+
+
+def _prerender_article(flask_app, aid):
+    from opac_schema.v1.models import Article
+    from webapp.main import views
+
+    with flask_app.app_context():
+        article = Article.objects(aid=aid, is_public=True).first()
+        if not article or not article.xml:
+            return "skipped"
+        try:
+            views.render_html_from_xml(article, article.original_language)
+        except Exception as exc:
+            logger.error("Unable to prerender the article %s: %s", aid, exc)
+            return "failed"
+        return "rendered"
+
+
+def prerender_articles(aids):
+    """
+    Job da fila ``prerender``: obtém o XML e gera o HTML de todos os idiomas
+    de cada artigo de ``aids``, armazenando-os no cache de HTML
+    (ver ``utils.render_cache``), assim o primeiro leitor não paga a
+    requisição ao SSM nem a renderização do packtools.
+
+    Os artigos são processados com no máximo ``PRERENDER_CONCURRENCY``
+    renderizações simultâneas por worker. O progresso fica registrado em
+    ``job.meta["progress"]``.
+    """
+    flask_app = webapp.create_app()
+
+    with flask_app.app_context():
+        if not current_app.config["RENDER_CACHE_ENABLED"]:
+            print(
+                "O cache de HTML esta desativado. "
+                "Verifique a conf: RENDER_CACHE_ENABLED"
+            )
+            return
+        concurrency = current_app.config["PRERENDER_CONCURRENCY"]
+
+    job = get_current_job()
+    progress = {
+        "total": len(aids),
+        "done": 0,
+        "rendered": 0,
+        "skipped": 0,
+        "failed": 0,
+    }
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = executor.map(lambda aid: _prerender_article(flask_app, aid), aids)
+        for result in results:
+            progress["done"] += 1
+            progress[result] += 1
+            if job:
+                job.meta["progress"] = progress
+                job.save_meta()
+
+    print(
+        "artigos: %(total)s, renderizados: %(rendered)s, "
+        "ignorados: %(skipped)s, falhas: %(failed)s" % progress
+    )
+    return progress
+
+
+# -------- RECONCILIAÇÃO DOS PERIÓDICOS --------
+
+JOURNALS_QUEUE_NAME = "journals"
+RECONCILE_JOURNALS_LAST_RUN_KEY = "opac:reconcile_journals:last_run"
+DATETIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+def _reconcile_journals(since):
+    from webapp import controllers
+
+    jids = controllers.get_jids_to_reconcile(since)
+    result = controllers.reconcile_journals(jids)
+    print("periódicos: %(total)s, atualizados: %(updated)s" % result)
+    return result
+
+
+def reconcile_journals(since=None):
+    """
+    Job da fila ``journals``: atualiza ``issue_count`` e ``last_issue`` dos
+    periódicos com números atualizados a partir de ``since`` (todos os
+    periódicos, caso ``since`` não seja informado), assim as páginas apenas
+    leem estes valores (ver ``controllers.reconcile_journals``).
+    """
+    flask_app = webapp.create_app()
+
+    with flask_app.app_context():
+        return _reconcile_journals(since)
+
+
+def reconcile_updated_journals():
+    """
+    Tarefa do scheduler: reconcilia os periódicos com números atualizados desde
+    a execução anterior. Na primeira execução considera os números atualizados
+    nos últimos ``RECONCILE_JOURNALS_DAYS`` dias.
+    """
+    flask_app = webapp.create_app()
+
+    with flask_app.app_context():
+        redis_conn = get_redis_connection()
+        started_at = datetime.utcnow()
+        last_run = redis_conn.get(RECONCILE_JOURNALS_LAST_RUN_KEY)
+        if last_run:
+            since = datetime.strptime(last_run.decode("utf-8"), DATETIME_FORMAT)
+        else:
+            since = started_at - timedelta(
+                days=current_app.config["RECONCILE_JOURNALS_DAYS"]
+            )
+
+        result = _reconcile_journals(since)
+        redis_conn.set(
+            RECONCILE_JOURNALS_LAST_RUN_KEY, started_at.strftime(DATETIME_FORMAT)
+        )
+        return result
+
+
+# -------- ÍNDICE DOS PIDS LEGADOS --------
+
+PID_INDEX_QUEUE_NAME = "pid_index"
+PID_INDEX_LAST_RUN_KEY = "opac:pid_index:last_run"
+
+
+def build_pid_index():
+    """
+    Job da fila ``pid_index``: reconstrói o índice dos PIDs legados com todos
+    os artigos públicos (ver ``pid_index.build``).
+    """
+    from webapp import pid_index
+
+    flask_app = webapp.create_app()
+
+    with flask_app.app_context():
+        result = pid_index.build()
+        print("artigos: %(total)s, indexados: %(indexed)s" % result)
+        return result
+
+
+def update_pid_index():
+    """
+    Tarefa do scheduler: atualiza o índice dos PIDs legados com os artigos
+    atualizados desde a execução anterior. Na primeira execução considera os
+    artigos atualizados nos últimos ``PID_INDEX_DAYS`` dias.
+    """
+    from webapp import pid_index
+
+    flask_app = webapp.create_app()
+
+    with flask_app.app_context():
+        redis_conn = get_redis_connection()
+        started_at = datetime.utcnow()
+        last_run = redis_conn.get(PID_INDEX_LAST_RUN_KEY)
+        if last_run:
+            since = datetime.strptime(last_run.decode("utf-8"), DATETIME_FORMAT)
+        else:
+            since = started_at - timedelta(days=current_app.config["PID_INDEX_DAYS"])
+
+        result = pid_index.update(since)
+        print("artigos: %(total)s, indexados: %(indexed)s" % result)
+        redis_conn.set(PID_INDEX_LAST_RUN_KEY, started_at.strftime(DATETIME_FORMAT))
+        return result
+
+
+# -------- ARQUIVOS DA LISTA DE PERIÓDICOS --------
+
+JOURNAL_EXPORTS_QUEUE_NAME = "journal_exports"
+
+
+def generate_journal_exports(force=False):
+    """
+    Tarefa do scheduler: gera os arquivos (CSV e XLS) do download da lista de
+    periódicos quando os periódicos foram alterados desde a geração anterior
+    (ver ``journal_exports.generate``).
+    """
+    from webapp import journal_exports
+
+    flask_app = webapp.create_app()
+
+    with flask_app.app_context():
+        if not current_app.config["JOURNAL_EXPORTS_ENABLED"]:
+            print(
+                "Os arquivos da lista de periódicos estão desativados. "
+                "Verifique a conf: JOURNAL_EXPORTS_ENABLED"
+            )
+            return []
+        generated = journal_exports.generate(force)
+        print("%s arquivos gerados" % len(generated))
+        return generated
@@ -0,0 +1,313 @@
+# coding: utf-8
+
+"""
+    Backends do Flask-Caching usados pelo OPAC.
+
+    ``TwoTierRedisCache`` adiciona ao ``RedisCache`` um cache local (em memória)
+    em cada processo (worker do gunicorn), limitado em bytes e com tempo de
+    vida curto (``CACHE_LOCAL_*``). As páginas mais acessadas (ex.: ``/`` e as
+    páginas dos periódicos) são servidas sem a ida ao Redis.
+
+    O cache local armazena os valores serializados (os mesmos bytes gravados no
+    Redis) e os desserializa a cada leitura, assim requisições simultâneas
+    nunca compartilham o mesmo objeto (ex.: ``Response``).
+
+    As remoções feitas por um worker não alcançam o cache local dos demais,
+    por isso o tempo de vida local (``CACHE_LOCAL_TIMEOUT``) deve ser curto.
+
+    ``CompressedRedisCache`` armazena os valores maiores que
+    ``CACHE_COMPRESS_MIN_SIZE`` comprimidos com gzip. Somente as páginas HTML
+    armazenadas pelas views decoradas com ``@cache.cached`` (marcadas como
+    ``CachedPage``, ver ``webapp.page_cache``) são servidas com os bytes comprimidos
+    (``Content-Encoding: gzip``) quando o cliente aceita gzip, sem
+    descompressão nem nova compressão a cada acesso. Os demais valores são
+    restaurados sem alteração.
+"""
+
+import logging
+import pickle
+import threading
+import time
+import zlib
+from collections import OrderedDict
+
+from flask import Response, current_app, has_request_context, request
+from flask_caching.backends.rediscache import RedisCache
+
+logger = logging.getLogger(__name__)
+
+
+class LocalLRUCache(object):
+    """
+    Cache LRU em memória limitado pelo total de bytes dos valores.
+    Os valores devem ser ``bytes``.
+    """
+
+    def __init__(self, max_bytes, timeout, max_item_bytes=None):
+        self.max_bytes = max_bytes
+        self.timeout = timeout
+        self.max_item_bytes = max_item_bytes or max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._items)
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is None:
+                return None
+            expires, data = item
+            if expires < time.time():
+                self._remove(key)
+                return None
+            self._items.move_to_end(key)
+            return data
+
+    def set(self, key, data, timeout=None):
+        if timeout is None or timeout <= 0 or timeout > self.timeout:
+            timeout = self.timeout
+        with self._lock:
+            self._remove(key)
+            if timeout <= 0 or len(data) > self.max_item_bytes:
+                return False
+            self._items[key] = (time.time() + timeout, data)
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                self._remove(next(iter(self._items)))
+            return True
+
+    def delete(self, key):
+        with self._lock:
+            self._remove(key)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.size = 0
+
+    def _remove(self, key):
+        item = self._items.pop(key, None)
+        if item is not None:
+            self.size -= len(item[1])
+
+
+class CachedPage(str):
+    """
+    Página HTML (``str``) retornada por uma view decorada com ``@cache.cached``
+    (ver ``webapp.page_cache``).
+    """
+
+    __slots__ = ()
+
+
+def gzip_compress(data, level=6):
+    """
+    Comprime ``data`` no formato gzip (sem data de modificação, assim o mesmo
+    conteúdo gera sempre os mesmos bytes).
+    """
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+    return compressor.compress(data) + compressor.flush()
+
+
+def gzip_decompress(data):
+    return zlib.decompress(data, 31)
+
+
+class CompressedRedisCache(RedisCache):
+    """
+    ``RedisCache`` que armazena os valores grandes comprimidos com gzip.
+    Para usá-lo: ``CACHE_COMPRESS_ENABLED=True`` com ``CACHE_TYPE='redis'``.
+
+    Os valores comprimidos são gravados como ``b"z"`` seguido do pickle de::
+
+        {"kind": "page" | "response" | "object", "body": <gzip>,
+         "status": .., "headers": [..]}
+
+    As páginas (``CachedPage``) são restauradas como ``Response`` com o corpo
+    comprimido quando a requisição atual aceita gzip, ou como ``CachedPage``.
+    """
+
+    COMPRESSED_MARKER = b"z"
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        cache = super(CompressedRedisCache, cls).factory(app, config, args, kwargs)
+        cache.compress_enabled = bool(config["CACHE_COMPRESS_ENABLED"])
+        cache.compress_min_size = int(config["CACHE_COMPRESS_MIN_SIZE"])
+        cache.compress_level = int(config["CACHE_COMPRESS_LEVEL"])
+        return cache
+
+    def dump_object(self, value):
+        if not getattr(self, "compress_enabled", False) or type(value) == int:
+            return super(CompressedRedisCache, self).dump_object(value)
+
+        if isinstance(value, CachedPage):
+            data = {"kind": "page", "body": value.encode("utf-8")}
+        elif (
+            isinstance(value, Response)
+            and not value.is_streamed
+            and "Content-Encoding" not in value.headers
+        ):
+            data = {
+                "kind": "response",
+                "body": value.get_data(),
+                "status": value.status_code,
+                "headers": [
+                    (name, header)
+                    for name, header in value.headers.items()
+                    if name.lower() != "content-length"
+                ],
+            }
+        else:
+            data = {"kind": "object", "body": pickle.dumps(value)}
+
+        if len(data["body"]) < self.compress_min_size:
+            return super(CompressedRedisCache, self).dump_object(value)
+        data["body"] = gzip_compress(data["body"], self.compress_level)
+        return self.COMPRESSED_MARKER + pickle.dumps(data)
+
+    def load_object(self, value):
+        if value is None or not value.startswith(self.COMPRESSED_MARKER):
+            return super(CompressedRedisCache, self).load_object(value)
+        try:
+            data = pickle.loads(value[1:])
+        except pickle.PickleError:
+            return None
+
+        if data["kind"] == "page" and accepts_gzip():
+            headers = {"Content-Encoding": "gzip", "Vary": "Accept-Encoding"}
+            return Response(data["body"], mimetype="text/html", headers=headers)
+
+        body = gzip_decompress(data["body"])
+        if data["kind"] == "page":
+            return CachedPage(body.decode("utf-8"))
+        if data["kind"] == "response":
+            return Response(body, status=data["status"], headers=data["headers"])
+        if data["kind"] == "object":
+            return pickle.loads(body)
+        return None
+
+
+def accepts_gzip():
+    """
+    Indica se a resposta da requisição atual pode ser enviada comprimida.
+    Com a minificação do HTML ativa (``MINIFY_PAGE``) o corpo da resposta
+    é alterado após a view, portanto os bytes comprimidos não são repassados.
+    """
+    return (
+        has_request_context()
+        and not current_app.config.get("MINIFY_PAGE")
+        and request.accept_encodings["gzip"] > 0
+    )
+
+
+class TwoTierRedisCache(CompressedRedisCache):
+    """
+    ``RedisCache`` com um cache local (``LocalLRUCache``) na frente.
+    Para usá-lo: ``CACHE_LOCAL_ENABLED=True`` com ``CACHE_TYPE='redis'``.
+    """
+
+    @classmethod
+    def factory(cls, app, config, args, kwargs):
+        cache = super(TwoTierRedisCache, cls).factory(app, config, args, kwargs)
+        cache.local = LocalLRUCache(
+            max_bytes=int(config["CACHE_LOCAL_MAX_BYTES"]),
+            timeout=int(config["CACHE_LOCAL_TIMEOUT"]),
+            max_item_bytes=int(config["CACHE_LOCAL_MAX_ITEM_BYTES"]),
+        )
+        cache.stats_log_interval = int(config["CACHE_LOCAL_STATS_LOG_INTERVAL"])
+        cache.stats = {
+            "local_hits": 0,
+            "local_misses": 0,
+            "redis_hits": 0,
+            "redis_misses": 0,
+        }
+        return cache
+
+    def get_stats(self):
+        """
+        Retorna os contadores de acertos (hits) e falhas (misses) de cada
+        camada e a ocupação do cache local.
+        """
+        stats = dict(self.stats)
+        stats["local_items"] = len(self.local)
+        stats["local_bytes"] = self.local.size
+        return stats
+
+    def _count(self, name):
+        self.stats[name] += 1
+        interval = self.stats_log_interval
+        total = self.stats["local_hits"] + self.stats["local_misses"]
+        if interval and name.startswith("local_") and total % interval == 0:
+            logger.info("Two-tier cache stats: %s", self.get_stats())
+
+    def get(self, key):
+        data = self.local.get(key)
+        if data is not None:
+            self._count("local_hits")
+            return self.load_object(data)
+        self._count("local_misses")
+
+        data = self._read_clients.get(self._get_prefix() + key)
+        if data is None:
+            self._count("redis_misses")
+            return None
+        self._count("redis_hits")
+        self.local.set(key, data)
+        return self.load_object(data)
+
+    def get_many(self, *keys):
+        return [self.get(key) for key in keys]
+
+    def set(self, key, value, timeout=None):
+        timeout = self._normalize_timeout(timeout)
+        dump = self.dump_object(value)
+        if timeout == -1:
+            result = self._write_client.set(name=self._get_prefix() + key, value=dump)
+        else:
+            result = self._write_client.setex(
+                name=self._get_prefix() + key, value=dump, time=timeout
+            )
+        if result:
+            self.local.set(key, dump, timeout)
+        else:
+            self.local.delete(key)
+        return result
+
+    def set_many(self, mapping, timeout=None):
+        for key in mapping:
+            self.local.delete(key)
+        return super(TwoTierRedisCache, self).set_many(mapping, timeout=timeout)
+
+    def add(self, key, value, timeout=None):
+        self.local.delete(key)
+        return super(TwoTierRedisCache, self).add(key, value, timeout=timeout)
+
+    def delete(self, key):
+        self.local.delete(key)
+        return super(TwoTierRedisCache, self).delete(key)
+
+    def delete_many(self, *keys):
+        for key in keys:
+            self.local.delete(key)
+        return super(TwoTierRedisCache, self).delete_many(*keys)
+
+    def has(self, key):
+        if self.local.get(key) is not None:
+            return True
+        return super(TwoTierRedisCache, self).has(key)
+
+    def clear(self):
+        self.local.clear()
+        return super(TwoTierRedisCache, self).clear()
+
+    def inc(self, key, delta=1):
+        self.local.delete(key)
+        return super(TwoTierRedisCache, self).inc(key, delta=delta)
+
+    def dec(self, key, delta=1):
+        self.local.delete(key)
+        return super(TwoTierRedisCache, self).dec(key, delta=delta)
@@ -1,7 +1,23 @@
 # Redis Cache Key Generation:
 import hashlib
+import logging
+from functools import wraps
 
-from flask import current_app, request, session
+from flask import (
+    Response,
+    current_app,
+    g,
+    has_request_context,
+    make_response,
+    request,
+    session,
+)
+
+logger = logging.getLogger(__name__)
+
+CACHE_TAG_KEY = "tag:%s"
+# tag das páginas com a lista de periódicos da coleção
+JOURNALS_TAG = "journals"
 
 
 def _make_querystring_hash():
@@ -41,7 +57,8 @@ def cache_key_with_lang():
 
     default_lang = current_app.config.get("BABEL_DEFAULT_LOCALE")
     language = session.get("lang", default_lang)
-    return _cache_key_format(language, request.path)
+    g.cache_key = _cache_key_format(language, request.path)
+    return g.cache_key
 
 
 def cache_key_with_lang_with_qs():
@@ -56,4 +73,182 @@ def cache_key_with_lang_with_qs():
     default_lang = current_app.config.get("BABEL_DEFAULT_LOCALE")
     language = session.get("lang", default_lang)
     qs_hash = _make_querystring_hash()
-    return _cache_key_format(language, request.path, qs_hash)
+    g.cache_key = _cache_key_format(language, request.path, qs_hash)
+    return g.cache_key
+
+
+def is_cacheable_response(response):
+    """
+    Função usada como ``response_filter`` no decorator @cache.cached
+    Retorna False para as respostas que não devem ser armazenadas no cache:
+    - respostas diferentes de 200 (ex.: 206 e 304 das requisições parciais e condicionais)
+    - respostas repassadas em blocos (streaming), cujo conteúdo não está em memória
+    - respostas maiores que ``CACHE_MAX_RESPONSE_SIZE`` bytes
+    """
+
+    max_size = current_app.config.get("CACHE_MAX_RESPONSE_SIZE")
+    if isinstance(response, (str, bytes)):
+        return not max_size or len(response) <= max_size
+    if isinstance(response, Response):
+        if response.status_code != 200 or response.is_streamed:
+            return False
+        length = response.calculate_content_length()
+        return not max_size or length is None or length <= max_size
+    return True
+
+
+def conditional_response(view):
+    """
+    Decorator das views que repassam conteúdos do SSM (PDFs e mídias).
+    Deve ficar acima do @cache.cached, assim também se aplica às respostas
+    obtidas do cache.
+
+    Para as respostas completas (200) e já carregadas em memória, exceto
+    páginas HTML, adiciona o ETag (quando ausente) e responde às requisições
+    condicionais (304) e parciais (206).
+    As respostas repassadas em blocos já são tratadas pelo SSM.
+    """
+
+    @wraps(view)
+    def decorated_view(*args, **kwargs):
+        response = make_response(view(*args, **kwargs))
+        if (
+            response.status_code != 200
+            or response.is_streamed
+            or response.mimetype == "text/html"
+        ):
+            return response
+        if not response.get_etag()[0]:
+            response.add_etag()
+        return response.make_conditional(
+            request,
+            accept_ranges=True,
+            complete_length=response.calculate_content_length(),
+        )
+
+    return decorated_view
+
+
+# Tags do cache:
+#
+# As views associam à resposta as tags dos documentos exibidos (ex.:
+# ``journal:<jid>``, ``issue:<iid>``, ``article:<aid>``) com ``add_cache_tags``.
+# Após a requisição, ``store_cache_tags`` adiciona a chave da resposta
+# armazenada no cache ao conjunto (SET) de cada tag no Redis e
+# ``invalidate_cache_tags`` remove somente as chaves das tags informadas.
+
+
+def journal_tag(jid):
+    return "journal:%s" % jid
+
+
+def issue_tag(iid):
+    return "issue:%s" % iid
+
+
+def article_tag(aid):
+    return "article:%s" % aid
+
+
+def add_cache_tags(*tags):
+    """
+    Associa as ``tags`` à resposta da requisição atual.
+    """
+    if not has_request_context():
+        return
+    if not hasattr(g, "cache_tags"):
+        g.cache_tags = set()
+    g.cache_tags.update(tag for tag in tags if tag)
+
+
+def get_redis_client():
+    """
+    Retorna o cliente do Redis usado pelo cache ou None, caso o backend
+    do cache não seja o Redis (ex.: CACHE_TYPE 'null').
+    """
+    from webapp import cache
+
+    backend = getattr(cache, "cache", None)
+    return getattr(backend, "_write_client", None) or getattr(backend, "_client", None)
+
+
+def _key_prefix():
+    from webapp import cache
+
+    return getattr(cache.cache, "key_prefix", None) or ""
+
+
+def _tag_key(tag):
+    return "%s%s" % (_key_prefix(), CACHE_TAG_KEY % tag)
+
+
+def store_cache_tags(response):
+    """
+    Função chamada após cada requisição (after_request).
+    Registra a chave da resposta armazenada no cache (``g.cache_key``) no
+    conjunto de cada tag associada à requisição (``g.cache_tags``).
+    """
+    cache_key = getattr(g, "cache_key", None)
+    tags = getattr(g, "cache_tags", None)
+    if not cache_key or not tags:
+        return response
+
+    redis_client = get_redis_client()
+    if redis_client is None:
+        return response
+
+    key = "%s%s" % (_key_prefix(), cache_key)
+    timeout = int(current_app.config["CACHE_DEFAULT_TIMEOUT"])
+    try:
+        pipeline = redis_client.pipeline()
+        for tag in tags:
+            pipeline.sadd(_tag_key(tag), key)
+            if timeout:
+                pipeline.expire(_tag_key(tag), timeout)
+        pipeline.execute()
+    except Exception as exc:
+        logger.warning("Não foi possível registrar as tags do cache: %s", exc)
+    return response
+
+
+def _delete_from_local_cache(keys):
+    """
+    Remove as ``keys`` (com prefixo) do cache local do worker atual, quando
+    o backend é o ``TwoTierRedisCache``.
+    """
+    from webapp import cache
+
+    local = getattr(cache.cache, "local", None)
+    if local is None:
+        return
+    prefix = _key_prefix()
+    for key in keys:
+        if isinstance(key, bytes):
+            key = key.decode("utf-8")
+        if key.startswith(prefix):
+            local.delete(key[len(prefix) :])
+
+
+def invalidate_cache_tags(tags):
+    """
+    Remove do cache as respostas associadas às ``tags`` e os conjuntos das tags.
+    Retorna a quantidade de chaves removidas.
+    """
+    redis_client = get_redis_client()
+    if redis_client is None:
+        return 0
+
+    tag_keys = [_tag_key(tag) for tag in set(tags) if tag]
+    if not tag_keys:
+        return 0
+    try:
+        keys = set()
+        for tag_key in tag_keys:
+            keys.update(redis_client.smembers(tag_key))
+        removed = redis_client.delete(*keys) if keys else 0
+        redis_client.delete(*tag_keys)
+        _delete_from_local_cache(keys)
+    except Exception as exc:
+        logger.warning("Não foi possível invalidar as tags do cache %s: %s", tags, exc)
+        return 0
+    return removed
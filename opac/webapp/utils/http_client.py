@@ -0,0 +1,159 @@
+# coding: utf-8
+
+"""
+    Cliente HTTP compartilhado pelas requisições de um mesmo worker.
+
+    Mantém uma ``requests.Session`` por processo, com pool de conexões
+    persistentes (keep-alive), evitando um novo handshake TCP/TLS com o SSM a
+    cada XML, HTML, PDF ou mídia obtidos. As requisições ao ``SSM_BASE_URI``
+    usam um pool dedicado (``SSM_HTTP_POOL_*``) e as demais um pool genérico
+    (``HTTP_POOL_*``).
+
+    Nenhuma nova tentativa é feita aqui (``max_retries=0``): a política de
+    retry continua em ``main.views.fetch_data``.
+"""
+
+import logging
+import os
+import threading
+from urllib.parse import urlparse
+
+import requests
+from flask import current_app
+from requests.adapters import HTTPAdapter
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PORTS = {"http": 80, "https": 443}
+
+_lock = threading.Lock()
+_session = None
+_session_pid = None
+_requests_count = 0
+
+
+def _ssm_prefixes(ssm_base_uri):
+    """
+    Retorna os prefixos de URL que devem usar o pool do SSM.
+    Quando a porta configurada é a padrão do scheme, a URL sem a porta
+    também é considerada (ex.: ``https://ssm.scielo.org``).
+    """
+    parsed = urlparse(ssm_base_uri)
+    prefixes = ["%s://%s/" % (parsed.scheme, parsed.netloc)]
+    if parsed.port and DEFAULT_PORTS.get(parsed.scheme) == parsed.port:
+        prefixes.append("%s://%s/" % (parsed.scheme, parsed.hostname))
+    return prefixes
+
+
+def is_ssm_url(url):
+    """
+    Indica se ``url`` é um conteúdo do SSM (``SSM_BASE_URI``).
+    """
+    return url.startswith(tuple(_ssm_prefixes(current_app.config["SSM_BASE_URI"])))
+
+
+def create_session(config):
+    """
+    Cria a sessão com os adapters (pools de conexões) configurados.
+    """
+    session = requests.Session()
+
+    adapter = HTTPAdapter(
+        pool_connections=config["HTTP_POOL_CONNECTIONS"],
+        pool_maxsize=config["HTTP_POOL_MAXSIZE"],
+        max_retries=0,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+
+    ssm_adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=config["SSM_HTTP_POOL_MAXSIZE"],
+        pool_block=config["SSM_HTTP_POOL_BLOCK"],
+        max_retries=0,
+    )
+    for prefix in _ssm_prefixes(config["SSM_BASE_URI"]):
+        session.mount(prefix, ssm_adapter)
+    return session
+
+
+def get_session():
+    """
+    Retorna a sessão do processo atual, criando-a no primeiro uso.
+    A sessão é recriada após um ``fork``, pois as conexões abertas não podem
+    ser compartilhadas entre processos.
+    """
+    global _session, _session_pid
+
+    pid = os.getpid()
+    if _session is None or _session_pid != pid:
+        with _lock:
+            if _session is None or _session_pid != pid:
+                _session = create_session(current_app.config)
+                _session_pid = pid
+    return _session
+
+
+def close_session():
+    """
+    Fecha as conexões do pool e descarta a sessão do processo atual.
+    """
+    global _session, _session_pid
+
+    with _lock:
+        if _session is not None:
+            _session.close()
+        _session = None
+        _session_pid = None
+
+
+def get(url, **kwargs):
+    """
+    Equivalente a ``requests.get`` usando as conexões do pool.
+    """
+    global _requests_count
+
+    response = get_session().get(url, **kwargs)
+
+    interval = current_app.config["HTTP_POOL_STATS_LOG_INTERVAL"]
+    _requests_count += 1
+    if interval and _requests_count % interval == 0:
+        logger.info("HTTP connection pool stats: %s", get_stats())
+    return response
+
+
+def get_stats():
+    """
+    Retorna as estatísticas dos pools de conexões do processo atual::
+
+        {
+            "requests": total de requisições,
+            "new_connections": conexões abertas,
+            "pool_hits": requisições que reutilizaram uma conexão do pool,
+            "pools": [{"host": .., "requests": .., "new_connections": ..,
+                       "pool_hits": .., "idle": ..}, ...],
+        }
+    """
+    stats = {"requests": 0, "new_connections": 0, "pool_hits": 0, "pools": []}
+    session = _session
+    if session is None or _session_pid != os.getpid():
+        return stats
+
+    adapters = {id(adapter): adapter for adapter in session.adapters.values()}
+    for adapter in adapters.values():
+        pools = adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            pool_stats = {
+                "host": "%s://%s:%s" % (pool.scheme, pool.host, pool.port),
+                "requests": pool.num_requests,
+                "new_connections": pool.num_connections,
+                "pool_hits": max(pool.num_requests - pool.num_connections, 0),
+                "idle": pool.pool.qsize() if pool.pool else 0,
+            }
+            stats["pools"].append(pool_stats)
+            for name in ("requests", "new_connections", "pool_hits"):
+                stats[name] += pool_stats[name]
+    return stats
@@ -0,0 +1,131 @@
+# coding: utf-8
+
+"""
+    Cache local (em disco) do HTML dos artigos gerado pelo packtools
+    (``HTMLGenerator``) a partir do XML.
+
+    As entradas são endereçadas pelo conteúdo: a chave é o hash de
+    (article.aid, article.updated, idioma, gs_abstract, versão do packtools),
+    portanto uma atualização do artigo ou do packtools gera uma nova chave e
+    nunca é necessário invalidar uma entrada.
+
+    Como os arquivos ficam em disco (``RENDER_CACHE_ROOT``), as entradas
+    sobrevivem à limpeza do cache de páginas no Redis
+    (``manager.py invalidate_cache``).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import packtools
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+_PACKTOOLS_VERSION = None
+
+
+def packtools_version():
+    """
+    Retorna a versão do packtools instalado, usada como parte da chave.
+    """
+    global _PACKTOOLS_VERSION
+
+    if _PACKTOOLS_VERSION is None:
+        try:
+            import pkg_resources
+
+            _PACKTOOLS_VERSION = pkg_resources.get_distribution("packtools").version
+        except Exception:
+            _PACKTOOLS_VERSION = getattr(packtools, "__version__", "")
+    return _PACKTOOLS_VERSION
+
+
+def is_enabled():
+    return bool(current_app.config.get("RENDER_CACHE_ENABLED"))
+
+
+def make_key(article, lang, gs_abstract=False):
+    """
+    Retorna a chave (hash sha1) da entrada do cache para o artigo ``article``
+    no idioma ``lang``.
+    """
+    updated = article.updated.isoformat() if article.updated else ""
+    raw_key = "|".join(
+        [
+            str(article.aid),
+            updated,
+            str(lang),
+            "abstract" if gs_abstract else "text",
+            packtools_version(),
+        ]
+    )
+    return hashlib.sha1(raw_key.encode("utf-8")).hexdigest()
+
+
+def _entry_path(key):
+    root = current_app.config["RENDER_CACHE_ROOT"]
+    return os.path.join(root, key[:2], key[2:4], "%s.json" % key)
+
+
+def load(article, lang, gs_abstract=False):
+    """
+    Retorna a tupla (html, languages) armazenada para o artigo ou None,
+    caso não exista entrada ou o cache esteja desativado.
+    """
+    if not is_enabled():
+        return None
+
+    path = _entry_path(make_key(article, lang, gs_abstract))
+    try:
+        with open(path, encoding="utf-8") as fp:
+            data = json.load(fp)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as exc:
+        logger.warning("Entrada inválida no cache de HTML %s: %s", path, exc)
+        return None
+    return data["html"], data["languages"]
+
+
+def store(article, lang, html, languages, gs_abstract=False):
+    """
+    Armazena o HTML gerado e a lista de idiomas do artigo.
+    A escrita é atômica (arquivo temporário + rename), assim leitores
+    concorrentes nunca obtêm uma entrada incompleta.
+    """
+    if not is_enabled():
+        return
+
+    path = _entry_path(make_key(article, lang, gs_abstract))
+    data = {"html": str(html), "languages": list(languages or [])}
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as fp:
+            json.dump(data, fp)
+        os.replace(tmp_path, path)
+    except OSError as exc:
+        logger.warning("Não foi possível gravar no cache de HTML %s: %s", path, exc)
+
+
+def clear():
+    """
+    Remove todas as entradas do cache.
+    Retorna a quantidade de arquivos removidos.
+    """
+    root = current_app.config["RENDER_CACHE_ROOT"]
+    removed = 0
+    if not os.path.isdir(root):
+        return removed
+    for name in os.listdir(root):
+        path = os.path.join(root, name)
+        if os.path.isdir(path):
+            for _, __, files in os.walk(path):
+                removed += len(files)
+            shutil.rmtree(path, ignore_errors=True)
+    return removed
@@ -2,7 +2,7 @@
 export REDIS_URL=redis://$OPAC_RQ_REDIS_HOST:$OPAC_RQ_REDIS_PORT/0
 export APP_PATH="/app/opac/"
 
-cd /app/opac && python manager.py setup_scheduler_tasks
+cd /app/opac && python manager.py setup_scheduler_tasks && python manager.py setup_prerender_scheduler_tasks && python manager.py setup_reconcile_journals_scheduler_tasks && python manager.py setup_pid_index_scheduler_tasks && python manager.py setup_journal_exports_scheduler_tasks
 
 rqscheduler \
     --url=$REDIS_URL \
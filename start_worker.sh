@@ -8,4 +8,4 @@ rq worker \
     --sentry-dsn=$OPAC_SENTRY_DSN \
     --path=$WORKER_PATH \
     --name=$WORKER_NAME \
-    mailing
+    mailing prerender journals pid_index journal_exports